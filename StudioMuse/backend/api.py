@@ -1,11 +1,24 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 import uvicorn
 from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
+import asyncio
 import logging
 import json
+import math
+import os
+import sys
+import time
 from datetime import datetime
 
+# Make the shared plugin modules (core/) importable from the backend
+plugin_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if plugin_dir not in sys.path:
+    sys.path.insert(0, plugin_dir)
+
 # Configure logging with more detail
 logging.basicConfig(
     level=logging.INFO,
@@ -14,25 +27,119 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI(title="StudioMuse Backend API")
+from config import config
+from jobs import JobQueueFull, get_job_queue
 
 # Import LLM service provider and providers
 from llm.llm_service_provider import LLMServiceProvider
 from llm.base_llm import BaseLLM
 from llm.perplexity_llm import PerplexityLLM
 from llm.gemini_llm import GeminiLLM
-from llm.prompts import palette_dm_prompt
+from llm.router import AutoLLM, provider_router
+from llm.prompts import palette_dm_prompt, mixing_suggestions_prompt
+from llm.response_cache import get_response_cache
+from llm.stream_parser import JsonArrayStreamParser
+from llm.fan_out import ChunkedFanOut
+from llm import compact_prompt
+from llm.resilience import ProviderError, CircuitOpenError, resilience_stats
+from llm.rate_limiter import RateLimitExceeded, rate_limit_stats
+from llm.single_flight import llm_single_flight
+from llm.http_client import start_http_client, close_http_client
+from llm import metrics
+from core.models.color_matcher import match_palette_colors
+from core.models.pigment_mixing import suggest_mixes
+from core.utils.color_science import format_rgb_string, rgb_dict_to_tuple
 
 # Register providers
 LLMServiceProvider.register_provider("test-provider", BaseLLM)
 LLMServiceProvider.register_provider("perplexity", PerplexityLLM)
 LLMServiceProvider.register_provider("gemini", GeminiLLM)
+LLMServiceProvider.register_provider("auto", AutoLLM)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared LLM clients once at startup and close them at shutdown"""
+    await start_http_client()
+    # Build the pooled provider clients (and import their SDKs) before the first request
+    await asyncio.to_thread(LLMServiceProvider.warm_up)
+    get_response_cache()
+    await get_job_queue().start()
+    yield
+    await get_job_queue().stop()
+    await close_http_client()
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request until its response is
+    complete, so streamed responses are measured in full. Requests are
+    labelled by route template (e.g. /jobs/{job_id}) to keep label sets small.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        metrics.http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.http_in_flight.dec()
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            metrics.http_request_duration.observe(time.perf_counter() - start,
+                                                  endpoint=endpoint, method=scope["method"])
+            metrics.http_requests.inc(endpoint=endpoint, method=scope["method"], status=str(status))
+
+# Initialize FastAPI app
+app = FastAPI(title="StudioMuse Backend API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+# Queue depths are read from their owners when /metrics is scraped, on the event loop
+metrics.registry.register(metrics.Gauge(
+    "studiomuse_rate_limit_queue_depth", "Requests waiting for the provider rate limiter", ("provider",),
+    callback=lambda: {(name, ): stats["queued"] for name, stats in rate_limit_stats().items()}))
+metrics.registry.register(metrics.Gauge(
+    "studiomuse_job_queue_depth", "Background jobs waiting for a worker",
+    callback=lambda: {(): get_job_queue().stats()["pending"]}))
+metrics.registry.register(metrics.Gauge(
+    "studiomuse_jobs_running", "Background jobs being run",
+    callback=lambda: {(): get_job_queue().stats().get("running", 0)}))
+metrics.registry.register(metrics.Gauge(
+    "studiomuse_llm_coalesced_in_flight", "Distinct provider requests shared by coalesced callers",
+    callback=lambda: {(): llm_single_flight.stats()["in_flight"]}))
 
 # Models for API requests
 class PaletteDemystifyRequest(BaseModel):
     gimp_palette_colors: Dict[str, Dict[str, float]]
     physical_palette_data: List[str]
+    physical_palette_colors: Optional[Dict[str, Dict[str, float]]] = None
+    fast: bool = False
+    mixing_recipes: bool = True
+    llm_provider: str = "gemini"
+    temperature: float = 0.7
+
+class PhysicalPaletteSpec(BaseModel):
+    physical_palette_data: List[str]
+    physical_palette_colors: Optional[Dict[str, Dict[str, float]]] = None
+
+class PaletteDemystifyBatchRequest(BaseModel):
+    # Palette name -> colors; every palette is run against every physical palette
+    palettes: Dict[str, Dict[str, Dict[str, float]]]
+    physical_palettes: Dict[str, PhysicalPaletteSpec]
+    fast: bool = False
+    mixing_recipes: bool = True
     llm_provider: str = "gemini"
     temperature: float = 0.7
 
@@ -42,10 +149,37 @@ class PhysicalPaletteRequest(BaseModel):
     temperature: float = 0.7
 
 # Health check endpoint
+# Async so the job queue is only read from the event loop, which mutates it
 @app.get("/health")
-def health_check():
-    """Simple health check endpoint"""
-    return {"status": "healthy", "llm_providers": list(LLMServiceProvider._providers.keys())}
+async def health_check():
+    """Health check with the circuit breaker state and retry counters of each provider"""
+    providers = resilience_stats()
+    degraded = any(stats["circuit"]["state"] != "closed" for stats in providers.values())
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "llm_providers": list(LLMServiceProvider._providers.keys()),
+        "llm_instances": LLMServiceProvider.stats(),
+        "provider_health": providers,
+        "routing": provider_router.stats(),
+        "rate_limits": rate_limit_stats(),
+        "jobs": get_job_queue().stats()
+    }
+
+def _http_error(e: Exception) -> HTTPException:
+    """Map an exception from the LLM request path to an HTTP error"""
+    detail = f"Error processing request: {str(e)}"
+    if isinstance(e, ProviderError):
+        # Rate limits, full queues and open circuits are temporary: tell the client when to come back
+        temporary = isinstance(e, (CircuitOpenError, RateLimitExceeded)) or e.status_code == 429
+        status_code = 503 if temporary else 502
+        headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after else None
+        return HTTPException(status_code=status_code, detail=detail, headers=headers)
+    return HTTPException(status_code=500, detail=detail)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request, provider, cache and queue metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
 
 # Configuration endpoint
 @app.get("/config")
@@ -65,15 +199,40 @@ def get_config():
     }
     return safe_config
 
+# Response cache endpoints
+@app.get("/cache/stats")
+def cache_stats():
+    """Return size and hit/miss counters of the LLM response cache and request coalescing"""
+    cache = get_response_cache()
+    if cache is None:
+        return {"enabled": False, "single_flight": llm_single_flight.stats()}
+    return {"enabled": True, **cache.stats(), "single_flight": llm_single_flight.stats()}
+
+@app.delete("/cache")
+def clear_cache():
+    """Remove all cached LLM responses"""
+    cache = get_response_cache()
+    removed = cache.clear() if cache is not None else 0
+    logger.info(f"Cleared {removed} cached LLM responses")
+    return {"success": True, "removed": removed}
+
 # Palette demystifier endpoint
 @app.post("/palette/demystify")
-def palette_demystify(request: PaletteDemystifyRequest):
+async def palette_demystify(request: PaletteDemystifyRequest):
     """Process a palette demystification request"""
     logger.info("=== RECEIVED PALETTE DEMYSTIFY REQUEST ===")
     logger.info(f"GIMP Colors: {len(request.gimp_palette_colors)} colors")
     logger.info(f"Physical Colors: {len(request.physical_palette_data)} colors")
     logger.info(f"LLM Provider: {request.llm_provider}")
     
+    if request.physical_palette_colors:
+        return await _palette_demystify_local(request)
+    if request.fast:
+        raise HTTPException(
+            status_code=400,
+            detail="Fast mode requires physical_palette_colors with RGB values"
+        )
+    
     try:
         # Get LLM instance
         llm = LLMServiceProvider.get_llm(
@@ -82,34 +241,315 @@ def palette_demystify(request: PaletteDemystifyRequest):
         )
         logger.info(f"Using LLM: {request.llm_provider}")
         
-        # Format the prompt
-        prompt = palette_dm_prompt.format(
-            rgb_colors=json.dumps(request.gimp_palette_colors, indent=2),
-            entry_text=json.dumps(request.physical_palette_data, indent=2)
-        )
-        logger.info("Prompt formatted successfully")
-        
-        # Call LLM
+        # Large palettes are split into chunks that are sent in parallel
+        fan_out = _demystify_fan_out(llm, request)
         logger.info("Calling LLM API...")
-        llm_response = llm.call_api(prompt)
-        content = llm_response["text"]
-        raw_response = llm_response["raw_response"]
-        logger.info("LLM API call completed")
+        result = await fan_out.run(list(request.gimp_palette_colors))
+        logger.info(f"LLM API calls completed ({result.chunks} chunks)")
         
         return {
             "success": True,
-            "response": content,
-            "raw_response": raw_response,
-            "provider": request.llm_provider
+            "response": result.entries,
+            "raw_response": result.raw_responses,
+            "provider": request.llm_provider,
+            "cached": result.cached,
+            "missing_colors": result.missing
         }
         
     except Exception as e:
         logger.error(f"Error in palette demystification: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
+        raise _http_error(e)
+
+def _demystify_prompt(request: PaletteDemystifyRequest, names: Optional[List[str]] = None) -> str:
+    """Format the prompt asking the LLM to match GIMP colors (optionally a subset) to physical colors"""
+    colors = request.gimp_palette_colors
+    if names is not None:
+        colors = {name: colors[name] for name in names}
+    return palette_dm_prompt.format(
+        rgb_colors=json.dumps(colors, indent=2),
+        entry_text=json.dumps(request.physical_palette_data, indent=2)
+    )
+
+def _mixing_prompt(request: PaletteDemystifyRequest, matches: List[Dict[str, Any]]) -> str:
+    """Format the prompt asking the LLM for mixing suggestions for local matches"""
+    matched_colors = [
+        {k: m[k] for k in ("gimp_color_name", "rgb_color", "physical_color_name")}
+        for m in matches
+    ]
+    return mixing_suggestions_prompt.format(
+        matched_colors=json.dumps(matched_colors, indent=2),
+        entry_text=json.dumps(request.physical_palette_data, indent=2)
+    )
+
+def _demystify_fan_out(llm: BaseLLM, request: PaletteDemystifyRequest) -> ChunkedFanOut:
+    """Fan-out asking the LLM to match GIMP colors to physical colors"""
+    if not config.get("llm.compact_prompts", True):
+        return ChunkedFanOut(llm, lambda names: _demystify_prompt(request, names))
+    colors, physical = request.gimp_palette_colors, request.physical_palette_data
+    return ChunkedFanOut(
+        llm,
+        lambda names: compact_prompt.demystify_prompt(colors, names, physical),
+        decode=lambda names, items: compact_prompt.decode_mappings(names, colors, physical, items),
+        tokens_per_entry=compact_prompt.TOKENS_PER_ENTRY
+    )
+
+def _mixing_fan_out(llm: BaseLLM, request: PaletteDemystifyRequest,
+                    matches: List[Dict[str, Any]]) -> ChunkedFanOut:
+    """Fan-out asking the LLM for mixing suggestions for local matches"""
+    by_name = {match["gimp_color_name"]: match for match in matches}
+    if not config.get("llm.compact_prompts", True):
+        return ChunkedFanOut(llm, lambda names: _mixing_prompt(request, [by_name[n] for n in names]))
+    colors, physical = request.gimp_palette_colors, request.physical_palette_data
+    return ChunkedFanOut(
+        llm,
+        lambda names: compact_prompt.mixing_prompt(colors, [by_name[n] for n in names], physical),
+        decode=compact_prompt.decode_suggestions,
+        tokens_per_entry=compact_prompt.TOKENS_PER_ENTRY
+    )
+
+def _match_locally(request: PaletteDemystifyRequest) -> List[Dict[str, Any]]:
+    """Match colors with CIEDE2000 and solve mixing recipes (CPU-bound, runs in a worker thread)"""
+    matches = match_palette_colors(request.gimp_palette_colors, request.physical_palette_colors)
+    # Clients with a precomputed mixing lattice look recipes up themselves
+    if request.mixing_recipes:
+        recipes = suggest_mixes(request.gimp_palette_colors, request.physical_palette_colors)
+        for match, recipe in zip(matches, recipes):
+            match["mixing_recipe"] = recipe.to_dict()
+            match["mixing_suggestions"] = recipe.describe()
+    return matches
+
+async def _palette_demystify_local(request: PaletteDemystifyRequest) -> Dict[str, Any]:
+    """
+    Match GIMP colors to physical colors locally with CIEDE2000 and solve
+    Kubelka-Munk mixing recipes. The LLM is only used for free-text mixing
+    suggestions, and is skipped in fast mode.
+    """
+    try:
+        matches = await run_in_threadpool(_match_locally, request)
+        logger.info(f"Matched {len(matches)} colors locally")
+    except Exception as e:
+        logger.error(f"Error in local color matching: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error matching colors: {str(e)}")
+    
+    if request.fast:
+        return {
+            "success": True,
+            "response": matches,
+            "provider": "local"
+        }
+    
+    try:
+        llm = LLMServiceProvider.get_llm(
+            request.llm_provider, 
+            temperature=request.temperature
+        )
+        
+        fan_out = _mixing_fan_out(llm, request, matches)
+        
+        logger.info("Calling LLM API for mixing suggestions...")
+        result = await fan_out.run([match["gimp_color_name"] for match in matches])
+        logger.info(f"LLM API calls completed ({result.chunks} chunks)")
+    except Exception as e:
+        logger.error(f"Error in palette demystification: {str(e)}")
+        raise _http_error(e)
+    
+    # Merge suggestions into the local matches; colors without a valid reply keep the local recipes
+    suggestions = {item["gimp_color_name"]: item.get("mixing_suggestions", "") for item in result.entries}
+    for match in matches:
+        match["mixing_suggestions"] = suggestions.get(match["gimp_color_name"]) or match["mixing_suggestions"]
+    
+    return {
+        "success": True,
+        "response": matches,
+        "raw_response": result.raw_responses,
+        "provider": request.llm_provider,
+        "cached": result.cached
+    }
+
+# Streaming palette demystifier endpoint
+@app.post("/palette/demystify/stream")
+async def palette_demystify_stream(request: PaletteDemystifyRequest):
+    """
+    Stream a palette demystification as newline-delimited JSON events:
+    "mapping" for each color mapping as soon as it is available,
+    "suggestion" for LLM mixing suggestions that refine local matches,
+    then "done", or "error" if the request fails part way.
+    """
+    logger.info("=== RECEIVED STREAMING PALETTE DEMYSTIFY REQUEST ===")
+    logger.info(f"GIMP Colors: {len(request.gimp_palette_colors)} colors")
+    logger.info(f"LLM Provider: {request.llm_provider}")
+    
+    if request.fast and not request.physical_palette_colors:
+        raise HTTPException(
+            status_code=400,
+            detail="Fast mode requires physical_palette_colors with RGB values"
+        )
+    
+    return StreamingResponse(_demystify_events(request), media_type="application/x-ndjson")
+
+def _ndjson(event: Dict[str, Any]) -> str:
+    """Serialize one streaming event as a line of JSON"""
+    return json.dumps(event) + "\n"
+
+async def _demystify_events(request: PaletteDemystifyRequest) -> AsyncIterator[str]:
+    """Generate the NDJSON events of a streaming demystification"""
+    count = 0
+    provider = request.llm_provider
+    try:
+        if request.physical_palette_colors:
+            # Local matches are complete at once; the LLM only adds suggestions
+            matches = await run_in_threadpool(_match_locally, request)
+            for match in matches:
+                yield _ndjson({"type": "mapping", "index": count, "data": match})
+                count += 1
+            logger.info(f"Streamed {count} local matches")
+            
+            if request.fast:
+                yield _ndjson({"type": "done", "count": count, "provider": "local"})
+                return
+        
+        llm = LLMServiceProvider.get_llm(
+            request.llm_provider, 
+            temperature=request.temperature
+        )
+        
+        if request.physical_palette_colors:
+            fan_out = _mixing_fan_out(llm, request, matches)
+            names = [match["gimp_color_name"] for match in matches]
+            event_type = "suggestion"
+        else:
+            fan_out = _demystify_fan_out(llm, request)
+            names = list(request.gimp_palette_colors)
+            event_type = "mapping"
+        
+        async def llm_entries():
+            if len(names) <= fan_out.chunk_size:
+                # One chunk: stream its entries as the provider generates them
+                parser = JsonArrayStreamParser()
+                async for chunk in llm.cached_astream_api(fan_out.build_prompt(names)):
+                    for item in fan_out.decode(names, parser.feed(chunk)):
+                        yield item
+            else:
+                # Several chunks run in parallel; each is emitted, in order, once complete
+                async for result in fan_out.iter_chunks(names):
+                    for item in result.entries:
+                        yield item
+        
+        logger.info("Streaming LLM API response...")
+        async for item in llm_entries():
+            if not isinstance(item, dict):
+                continue
+            if event_type == "mapping":
+                yield _ndjson({"type": "mapping", "index": count, "data": item})
+                count += 1
+            else:
+                yield _ndjson({"type": "suggestion", "data": item})
+        logger.info("LLM API stream completed")
+        
+        yield _ndjson({"type": "done", "count": count, "provider": provider})
+    except Exception as e:
+        logger.error(f"Error in streaming palette demystification: {str(e)}")
+        # The 200 status has already been sent, so report the HTTP status in the event
+        error = _http_error(e)
+        event = {"type": "error", "error": error.detail, "status": error.status_code}
+        if error.headers:
+            event["retry_after"] = int(error.headers["Retry-After"])
+        yield _ndjson(event)
+
+# Batch palette demystifier endpoint
+@app.post("/palette/demystify/batch")
+async def palette_demystify_batch(request: PaletteDemystifyBatchRequest):
+    """
+    Demystify many GIMP palettes against one or more physical palettes.
+    
+    Colors shared across palettes (same RGB to 3 decimals) are matched only
+    once per physical palette, and the physical palettes are processed
+    concurrently. Each palette/physical palette pair gets its own result,
+    so one failure does not fail the whole batch.
+    """
+    logger.info("=== RECEIVED BATCH PALETTE DEMYSTIFY REQUEST ===")
+    if not request.palettes or not request.physical_palettes:
+        raise HTTPException(status_code=400, detail="A batch needs at least one palette and one physical palette")
+    
+    # Deduplicate colors across the batch by their RGB value
+    keys = {
+        name: {color: format_rgb_string(rgb_dict_to_tuple(rgb)) for color, rgb in colors.items()}
+        for name, colors in request.palettes.items()
+    }
+    unique_colors = {}
+    for name, colors in request.palettes.items():
+        for color, key in keys[name].items():
+            unique_colors.setdefault(key, colors[color])
+    total = sum(len(colors) for colors in request.palettes.values())
+    logger.info(f"Batch: {len(request.palettes)} palettes, {total} colors "
+                f"({len(unique_colors)} unique), {len(request.physical_palettes)} physical palettes")
+    
+    async def run(physical: PhysicalPaletteSpec) -> Dict[str, Any]:
+        return await palette_demystify(PaletteDemystifyRequest(
+            gimp_palette_colors=unique_colors,
+            physical_palette_data=physical.physical_palette_data,
+            physical_palette_colors=physical.physical_palette_colors,
+            fast=request.fast,
+            mixing_recipes=request.mixing_recipes,
+            llm_provider=request.llm_provider,
+            temperature=request.temperature
+        ))
+    
+    outcomes = await asyncio.gather(
+        *(run(physical) for physical in request.physical_palettes.values()),
+        return_exceptions=True
+    )
+    
+    results = []
+    for physical_name, outcome in zip(request.physical_palettes, outcomes):
+        if isinstance(outcome, Exception):
+            error = outcome if isinstance(outcome, HTTPException) else _http_error(outcome)
+            logger.error(f"Batch demystification against {physical_name} failed: {error.detail}")
+        else:
+            # Verbose replies come straight from the model: skip entries without a color name,
+            # so their colors are reported in missing_colors instead of failing the pair
+            response = outcome.get("response")
+            by_key = {entry["gimp_color_name"]: entry for entry in response if isinstance(entry, dict)
+                      and isinstance(entry.get("gimp_color_name"), str)} if isinstance(response, list) else {}
+            skipped = len(response) - len(by_key) if isinstance(response, list) else 0
+            if skipped:
+                logger.warning(f"Batch: skipped {skipped} malformed entries from {physical_name}")
+        
+        for name in request.palettes:
+            result = {"palette": name, "physical_palette": physical_name}
+            if isinstance(outcome, Exception):
+                results.append({**result, "success": False, "error": error.detail,
+                                "status": error.status_code})
+                continue
+            # Expand the deduplicated entries back to this palette's color names
+            entries = [_rename_entry(by_key[key], color) for color, key in keys[name].items() if key in by_key]
+            missing = [color for color, key in keys[name].items() if key not in by_key]
+            result.update({"success": bool(entries) or not missing, "response": entries,
+                           "missing_colors": missing, "provider": outcome["provider"],
+                           "cached": outcome.get("cached", False)})
+            if not result["success"]:
+                result["error"] = "No colors could be matched"
+            results.append(result)
+    
+    failed = sum(not result["success"] for result in results)
+    return {
+        "success": failed < len(results),
+        "results": results,
+        "failed": failed,
+        "total_colors": total,
+        "unique_colors": len(unique_colors)
+    }
+
+def _rename_entry(entry: Dict[str, Any], color_name: str) -> Dict[str, Any]:
+    """Copy of a deduplicated batch entry under one palette's color name"""
+    renamed = {**entry, "gimp_color_name": color_name}
+    if "mixing_recipe" in entry:
+        renamed["mixing_recipe"] = {**entry["mixing_recipe"], "target_name": color_name}
+    return renamed
 
 # Physical palette creation endpoint
 @app.post("/palette/create")
-def create_physical_palette(request: PhysicalPaletteRequest):
+async def create_physical_palette(request: PhysicalPaletteRequest):
     """Process a physical palette creation request"""
     logger.info("=== RECEIVED PHYSICAL PALETTE CREATE REQUEST ===")
     logger.info(f"Entry Text: {request.entry_text}")
@@ -132,18 +572,78 @@ def create_physical_palette(request: PhysicalPaletteRequest):
         
         # Call LLM
         logger.info("Calling LLM API...")
-        content = llm.call_api(prompt)
+        llm_response = await llm.cached_acall_api(prompt)
         logger.info("LLM API call completed")
         
         return {
             "success": True,
-            "response": content,
-            "provider": request.llm_provider
+            "response": llm_response["text"],
+            "provider": request.llm_provider,
+            "cached": llm_response["cached"]
         }
         
     except Exception as e:
         logger.error(f"Error in physical palette creation: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
+        raise _http_error(e)
+
+# Background job endpoints
+def _submit_job(kind: str, run) -> Dict[str, Any]:
+    """Queue a request as a background job and describe it to the client"""
+    try:
+        job = get_job_queue().submit(kind, run)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Job queue is full: {str(e)}", headers={"Retry-After": "30"})
+    return job.to_dict()
+
+# Job endpoints are async so the job queue is only touched from the event loop
+@app.post("/jobs/palette/create", status_code=202)
+async def submit_create_physical_palette(request: PhysicalPaletteRequest):
+    """Run a physical palette creation in the background and return its job ID"""
+    return _submit_job("palette/create", lambda: create_physical_palette(request))
+
+@app.post("/jobs/palette/demystify", status_code=202)
+async def submit_palette_demystify(request: PaletteDemystifyRequest):
+    """Run a palette demystification in the background and return its job ID"""
+    return _submit_job("palette/demystify", lambda: palette_demystify(request))
+
+@app.post("/jobs/palette/demystify/batch", status_code=202)
+async def submit_palette_demystify_batch(request: PaletteDemystifyBatchRequest):
+    """Run a batch demystification in the background and return its job ID"""
+    return _submit_job("palette/demystify/batch", lambda: palette_demystify_batch(request))
+
+def _get_job(job_id: str):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Return the status of a background job"""
+    return _get_job(job_id).to_dict()
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, response: Response):
+    """
+    Return the result of a finished job. Answers 202 with the job status
+    while it is still queued or running, and the job's own error status
+    if it failed.
+    """
+    job = _get_job(job_id)
+    if not job.finished:
+        response.status_code = 202
+        return job.to_dict()
+    if job.status == job.CANCELLED:
+        raise HTTPException(status_code=410, detail=f"Job {job_id} was cancelled")
+    if job.status == job.FAILED:
+        raise HTTPException(status_code=job.status_code or 500, detail=job.error)
+    return job.result
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    _get_job(job_id)
+    return get_job_queue().cancel(job_id).to_dict()
 
 # Run the server if executed directly
 if __name__ == "__main__":
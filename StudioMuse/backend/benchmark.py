@@ -0,0 +1,220 @@
+"""
+Offline load test of the backend request path.
+
+Registers a simulated LLM provider and drives /palette/demystify and
+/palette/create with concurrent clients, then reports throughput and
+latency percentiles per endpoint. No network or API keys are needed, so
+regressions in the request path itself (prompt building, fan-out,
+caching, parsing) show up on their own.
+
+Usage:
+    python benchmark.py --clients 32 --requests 400
+    python benchmark.py --latency 1.5 --error-rate 0.05 --http --json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Palette sizes sampled for demystify requests, weighted toward typical palettes
+PALETTE_SIZES = [8, 16, 24, 32, 64, 128, 256]
+PALETTE_WEIGHTS = [15, 25, 20, 20, 10, 7, 3]
+
+PHYSICAL_NAMES = [
+    "Titanium White", "Ivory Black", "Cadmium Red Medium", "Alizarin Crimson", "Cadmium Yellow Light",
+    "Yellow Ochre", "Burnt Sienna", "Raw Umber", "Ultramarine Blue", "Phthalo Blue", "Phthalo Green",
+    "Sap Green", "Dioxazine Purple", "Payne's Grey", "Cerulean Blue", "Quinacridone Magenta",
+    "Naples Yellow", "Burnt Umber", "Viridian", "Cobalt Blue", "Raw Sienna", "Lemon Yellow",
+    "Permanent Rose", "Indigo"
+]
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def random_colors(rng: random.Random, count: int) -> Dict[str, Dict[str, float]]:
+    return {
+        f"Color {i + 1}": {"R": rng.random(), "G": rng.random(), "B": rng.random(), "A": 1.0}
+        for i in range(count)
+    }
+
+
+def build_workload(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """The requests of one run, as endpoint and JSON body, in submission order."""
+    rng = random.Random(args.seed)
+    physical_colors = random_colors(rng, len(PHYSICAL_NAMES))
+    physical_colors = dict(zip(PHYSICAL_NAMES, physical_colors.values()))
+
+    workload = []
+    for i in range(args.requests):
+        if rng.random() < args.create_ratio:
+            workload.append({
+                "endpoint": "/palette/create",
+                "body": {"entry_text": f"Simulated set {i}", "llm_provider": "simulated"}
+            })
+            continue
+
+        size = rng.choices(PALETTE_SIZES, PALETTE_WEIGHTS)[0]
+        body = {
+            "gimp_palette_colors": random_colors(rng, size),
+            "physical_palette_data": PHYSICAL_NAMES,
+            "llm_provider": "simulated"
+        }
+        if rng.random() < args.local_ratio:
+            body["physical_palette_colors"] = physical_colors
+        workload.append({"endpoint": "/palette/demystify", "body": body})
+    return workload
+
+
+def configure_backend(args: argparse.Namespace, cache_dir: str) -> None:
+    """Point the backend at a throwaway cache and register the simulated provider."""
+    os.environ["STUDIOMUSE_CACHE_PATH"] = os.path.join(cache_dir, "llm_cache.sqlite3")
+    os.environ["STUDIOMUSE_CACHE_ENABLED"] = "true" if args.cache else "false"
+
+    from llm.llm_service_provider import LLMServiceProvider
+    from llm.simulated_llm import SimulatedLLM, SimulationProfile
+
+    SimulatedLLM.profile = SimulationProfile(
+        latency=args.latency,
+        latency_sigma=args.latency_sigma,
+        seconds_per_token=args.seconds_per_token,
+        error_rate=args.error_rate,
+        suggestion_words=args.suggestion_words
+    )
+    LLMServiceProvider.register_provider("simulated", SimulatedLLM)
+
+
+async def drive(client, workload: List[Dict[str, Any]], clients: int) -> Dict[str, List[Any]]:
+    """Send the workload with a fixed number of concurrent clients; return samples per endpoint."""
+    samples: Dict[str, List[Any]] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in workload:
+        queue.put_nowait(item)
+
+    async def run_client():
+        while not queue.empty():
+            item = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await client.post(item["endpoint"], json=item["body"])
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+            samples.setdefault(item["endpoint"], []).append((time.perf_counter() - start, ok))
+
+    await asyncio.gather(*(run_client() for _ in range(clients)))
+    return samples
+
+
+def summarize(samples: Dict[str, List[Any]], elapsed: float) -> Dict[str, Dict[str, Any]]:
+    report = {}
+    for endpoint, results in sorted(samples.items()):
+        latencies = sorted(latency for latency, _ in results)
+        report[endpoint] = {
+            "requests": len(results),
+            "errors": sum(not ok for _, ok in results),
+            "throughput": round(len(results) / elapsed, 2),
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3)
+        }
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, Any]], elapsed: float, args: argparse.Namespace) -> None:
+    print(f"\n{args.requests} requests, {args.clients} clients, {elapsed:.2f} s "
+          f"(latency {args.latency} s, sigma {args.latency_sigma}, error rate {args.error_rate})")
+    print(f"{'endpoint':<22}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}")
+    for endpoint, row in report.items():
+        print(f"{endpoint:<22}{row['requests']:>9}{row['errors']:>8}{row['throughput']:>9.2f}"
+              f"{row['p50']:>8.3f}{row['p95']:>8.3f}{row['p99']:>8.3f}{row['max']:>8.3f}")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    import api
+
+    workload = build_workload(args)
+    server = None
+    if args.http:
+        # Real sockets and HTTP parsing through uvicorn, still on localhost
+        import uvicorn
+
+        server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=args.port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            await asyncio.sleep(0.05)
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=args.clients))
+    else:
+        # In-process ASGI calls; the lifespan is entered by hand since no server runs it
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://benchmark",
+                                   timeout=args.timeout)
+
+    lifespan = None if args.http else api.lifespan(api.app)
+    try:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        start = time.perf_counter()
+        samples = await drive(client, workload, args.clients)
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+        if server is not None:
+            server.should_exit = True
+
+    return {"elapsed": round(elapsed, 3), "endpoints": summarize(samples, elapsed)}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline load test of the StudioMuse backend")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="Total requests")
+    parser.add_argument("--create-ratio", type=float, default=0.2, help="Share of /palette/create requests")
+    parser.add_argument("--local-ratio", type=float, default=0.3,
+                        help="Share of demystify requests sending physical RGB values (local matching)")
+    parser.add_argument("--latency", type=float, default=0.8, help="Median provider time to first token (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal spread of that latency")
+    parser.add_argument("--seconds-per-token", type=float, default=0.004, help="Provider generation time per token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of provider calls failing with 503")
+    parser.add_argument("--suggestion-words", type=int, default=12, help="Words per mixing suggestion")
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--http", action="store_true", help="Go through a local uvicorn server instead of in-process")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --http")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request client timeout (s)")
+    parser.add_argument("--seed", type=int, default=1, help="Workload random seed")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    logging.disable(logging.ERROR)  # Per-request logs would dominate the measurement
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        configure_backend(args, cache_dir)
+        result = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result["endpoints"], result["elapsed"], args)
+
+
+if __name__ == "__main__":
+    main()
@@ -32,7 +32,46 @@ class Config:
             },
             "llm": {
                 "default_provider": "gemini",
-                "temperature": 0.2
+                "temperature": 0.2,
+                "compact_prompts": True,  # index-based color tables and tuple replies
+                "chunk_size": 0,  # 0 sizes chunks from the provider's max_output_tokens
+                "max_concurrency": 16,
+                "chunk_attempts": 3,
+                "auto_providers": ["gemini", "perplexity"],
+                "hedge": True,
+                "hedge_delay": 10.0,  # used until a provider has enough samples for its p95
+                "max_instances": 16,  # pooled provider instances (one per provider and model)
+                "warm_up": ["gemini", "perplexity", "auto"]  # providers created at startup
+            },
+            "resilience": {
+                "max_attempts": 3,
+                "base_delay": 0.5,
+                "max_delay": 8.0,
+                "max_retry_after": 30.0,
+                "attempt_timeout": 30.0,
+                "failure_threshold": 5,
+                "recovery_timeout": 30.0
+            },
+            "rate_limit": {
+                "max_queue": 100,  # requests waiting per provider before new ones get a 503
+                "queue_timeout": 30.0,  # seconds a request may wait for admission
+                # Per-provider quotas; 0 or a missing provider means no limit
+                "providers": {
+                    "gemini": {"requests_per_minute": 1000, "tokens_per_minute": 1000000},
+                    "perplexity": {"requests_per_minute": 50, "tokens_per_minute": 0}
+                }
+            },
+            "jobs": {
+                "max_workers": 4,
+                "max_pending": 100,
+                "result_ttl": 3600.0  # seconds finished jobs are kept for collection
+            },
+            "cache": {
+                "enabled": True,
+                "path": str(self._get_config_file_path().parent / "llm_cache.sqlite3"),
+                "max_entries": 5000,
+                "max_bytes": 256 * 1024 * 1024,
+                "ttl_seconds": 7 * 24 * 3600
             }
         }
         
@@ -76,6 +115,16 @@ class Config:
         
         if temp := os.environ.get("STUDIOMUSE_LLM_TEMPERATURE"):
             self._config["llm"]["temperature"] = float(temp)
+        
+        # Response cache settings
+        if cache_path := os.environ.get("STUDIOMUSE_CACHE_PATH"):
+            self._config["cache"]["path"] = cache_path
+        
+        if cache_enabled := os.environ.get("STUDIOMUSE_CACHE_ENABLED"):
+            self._config["cache"]["enabled"] = cache_enabled.lower() not in ("0", "false", "no")
+        
+        if cache_ttl := os.environ.get("STUDIOMUSE_CACHE_TTL"):
+            self._config["cache"]["ttl_seconds"] = float(cache_ttl)
     
     def _update_nested_dict(self, d: Dict, u: Dict):
         """Recursively update a nested dictionary"""
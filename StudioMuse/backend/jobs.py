@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the "jobs" section of the backend config
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_PENDING = 100
+DEFAULT_RESULT_TTL = 3600.0
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while max_pending jobs are already waiting."""
+
+
+@dataclass
+class Job:
+    """One background request and, once finished, its result or error."""
+    id: str
+    kind: str
+    run: Callable[[], Awaitable[Any]] = field(repr=False)
+    status: str = "queued"  # queued, running, succeeded, failed or cancelled
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.SUCCEEDED, self.FAILED, self.CANCELLED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Job status without the result."""
+        info = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if self.error is not None:
+            info["error"] = self.error
+            info["status_code"] = self.status_code
+        return info
+
+
+class JobQueue:
+    """
+    Runs long requests in the background on a bounded pool of workers.
+
+    Submitting returns a Job right away; clients poll its status and fetch
+    the result later. Finished jobs are kept for result_ttl seconds so a
+    client that lost its connection can come back for the result instead
+    of submitting the request again.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, max_pending: int = DEFAULT_MAX_PENDING,
+                 result_ttl: float = DEFAULT_RESULT_TTL):
+        """
+        Args:
+            max_workers: Jobs run concurrently
+            max_pending: Jobs allowed to wait for a worker
+            result_ttl: Seconds a finished job is kept
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the workers (call from the running event loop)."""
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.max_workers)]
+        logger.info(f"Started {self.max_workers} job workers")
+
+    async def stop(self) -> None:
+        """Cancel the workers and any running jobs."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, kind: str, run: Callable[[], Awaitable[Any]]) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            kind: Short label of the request type
+            run: Coroutine function producing the job's result
+
+        Returns:
+            The queued Job
+
+        Raises:
+            JobQueueFull: If max_pending jobs are already waiting
+        """
+        self._purge()
+        job = Job(id=uuid.uuid4().hex, kind=kind, run=run)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"{self.max_pending} jobs are already waiting") from None
+        self._jobs[job.id] = job
+        logger.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job with this ID, or None if it is unknown or has expired."""
+        self._purge()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are left as they are."""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job.task is not None:
+            job.task.cancel()
+        self._finish(job, Job.CANCELLED)
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        # Snapshot, so a caller outside the event loop never iterates a dict being resized
+        for job in list(self._jobs.values()):
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.max_workers, "pending": self._queue.qsize() if self._queue else 0, **counts}
+
+    def _finish(self, job: Job, status: str, result: Any = None,
+                error: Optional[str] = None, status_code: Optional[int] = None) -> None:
+        job.status, job.result, job.error, job.status_code = status, result, error, status_code
+        job.finished_at = time.time()
+        job.run = None  # Drop the request so it can be garbage collected
+
+    def _purge(self) -> None:
+        """Drop finished jobs older than result_ttl."""
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status != Job.QUEUED:
+                    continue  # Cancelled while waiting
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        job.task = asyncio.create_task(job.run())
+        try:
+            result = await job.task
+        except asyncio.CancelledError:
+            if job.task.cancelled() and job.status == Job.CANCELLED:
+                logger.info(f"Job {job.id} cancelled")
+                return
+            raise  # The worker itself is shutting down
+        except Exception as e:
+            # HTTPException carries the status and message the endpoint would have returned
+            status_code = getattr(e, "status_code", 500)
+            error = getattr(e, "detail", None) or str(e)
+            logger.error(f"Job {job.id} failed: {error}")
+            self._finish(job, Job.FAILED, error=error, status_code=status_code)
+        else:
+            self._finish(job, Job.SUCCEEDED, result=result)
+            logger.info(f"Job {job.id} finished in {job.finished_at - job.started_at:.1f} s")
+        finally:
+            job.task = None
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Return the shared job queue, configured from the backend config."""
+    global _job_queue
+    if _job_queue is None:
+        from config import config
+
+        _job_queue = JobQueue(
+            max_workers=int(config.get("jobs.max_workers", DEFAULT_MAX_WORKERS)),
+            max_pending=int(config.get("jobs.max_pending", DEFAULT_MAX_PENDING)),
+            result_ttl=float(config.get("jobs.result_ttl", DEFAULT_RESULT_TTL))
+        )
+    return _job_queue
@@ -1,14 +1,27 @@
+import asyncio
 import logging
 from pydantic import BaseModel
 import os
 import requests
-from typing import Dict, Any, Optional, List
+import time
+import json
+from typing import Dict, Any, Optional, List, ClassVar, AsyncIterator, Tuple
+
+from .http_client import get_http_client
+from .response_cache import get_response_cache, make_cache_key
+from .single_flight import llm_single_flight
+from .resilience import ProviderError, classify_error, get_resilience
+from .rate_limiter import estimate_tokens, get_rate_limiter
+from .metrics import LLMCallTracker, cache_lookups, llm_rate_limit_wait
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class BaseLLM(BaseModel):
+    provider_name: ClassVar[str] = "base"
+    # Settings that may change per request without creating a new client
+    CALL_PARAMS: ClassVar[Tuple[str, ...]] = ("temperature", "max_output_tokens", "top_k")
     model: str
     temperature: float = 0.0
     top_k: Optional[int] = 10
@@ -33,6 +46,32 @@ class BaseLLM(BaseModel):
         )
         logger.info(f"Initialized BaseLLM with model: {model}")
 
+    def with_params(self, **params: Any) -> "BaseLLM":
+        """
+        Return a request-scoped copy of this instance with different call parameters.
+        The copy shares this instance's client, so it is cheap to make per request.
+        
+        Args:
+            **params: New values for any of CALL_PARAMS
+            
+        Returns:
+            This instance if nothing changes, otherwise the copy
+            
+        Raises:
+            ValueError: If a parameter is not one of CALL_PARAMS
+        """
+        unknown = set(params) - set(self.CALL_PARAMS)
+        if unknown:
+            raise ValueError(f"Not a per-request parameter: {', '.join(sorted(unknown))}")
+        changes = {name: value for name, value in params.items() if getattr(self, name) != value}
+        return self.model_copy(update=changes) if changes else self
+
+    def warm_up(self) -> None:
+        """
+        Do one-time setup ahead of the first request (SDK imports, clients).
+        Override this method for providers with expensive lazy setup
+        """
+
     def prepare_messages(self, prompt: str) -> List[Dict[str, str]]:
         """
         Prepare messages in the format required by the LLM provider
@@ -61,7 +100,234 @@ class BaseLLM(BaseModel):
             "Content-Type": "application/json"
         }
         
-    def call_api(self, prompt: str) -> str:
+    def cached_call_api(self, prompt: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Call the API through the persistent response cache. Transient
+        provider failures are retried by the provider's resilience layer.
+        
+        Identical prompts (after whitespace normalization) sent to the same
+        provider, model and temperature are answered from the cache.
+        
+        Args:
+            prompt: The input text to send to the API
+            use_cache: Set to False to always call the provider
+            
+        Returns:
+            Dict with "text", "raw_response" and "cached" keys
+        """
+        cache = get_response_cache() if use_cache else None
+        if cache is None:
+            return {**self.resilient_call_api(prompt), "cached": False}
+        
+        key = self.cache_key(prompt)
+        start = time.perf_counter()
+        cached = cache.get(key)
+        self._count_cache_lookup(cached)
+        if cached is not None:
+            logger.info(f"Cache hit for {self.provider_name}/{self.model} "
+                        f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+            return {**cached, "cached": True}
+        
+        response = self.resilient_call_api(prompt)
+        cache.put(key, response, self.provider_name, self.model, self.temperature)
+        return {**response, "cached": False}
+        
+    async def cached_acall_api(self, prompt: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Async version of cached_call_api. Cache reads and writes run in a
+        worker thread so SQLite never blocks the event loop.
+        
+        On a cache miss, concurrent identical requests are coalesced: they
+        all await one in-flight provider call and share its result or error.
+        
+        Args:
+            prompt: The input text to send to the API
+            use_cache: Set to False to always call the provider
+            
+        Returns:
+            Dict with "text", "raw_response" and "cached" keys
+        """
+        key = self.cache_key(prompt)
+        cache = get_response_cache() if use_cache else None
+        if cache is not None:
+            cached = await asyncio.to_thread(cache.get, key)
+            self._count_cache_lookup(cached)
+            if cached is not None:
+                logger.info(f"Cache hit for {self.provider_name}/{self.model}")
+                return {**cached, "cached": True}
+        
+        async def fetch() -> Dict[str, Any]:
+            response = await self.resilient_acall_api(prompt)
+            if cache is not None:
+                await asyncio.to_thread(cache.put, key, response, self.provider_name, self.model, self.temperature)
+            return response
+        
+        response = await llm_single_flight.do(key, fetch)
+        return {**response, "cached": False}
+        
+    async def cached_astream_api(self, prompt: str, use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Stream the response text through the persistent response cache.
+        
+        A cached response is yielded as a single chunk. Otherwise the
+        provider's chunks are yielded as they arrive and the complete text
+        is cached once the stream finishes.
+        
+        Args:
+            prompt: The input text to send to the API
+            use_cache: Set to False to always call the provider
+            
+        Yields:
+            Chunks of the generated text
+        """
+        key = self.cache_key(prompt)
+        cache = get_response_cache() if use_cache else None
+        if cache is not None:
+            cached = await asyncio.to_thread(cache.get, key)
+            self._count_cache_lookup(cached)
+            if cached is not None:
+                logger.info(f"Cache hit for {self.provider_name}/{self.model}")
+                yield cached["text"]
+                return
+        
+        chunks = []
+        async for chunk in self.resilient_astream_api(prompt):
+            chunks.append(chunk)
+            yield chunk
+        
+        if cache is not None:
+            response = {"text": "".join(chunks), "raw_response": None}
+            await asyncio.to_thread(cache.put, key, response, self.provider_name, self.model, self.temperature)
+        
+    def _count_cache_lookup(self, cached: Optional[Dict[str, Any]]) -> None:
+        cache_lookups.inc(provider=self.provider_name, model=self.model,
+                          result="miss" if cached is None else "hit")
+        
+    def resilient_call_api(self, prompt: str) -> Dict[str, Any]:
+        """call_api with the provider's rate limit, retries and circuit breaker."""
+        tokens = estimate_tokens(prompt, self.max_output_tokens)
+
+        def admit() -> None:
+            # Every attempt, retries included, takes its share of the quota
+            start = time.perf_counter()
+            get_rate_limiter(self.provider_name).acquire_sync(tokens)
+            llm_rate_limit_wait.observe(time.perf_counter() - start, provider=self.provider_name, model=self.model)
+
+        with LLMCallTracker(self.provider_name, self.model, prompt) as call:
+            response = get_resilience(self.provider_name).call_sync(lambda: self.call_api(prompt), admit)
+            call.add_response(response["text"])
+        return response
+        
+    async def _admit(self, tokens: int) -> None:
+        """Wait for the provider's rate limiter before one attempt."""
+        start = time.perf_counter()
+        await get_rate_limiter(self.provider_name).acquire(tokens)
+        llm_rate_limit_wait.observe(time.perf_counter() - start, provider=self.provider_name, model=self.model)
+        
+    async def resilient_acall_api(self, prompt: str) -> Dict[str, Any]:
+        """acall_api with the provider's rate limit, retries and circuit breaker."""
+        tokens = estimate_tokens(prompt, self.max_output_tokens)
+        with LLMCallTracker(self.provider_name, self.model, prompt) as call:
+            response = await get_resilience(self.provider_name).call(
+                lambda: self.acall_api(prompt), lambda: self._admit(tokens))
+            call.add_response(response["text"])
+        return response
+        
+    async def resilient_astream_api(self, prompt: str) -> AsyncIterator[str]:
+        """astream_api with the provider's rate limit, retries and circuit breaker."""
+        tokens = estimate_tokens(prompt, self.max_output_tokens)
+        with LLMCallTracker(self.provider_name, self.model, prompt) as call:
+            async for chunk in get_resilience(self.provider_name).stream(
+                    lambda: self.astream_api(prompt), lambda: self._admit(tokens)):
+                call.add_response(chunk)
+                yield chunk
+        
+    def cache_key(self, prompt: str) -> str:
+        """Response cache key for a prompt sent with this provider's settings."""
+        return make_cache_key(self.provider_name, self.model, self.temperature, prompt,
+                              self.max_output_tokens, self.top_k)
+        
+    def parse_response(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extract the generated text from a chat completions response
+        Override this method for providers with different response formats
+        """
+        if 'choices' in result and len(result['choices']) > 0:
+            # Return both the text and raw response
+            return {
+                "text": result['choices'][0]['message']['content'],
+                "raw_response": result
+            }
+        logger.error(f"Unexpected response format: {result}")
+        raise Exception(f"Unexpected response format: {result}")
+        
+    async def acall_api(self, prompt: str) -> Dict[str, Any]:
+        """
+        Call the API asynchronously over the shared pooled HTTP client.
+        
+        Args:
+            prompt: The input text to send to the API
+            
+        Returns:
+            Dict with the generated "text" and the JSON "raw_response"
+            
+        Raises:
+            Exception: If there's an error calling the API
+        """
+        logger.info(f"{type(self).__name__}.acall_api called with prompt: {prompt[:50]}...")
+        try:
+            response = await get_http_client().post(
+                self.api_url,
+                headers=self.prepare_headers(),
+                json=self.prepare_payload(prompt)
+            )
+            response.raise_for_status()
+            return self.parse_response(response.json())
+        except Exception as e:
+            logger.error(f"Error calling API: {e}")
+            error = classify_error(e)
+            raise ProviderError(f"Error calling API: {e}", error.status_code,
+                                error.retry_after, error.retryable) from e
+        
+    async def astream_api(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream the response text from an OpenAI-compatible chat completions
+        endpoint (server-sent events with "stream": true).
+        Override this method for providers with a different streaming API
+        
+        Args:
+            prompt: The input text to send to the API
+            
+        Yields:
+            Chunks of the generated text
+            
+        Raises:
+            Exception: If there's an error calling the API
+        """
+        logger.info(f"{type(self).__name__}.astream_api called with prompt: {prompt[:50]}...")
+        payload = {**self.prepare_payload(prompt), "stream": True}
+        try:
+            async with get_http_client().stream(
+                "POST", self.api_url, headers=self.prepare_headers(), json=payload
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        yield content
+        except Exception as e:
+            logger.error(f"Error streaming from API: {e}")
+            error = classify_error(e)
+            raise ProviderError(f"Error streaming from API: {e}", error.status_code,
+                                error.retry_after, error.retryable) from e
+        
+    def call_api(self, prompt: str) -> Dict[str, Any]:
         """
         Call the API with the given prompt.
         
@@ -69,7 +335,7 @@ class BaseLLM(BaseModel):
             prompt: The input text to send to the API
             
         Returns:
-            str: The generated text response
+            Dict with the generated "text" and the JSON "raw_response"
             
         Raises:
             Exception: If there's an error calling the API
@@ -87,20 +353,14 @@ class BaseLLM(BaseModel):
                 self.api_url,
                 headers=headers,
                 json=payload,
-                timeout=30
+                timeout=get_resilience(self.provider_name).attempt_timeout
             )
             
             response.raise_for_status()
-            result = response.json()
-            
-            # Extract text from response
-            if 'choices' in result and len(result['choices']) > 0:
-                # Return both the text and raw response
-                return result['choices'][0]['message']['content']
-            else:
-                logger.error(f"Unexpected response format: {result}")
-                raise Exception(f"Unexpected response format: {result}")
+            return self.parse_response(response.json())
                 
         except Exception as e:
             logger.error(f"Error calling API: {e}")
-            raise Exception(f"Error calling API: {e}") 
\ No newline at end of file
+            error = classify_error(e)
+            raise ProviderError(f"Error calling API: {e}", error.status_code,
+                                error.retry_after, error.retryable) from e 
\ No newline at end of file
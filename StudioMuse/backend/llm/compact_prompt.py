@@ -0,0 +1,147 @@
+"""
+Compact prompt protocol for palette demystification.
+
+GIMP colors are sent as a table of integer ids with 3-decimal RGB values
+and physical colors as an indexed list. The model replies with
+[id, physical_index, suggestion] tuples (or [id, suggestion] for mixing
+suggestions), which are rehydrated into the usual mapping entries. Ids are
+positions in the list of names the prompt was built for.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from core.utils.color_science import format_rgb_string, rgb_dict_to_tuple
+
+from .metrics import json_parse_failures
+from .prompts import palette_dm_compact_prompt, mixing_suggestions_compact_prompt
+
+logger = logging.getLogger(__name__)
+
+# Rough output tokens per [id, physical_index, suggestion] reply entry,
+# versus fan_out.TOKENS_PER_ENTRY for the verbose object format
+TOKENS_PER_ENTRY = 25
+
+
+def encode_color_table(colors: Dict[str, Dict[str, float]], names: List[str],
+                       extra: Optional[List[Any]] = None) -> str:
+    """
+    Render colors as one "id r g b" line each.
+
+    Args:
+        colors: Mapping of color names to RGB dictionaries
+        names: Names to include, in id order
+        extra: Optional extra column, one value per name
+
+    Returns:
+        The color table
+    """
+    lines = []
+    for index, name in enumerate(names):
+        r, g, b = rgb_dict_to_tuple(colors[name])
+        line = f"{index} {r:.3f} {g:.3f} {b:.3f}"
+        if extra is not None:
+            line += f" {extra[index]}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def encode_physical_list(physical_names: List[str]) -> str:
+    """Render physical color names as one "index name" line each."""
+    return "\n".join(f"{index} {name}" for index, name in enumerate(physical_names))
+
+
+def demystify_prompt(colors: Dict[str, Dict[str, float]], names: List[str],
+                     physical_names: List[str]) -> str:
+    """Prompt asking the model to match and explain the given colors."""
+    return palette_dm_compact_prompt.format(
+        color_table=encode_color_table(colors, names),
+        physical_list=encode_physical_list(physical_names)
+    )
+
+
+def mixing_prompt(colors: Dict[str, Dict[str, float]], matches: List[Dict[str, Any]],
+                  physical_names: List[str]) -> str:
+    """Prompt asking the model for mixing suggestions for colors matched locally."""
+    indices = {name: index for index, name in enumerate(physical_names)}
+    return mixing_suggestions_compact_prompt.format(
+        color_table=encode_color_table(
+            colors,
+            [match["gimp_color_name"] for match in matches],
+            [indices.get(match["physical_color_name"], "?") for match in matches]
+        ),
+        physical_list=encode_physical_list(physical_names)
+    )
+
+
+def _to_index(value: Any, size: int) -> Optional[int]:
+    """An in-range integer index from a reply value, or None."""
+    try:
+        index = int(value)
+    except (TypeError, ValueError):
+        return None
+    return index if 0 <= index < size else None
+
+
+def decode_mappings(names: List[str], colors: Dict[str, Dict[str, float]],
+                    physical_names: List[str], items: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Rehydrate [id, physical_index, suggestion] tuples into mapping entries.
+
+    Args:
+        names: Names the prompt was built for (ids index into this list)
+        colors: Mapping of color names to RGB dictionaries
+        physical_names: Physical color names (physical indices index into this list)
+        items: Parsed elements of the reply array
+
+    Returns:
+        Entries with gimp_color_name, rgb_color, physical_color_name and mixing_suggestions
+    """
+    entries = []
+    for item in items:
+        if isinstance(item, dict):
+            # The model ignored the compact format; keep a full entry as it is
+            entries.append(item)
+            continue
+        if not isinstance(item, list) or len(item) < 3:
+            json_parse_failures.inc(kind="compact_entry")
+            logger.warning(f"Skipping malformed compact entry: {item!r}")
+            continue
+        index = _to_index(item[0], len(names))
+        physical_index = _to_index(item[1], len(physical_names))
+        if index is None or physical_index is None:
+            json_parse_failures.inc(kind="compact_entry")
+            logger.warning(f"Skipping compact entry with an unknown id: {item!r}")
+            continue
+        name = names[index]
+        entries.append({
+            "gimp_color_name": name,
+            "rgb_color": format_rgb_string(rgb_dict_to_tuple(colors[name])),
+            "physical_color_name": physical_names[physical_index],
+            "mixing_suggestions": str(item[2])
+        })
+    return entries
+
+
+def decode_suggestions(names: List[str], items: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Rehydrate [id, suggestion] tuples into mixing suggestion entries.
+
+    Args:
+        names: Names the prompt was built for (ids index into this list)
+        items: Parsed elements of the reply array
+
+    Returns:
+        Entries with gimp_color_name and mixing_suggestions
+    """
+    entries = []
+    for item in items:
+        if isinstance(item, dict):
+            entries.append(item)
+            continue
+        index = _to_index(item[0], len(names)) if isinstance(item, list) and len(item) >= 2 else None
+        if index is None:
+            json_parse_failures.inc(kind="compact_entry")
+            logger.warning(f"Skipping malformed compact entry: {item!r}")
+            continue
+        entries.append({"gimp_color_name": names[index], "mixing_suggestions": str(item[-1])})
+    return entries
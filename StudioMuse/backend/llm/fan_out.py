@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from .response_cache import get_response_cache
+from .stream_parser import JsonArrayStreamParser
+
+logger = logging.getLogger(__name__)
+
+# Rough output tokens per color mapping entry (name, RGB string, physical
+# color and a one-sentence mixing suggestion)
+TOKENS_PER_ENTRY = 60
+
+# Share of max_output_tokens a chunk's reply may use, leaving headroom
+OUTPUT_BUDGET = 0.75
+
+# Defaults, overridable through the "llm" section of the backend config
+MAX_CHUNK_SIZE = 32
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def chunk_size_for(llm, tokens_per_entry: int = TOKENS_PER_ENTRY) -> int:
+    """
+    Largest number of colors whose reply fits the provider's output budget.
+
+    Args:
+        llm: Provider instance (its max_output_tokens is used)
+        tokens_per_entry: Estimated output tokens per color
+
+    Returns:
+        Chunk size between 1 and MAX_CHUNK_SIZE
+    """
+    budget = (llm.max_output_tokens or 500) * OUTPUT_BUDGET
+    return max(1, min(MAX_CHUNK_SIZE, int(budget // tokens_per_entry)))
+
+
+def split_chunks(names: List[str], chunk_size: int) -> List[List[str]]:
+    """Split names into ordered chunks of at most chunk_size, balanced in size."""
+    if not names:
+        return []
+    count = math.ceil(len(names) / chunk_size)
+    size = math.ceil(len(names) / count)
+    return [names[i:i + size] for i in range(0, len(names), size)]
+
+
+def dict_entries(names: List[str], items: List[Any]) -> List[Dict[str, Any]]:
+    """Default reply decoder: keep the object elements as entries."""
+    return [item for item in items if isinstance(item, dict)]
+
+
+def match_entries(names: List[str], entries: List[Dict[str, Any]], key_field: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Pair reply entries with the requested names.
+
+    Entries are matched on key_field; if none match but the reply has one
+    entry per name, they are paired by position instead.
+    """
+    by_name = {entry.get(key_field): entry for entry in entries}
+    matched = {name: by_name[name] for name in names if name in by_name}
+    if not matched and len(entries) == len(names):
+        matched = {name: {**entry, key_field: name} for name, entry in zip(names, entries)}
+    return matched
+
+
+@dataclass
+class ChunkResult:
+    """Outcome of one chunk after all attempts."""
+    index: int
+    names: List[str]
+    entries: List[Dict[str, Any]] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    raw_responses: List[Any] = field(default_factory=list)
+    cached: bool = True
+    attempts: int = 0
+    error: Optional[Exception] = None
+
+
+@dataclass
+class FanOutResult:
+    """Merged outcome of all chunks, in the original color order."""
+    entries: List[Dict[str, Any]]
+    missing: List[str]
+    raw_responses: List[Any]
+    cached: bool
+    chunks: int
+
+
+class ChunkedFanOut:
+    """
+    Splits a list of colors into chunks sized for the provider's output
+    limit, sends one prompt per chunk concurrently (at most max_concurrency
+    at a time) and re-requests only the colors a chunk's reply left out.
+    """
+
+    def __init__(self, llm, build_prompt: Callable[[List[str]], str],
+                 key_field: str = "gimp_color_name",
+                 decode: Optional[Callable[[List[str], List[Any]], List[Dict[str, Any]]]] = None,
+                 chunk_size: Optional[int] = None,
+                 tokens_per_entry: int = TOKENS_PER_ENTRY,
+                 max_concurrency: Optional[int] = None,
+                 max_attempts: Optional[int] = None):
+        """
+        Args:
+            llm: Provider instance
+            build_prompt: Builds the prompt for a list of color names
+            key_field: Reply field holding the color name
+            decode: Turns the reply's array elements into entries, given the
+                names the prompt was built for (defaults to keeping objects)
+            chunk_size: Colors per chunk (defaults to the config, else chunk_size_for)
+            tokens_per_entry: Estimated output tokens per color, used by chunk_size_for
+            max_concurrency: Maximum chunks in flight at once
+            max_attempts: Attempts per chunk at completing an incomplete reply
+        """
+        from config import config
+
+        self.llm = llm
+        self.build_prompt = build_prompt
+        self.key_field = key_field
+        self.decode = decode or dict_entries
+        self.chunk_size = chunk_size or config.get("llm.chunk_size") or \
+            chunk_size_for(llm, tokens_per_entry)
+        self.max_concurrency = max_concurrency or config.get("llm.max_concurrency", DEFAULT_MAX_CONCURRENCY)
+        self.max_attempts = max_attempts or config.get("llm.chunk_attempts", DEFAULT_MAX_ATTEMPTS)
+
+    async def _run_chunk(self, index: int, names: List[str], semaphore: asyncio.Semaphore) -> ChunkResult:
+        """Request one chunk, retrying with just the colors still missing."""
+        result = ChunkResult(index=index, names=names, missing=list(names))
+        found: Dict[str, Dict[str, Any]] = {}
+
+        while result.missing and result.attempts < self.max_attempts:
+            result.attempts += 1
+            prompt = self.build_prompt(result.missing)
+            try:
+                async with semaphore:
+                    response = await self.llm.cached_acall_api(prompt)
+            except Exception as e:
+                # Provider failures were already retried by the resilience layer
+                result.error = e
+                logger.warning(f"Chunk {index} failed: {e}")
+                break
+
+            elements = JsonArrayStreamParser().feed(response["text"])
+            matched = match_entries(result.missing, self.decode(result.missing, elements), self.key_field)
+            if len(matched) < len(result.missing):
+                # Do not serve an incomplete reply from the cache on the retry
+                cache = get_response_cache()
+                if cache is not None:
+                    await asyncio.to_thread(cache.delete, self.llm.cache_key(prompt))
+                logger.warning(f"Chunk {index} returned {len(matched)} of {len(result.missing)} colors")
+
+            found.update(matched)
+            result.raw_responses.append(response["raw_response"])
+            result.cached = result.cached and response["cached"]
+            result.missing = [name for name in result.missing if name not in found]
+
+        result.entries = [found[name] for name in names if name in found]
+        return result
+
+    async def iter_chunks(self, names: List[str]) -> AsyncIterator[ChunkResult]:
+        """
+        Run all chunks concurrently and yield their results in the original order.
+
+        Args:
+            names: Color names, in display order
+
+        Yields:
+            ChunkResult for each chunk, in order
+        """
+        chunks = split_chunks(list(names), self.chunk_size)
+        logger.info(f"Fanning out {len(names)} colors as {len(chunks)} chunks "
+                    f"of up to {self.chunk_size} ({self.max_concurrency} in parallel)")
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [asyncio.ensure_future(self._run_chunk(i, chunk, semaphore)) for i, chunk in enumerate(chunks)]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            # The consumer stopped early (e.g. the client disconnected)
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, names: List[str]) -> FanOutResult:
+        """
+        Run all chunks and merge their results.
+
+        Args:
+            names: Color names, in display order
+
+        Returns:
+            FanOutResult with entries in the original order
+
+        Raises:
+            Exception: If the provider calls failed and no chunk produced any entry
+        """
+        entries, missing, raw_responses, cached, chunks, errors = [], [], [], True, 0, []
+        async for result in self.iter_chunks(names):
+            entries.extend(result.entries)
+            missing.extend(result.missing)
+            raw_responses.extend(result.raw_responses)
+            cached = cached and result.cached
+            chunks += 1
+            if result.error:
+                errors.append(result.error)
+
+        if names and not entries and errors:
+            raise errors[-1]
+        if missing:
+            logger.warning(f"{len(missing)} colors missing after {self.max_attempts} attempts: {missing}")
+        return FanOutResult(entries, missing, raw_responses, cached, chunks)
@@ -1,16 +1,43 @@
 import os
 import logging
-from typing import Any, Dict, Optional, List
+import threading
+from typing import Any, AsyncIterator, ClassVar, Dict, Optional, List
 from pydantic import PrivateAttr
 from .base_llm import BaseLLM
+from .resilience import get_resilience
 
 logger = logging.getLogger(__name__)
 
+# genai clients shared by all GeminiLLM instances, keyed by API key
+_genai_clients: Dict[Optional[str], Any] = {}
+_genai_clients_lock = threading.Lock()
+
+
+def get_genai_client(api_key: Optional[str]) -> Any:
+    """
+    Return the shared genai client for an API key, creating it on first use.
+    The client's connection pool (and its async .aio interface) is reused
+    by every model and temperature. Its HTTP timeout is the resilience
+    attempt timeout, which a blocking call_api cannot enforce otherwise.
+    """
+    with _genai_clients_lock:
+        if api_key not in _genai_clients:
+            from google import genai
+            from google.genai import types
+            timeout = get_resilience(GeminiLLM.provider_name).attempt_timeout
+            _genai_clients[api_key] = genai.Client(
+                api_key=api_key, http_options=types.HttpOptions(timeout=int(timeout * 1000))
+            )
+            logger.info("Created shared Gemini client")
+        return _genai_clients[api_key]
+
+
 class GeminiLLM(BaseLLM):
     """
     Simple wrapper for Google Gemini API. 
     Focused on providing text completion capabilities.
     """
+    provider_name: ClassVar[str] = "gemini"
     _client: Any = PrivateAttr()  # Use PrivateAttr for the genai client
 
     def __init__(self, 
@@ -37,10 +64,8 @@ class GeminiLLM(BaseLLM):
         
         # Initialize the client
         try:
-            from google import genai
-            from google.genai import types
             # Initialize client as a private attribute
-            self._client = genai.Client(api_key=self.api_key)
+            self._client = get_genai_client(self.api_key)
             
             logger.info(f"Initialized Gemini LLM with model: {self.model}")
         except ImportError as e:
@@ -51,6 +76,35 @@ class GeminiLLM(BaseLLM):
             logger.error(f"Error initializing Gemini LLM: {e}")
             raise
             
+    def _generation_config(self) -> Any:
+        """Create the generation config for a request."""
+        # Import here to avoid circular imports
+        from google.genai import types
+        
+        return types.GenerateContentConfig(
+            temperature=self.temperature,
+            max_output_tokens=self.max_output_tokens,
+            top_p=0.95,
+            top_k=0
+        )
+
+    def warm_up(self) -> None:
+        """Import the genai types module now rather than on the first request."""
+        self._generation_config()
+
+    @staticmethod
+    def _format_response(response: Any) -> Dict[str, Any]:
+        """
+        Return both the raw response and the text; the raw response is
+        converted to plain JSON so it can be returned and cached.
+        """
+        raw_response = response.model_dump(mode="json", exclude_none=True) \
+            if hasattr(response, "model_dump") else str(response)
+        return {
+            "text": response.text,
+            "raw_response": raw_response
+        }
+            
     def call_api(self, prompt: str) -> Dict[str, Any]:
         """
         Call the Gemini API with the given prompt.
@@ -59,32 +113,59 @@ class GeminiLLM(BaseLLM):
             prompt: The text prompt to send to the API
             
         Returns:
-            A dictionary containing both the raw response and the extracted text
+            A dictionary containing both the JSON-serializable raw response and the extracted text
         """
         try:
-            # Import here to avoid circular imports
-            from google.genai import types
-            
-            # Create a generation config
-            generation_config = types.GenerateContentConfig(
-                temperature=self.temperature,
-                max_output_tokens=self.max_output_tokens,
-                top_p=0.95,
-                top_k=0
-            )
-            
-            # Generate content
             response = self._client.models.generate_content(
                 model=self.model,
                 contents=[prompt], 
-                config=generation_config
+                config=self._generation_config()
             )
+            return self._format_response(response)
+        except Exception as e:
+            logger.error(f"Error calling Gemini API: {e}")
+            raise
             
-            # Return both the raw response and the text
-            return {
-                "text": response.text,
-                "raw_response": response
-            }
+    async def acall_api(self, prompt: str) -> Dict[str, Any]:
+        """
+        Call the Gemini API with the given prompt using the async client.
+        
+        Args:
+            prompt: The text prompt to send to the API
+            
+        Returns:
+            A dictionary containing both the JSON-serializable raw response and the extracted text
+        """
+        try:
+            response = await self._client.aio.models.generate_content(
+                model=self.model,
+                contents=[prompt], 
+                config=self._generation_config()
+            )
+            return self._format_response(response)
         except Exception as e:
             logger.error(f"Error calling Gemini API: {e}")
-            raise 
\ No newline at end of file
+            raise 
+            
+    async def astream_api(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream the Gemini response text as it is generated.
+        
+        Args:
+            prompt: The text prompt to send to the API
+            
+        Yields:
+            Chunks of the generated text
+        """
+        try:
+            stream = await self._client.aio.models.generate_content_stream(
+                model=self.model,
+                contents=[prompt], 
+                config=self._generation_config()
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            logger.error(f"Error streaming from Gemini API: {e}")
+            raise
@@ -0,0 +1,68 @@
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Connection pool shared by all REST-based LLM providers
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def create_http_client(http2: bool = True) -> httpx.AsyncClient:
+    """
+    Create a pooled async HTTP client with keep-alive connections.
+
+    HTTP/2 requires the optional "h2" package (installed with httpx[http2]);
+    without it the client falls back to HTTP/1.1 keep-alive.
+
+    Args:
+        http2: Negotiate HTTP/2 where the server supports it
+
+    Returns:
+        httpx.AsyncClient instance
+    """
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY
+    )
+    try:
+        return httpx.AsyncClient(http2=http2, limits=limits, timeout=DEFAULT_TIMEOUT)
+    except ImportError:
+        logger.warning("HTTP/2 support is not installed (pip install 'httpx[http2]'); using HTTP/1.1")
+        return httpx.AsyncClient(limits=limits, timeout=DEFAULT_TIMEOUT)
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """Create the shared client; called once at application startup."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+        logger.info("Started shared async HTTP client")
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared async HTTP client, creating it if the application
+    startup hook has not run (e.g. when providers are used from a script).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client and its pooled connections; called at shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Closed shared async HTTP client")
@@ -1,56 +1,154 @@
-from typing import Dict, Type, Optional, Any
+from collections import OrderedDict
+from typing import Dict, Type, Optional, Any, List
 import logging
+import threading
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pooled instances kept at most, overridable through llm.max_instances
+DEFAULT_MAX_INSTANCES = 16
+
+# Providers created at application startup, overridable through llm.warm_up
+DEFAULT_WARM_UP = ["gemini", "perplexity", "auto"]
+
 class LLMServiceProvider:
-    """Factory class for LLM service instances."""
-    
-    _instances = {}
+    """
+    Factory and pool of LLM service instances.
+
+    One instance is kept per provider and construction arguments (model,
+    API key, ...), in a bounded least-recently-used pool. Per-request
+    parameters such as temperature are not part of the pool key: they are
+    applied to a request-scoped copy (BaseLLM.with_params) that shares the
+    pooled instance's client, so varying them never creates new clients.
+    The pool is safe to use from the FastAPI threadpool and the event loop.
+    """
+
+    _instances = OrderedDict()  # (provider name, constructor arguments) -> instance, oldest first
     _providers = {}
     _initialized = False
-    
+    # Reentrant: AutoLLM fetches its candidate providers while being created
+    _lock = threading.RLock()
+    _created = 0
+    _evicted = 0
+
     @classmethod
     def register_provider(cls, name: str, provider_class: Type):
-        """Register a new LLM provider."""
-        cls._providers[name] = provider_class
+        """Register a new LLM provider, replacing any pooled instances of an earlier registration."""
+        with cls._lock:
+            cls._providers[name] = provider_class
+            for key in [key for key in cls._instances if key[0] == name]:
+                del cls._instances[key]
         logger.info(f"Registered LLM provider: {name}")
-    
+
     @classmethod
     def get_llm(cls, provider_name: str, **kwargs) -> Any:
-        """Get an instance of the specified LLM provider."""
-        # Ensure providers are initialized
-        if not cls._initialized:
-            cls._initialize_providers()
-            
-        if provider_name not in cls._providers:
-            raise ValueError(f"Unknown LLM provider: {provider_name}")
-        
-        # Create a unique key based on provider name and parameters
-        param_str = "-".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
-        key = f"{provider_name}:{param_str}"
-        
-        # Create new instance if not exists
-        if key not in cls._instances:
+        """
+        Get an instance of the specified LLM provider.
+
+        Args:
+            provider_name: Registered provider name
+            **kwargs: Constructor arguments; per-request parameters
+                (temperature, max_output_tokens, top_k) are applied to a
+                request-scoped copy instead of creating a new instance
+
+        Returns:
+            The pooled instance, or a copy of it with the requested parameters
+
+        Raises:
+            ValueError: If the provider is unknown
+        """
+        from .base_llm import BaseLLM
+
+        params = {name: kwargs.pop(name) for name in BaseLLM.CALL_PARAMS if name in kwargs}
+        llm = cls._get_pooled(provider_name, kwargs)
+        return llm.with_params(**params) if params else llm
+
+    @classmethod
+    def _get_pooled(cls, provider_name: str, kwargs: Dict[str, Any]) -> Any:
+        """Return the pooled instance for a provider and constructor arguments, creating it if needed."""
+        key = (provider_name, "-".join(f"{k}={v}" for k, v in sorted(kwargs.items())))
+        with cls._lock:
+            # Ensure providers are initialized
+            if not cls._initialized:
+                cls._initialize_providers()
+
+            if provider_name not in cls._providers:
+                raise ValueError(f"Unknown LLM provider: {provider_name}")
+
+            llm = cls._instances.get(key)
+            if llm is not None:
+                cls._instances.move_to_end(key)
+                return llm
+
             try:
-                provider_class = cls._providers[provider_name]
-                cls._instances[key] = provider_class(**kwargs)
-                logger.info(f"Created new {provider_name} LLM instance")
+                llm = cls._providers[provider_name](**kwargs)
             except Exception as e:
                 logger.error(f"Error creating LLM instance: {e}")
                 raise
-            
-        return cls._instances[key]
-    
+            cls._instances[key] = llm
+            cls._created += 1
+            logger.info(f"Created new {provider_name} LLM instance")
+
+            while len(cls._instances) > cls._max_instances():
+                evicted, _ = cls._instances.popitem(last=False)
+                cls._evicted += 1
+                logger.info(f"Evicted pooled LLM instance {evicted[0]} ({evicted[1] or 'defaults'})")
+            return llm
+
+    @staticmethod
+    def _max_instances() -> int:
+        from config import config
+
+        return max(1, int(config.get("llm.max_instances", DEFAULT_MAX_INSTANCES)))
+
+    @classmethod
+    def warm_up(cls, provider_names: Optional[List[str]] = None) -> List[str]:
+        """
+        Create and warm the pooled instances ahead of the first request,
+        so no request pays for SDK imports or client construction.
+        Providers that cannot be created (missing package or key) are
+        skipped with a warning.
+
+        Args:
+            provider_names: Providers to warm (defaults to the llm.warm_up config)
+
+        Returns:
+            Names of the providers that are ready
+        """
+        from config import config
+
+        ready = []
+        for name in provider_names or config.get("llm.warm_up", DEFAULT_WARM_UP):
+            try:
+                cls.get_llm(name).warm_up()
+                ready.append(name)
+            except Exception as e:
+                logger.warning(f"Could not warm up LLM provider {name}: {e}")
+        logger.info(f"Warmed up LLM providers: {ready}")
+        return ready
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Pooled instances and pool counters."""
+        with cls._lock:
+            return {
+                "instances": [f"{name}:{params}" if params else name for name, params in cls._instances],
+                "max_instances": cls._max_instances(),
+                "created": cls._created,
+                "evicted": cls._evicted
+            }
+
     @classmethod
     def _initialize_providers(cls):
         """Initialize the available LLM providers."""
         from .perplexity_llm import PerplexityLLM
         from .gemini_llm import GeminiLLM
-        
+        from .router import AutoLLM
+
         cls.register_provider('perplexity', PerplexityLLM)
         cls.register_provider('gemini', GeminiLLM)
+        cls.register_provider('auto', AutoLLM)
         cls._initialized = True
-        logger.info("LLM providers initialized") 
\ No newline at end of file
+        logger.info("LLM providers initialized")
@@ -0,0 +1,234 @@
+"""
+Minimal Prometheus-style metrics: counters, gauges and histograms with
+labels, rendered in the text exposition format by render_metrics().
+
+Recording is a dict lookup and a few additions under a per-metric lock,
+so it is cheap enough for the request hot path. Gauges whose value lives
+elsewhere (queue depths) are read through a callback at scrape time
+instead of being updated on every change.
+"""
+import asyncio
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds: from cache hits to slow provider generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Characters: prompts and replies from one color to a few hundred
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, either set directly or read from a callback."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        """
+        Args:
+            callback: Returns label values -> value at scrape time, instead of inc/dec/set
+        """
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> Iterable[str]:
+        if self._callback is not None:
+            values = self._callback()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, with sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last is +Inf)..., sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = {key: list(counts) for key, counts in self._values.items()}
+        for key, counts in sorted(values.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), counts[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(counts[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(cumulative)}"
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+# HTTP layer
+http_requests = registry.register(Counter(
+    "studiomuse_http_requests_total", "HTTP requests by route, method and status",
+    ("endpoint", "method", "status")))
+http_request_duration = registry.register(Histogram(
+    "studiomuse_http_request_duration_seconds", "HTTP request latency until the response is complete",
+    ("endpoint", "method")))
+http_in_flight = registry.register(Gauge(
+    "studiomuse_http_requests_in_flight", "HTTP requests being handled"))
+
+# Provider calls
+llm_calls = registry.register(Counter(
+    "studiomuse_llm_calls_total", "Provider calls (after retries) by outcome",
+    ("provider", "model", "outcome")))
+llm_call_duration = registry.register(Histogram(
+    "studiomuse_llm_call_duration_seconds", "Provider call latency including retries and rate limiter waits",
+    ("provider", "model")))
+llm_calls_in_flight = registry.register(Gauge(
+    "studiomuse_llm_calls_in_flight", "Provider calls in progress", ("provider", "model")))
+llm_prompt_chars = registry.register(Histogram(
+    "studiomuse_llm_prompt_chars", "Prompt size in characters", ("provider", "model"), SIZE_BUCKETS))
+llm_response_chars = registry.register(Histogram(
+    "studiomuse_llm_response_chars", "Response size in characters", ("provider", "model"), SIZE_BUCKETS))
+llm_rate_limit_wait = registry.register(Histogram(
+    "studiomuse_llm_rate_limit_wait_seconds", "Time spent queued by the provider rate limiter",
+    ("provider", "model")))
+
+# Response handling
+json_parse_failures = registry.register(Counter(
+    "studiomuse_json_parse_failures_total", "Reply elements that could not be parsed or decoded", ("kind",)))
+cache_lookups = registry.register(Counter(
+    "studiomuse_cache_lookups_total", "Response cache lookups by result", ("provider", "model", "result")))
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    return registry.render()
+
+
+class LLMCallTracker:
+    """Records one provider call: in-flight gauge, latency, outcome and sizes."""
+
+    def __init__(self, provider: str, model: str, prompt: str):
+        self.labels = {"provider": provider, "model": model}
+        self.prompt_chars = len(prompt)
+        self.response_chars = 0
+
+    def __enter__(self) -> "LLMCallTracker":
+        self._start = time.perf_counter()
+        llm_calls_in_flight.inc(**self.labels)
+        return self
+
+    def add_response(self, text: str) -> None:
+        self.response_chars += len(text or "")
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        llm_calls_in_flight.dec(**self.labels)
+        llm_call_duration.observe(time.perf_counter() - self._start, **self.labels)
+        llm_prompt_chars.observe(self.prompt_chars, **self.labels)
+        if exc_type is None:
+            outcome = "success"
+            llm_response_chars.observe(self.response_chars, **self.labels)
+        else:
+            outcome = "cancelled" if issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)) else "error"
+        llm_calls.inc(outcome=outcome, **self.labels)
@@ -1,6 +1,6 @@
 import os
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, ClassVar
 from .base_llm import BaseLLM
 
 # Configure logging
@@ -8,6 +8,8 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class PerplexityLLM(BaseLLM):
+    provider_name: ClassVar[str] = "perplexity"
+
     def __init__(self, 
                  model: str = "sonar-pro",
                  temperature: float = 0.0,
@@ -50,4 +50,56 @@ Guidelines:
 - Only include official color names; avoid general descriptions.
 - Ensure the output is formatted exactly as specified.
 - Do not include any other text or commentary in your response outside of the JSON format.
-""" 
\ No newline at end of file
+"""
+
+# Prompt for mixing suggestions once colors have been matched locally
+mixing_suggestions_prompt = """
+You are an expert in the arts and know everything there is to know about color. Each RGB color from GIMP below
+has already been matched to the closest color in the user's physical palette. Your task is to explain how the
+artist can mix colors from their physical palette to get even closer to each RGB color.
+
+Matched Colors:
+{matched_colors}
+
+Physical Palette Colors:
+{entry_text}
+
+Respond ONLY with a JSON array containing objects with the following structure, and no additional text:
+[
+  {{
+    "gimp_color_name": "string",
+    "mixing_suggestions": "string"
+  }}
+]
+"""
+
+# Compact variant of palette_dm_prompt: colors and physical colors are referenced
+# by index so neither the prompt nor the reply repeats names or RGB strings
+palette_dm_compact_prompt = """
+You are a color expert. Match each GIMP color to the closest color in the user's physical palette and
+suggest how to mix it from the physical palette.
+
+GIMP colors (id r g b, sRGB 0-1):
+{color_table}
+
+Physical palette (index name):
+{physical_list}
+
+Reply ONLY with a JSON array holding one [id, physical_index, "mixing suggestion"] array per GIMP color,
+e.g. [[0, 3, "Burnt Sienna with a touch of white"]]. Use the integer ids and indices above. No other text.
+"""
+
+# Compact variant of mixing_suggestions_prompt
+mixing_suggestions_compact_prompt = """
+You are a color expert. Each GIMP color below has already been matched to the closest color in the user's
+physical palette. Explain how to mix colors from the physical palette to get even closer to each GIMP color.
+
+GIMP colors (id r g b matched_physical_index, sRGB 0-1):
+{color_table}
+
+Physical palette (index name):
+{physical_list}
+
+Reply ONLY with a JSON array holding one [id, "mixing suggestion"] array per GIMP color,
+e.g. [[0, "Add a little Ultramarine to deepen it"]]. Use the integer ids above. No other text.
+"""
@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .resilience import ProviderError
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the "rate_limit" section of the backend config
+DEFAULT_MAX_QUEUE = 100
+DEFAULT_QUEUE_TIMEOUT = 30.0
+
+# Rough prompt characters per token, used to estimate a request's token cost
+CHARS_PER_TOKEN = 4
+
+
+class RateLimitExceeded(ProviderError):
+    """Raised when a provider's request queue is full or a queued request waited too long."""
+
+    def __init__(self, provider: str, reason: str, retry_after: float):
+        super().__init__(
+            f"Provider {provider} is saturated ({reason}); retry in {math.ceil(retry_after)} s",
+            status_code=503, retry_after=retry_after, retryable=False
+        )
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+
+    The bucket starts full and holds at most one minute of tokens, so a
+    burst can use a full minute's quota at once and throughput then
+    settles at the configured rate. Not thread-safe; the owning
+    ProviderRateLimiter serializes access.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Seconds until amount tokens have been refilled (0 if they are available now).
+
+        Amounts above capacity are not clipped, so this is also the time a
+        backlog larger than the bucket needs to drain.
+        """
+        self._refill(now)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def admit_wait(self, amount: float, now: float) -> float:
+        """Seconds until a request of amount tokens may be admitted; oversized requests wait for a full bucket."""
+        return self.wait_time(min(amount, self.capacity), now)
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class ProviderRateLimiter:
+    """
+    Keeps one provider's traffic under its requests/min and tokens/min quota.
+
+    Requests that cannot be admitted right away wait in a bounded FIFO
+    queue: only the request at the head of the queue waits for the
+    buckets, so later requests never overtake earlier ones. A request is
+    rejected with RateLimitExceeded when the queue is full or when it has
+    waited longer than queue_timeout.
+    """
+
+    def __init__(self, provider: str, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 max_queue: int = DEFAULT_MAX_QUEUE, queue_timeout: float = DEFAULT_QUEUE_TIMEOUT):
+        """
+        Args:
+            provider: Provider name, used in errors and logs
+            requests_per_minute: Request quota (0 for no limit)
+            tokens_per_minute: Token quota (0 for no limit)
+            max_queue: Maximum requests waiting for admission
+            queue_timeout: Maximum seconds a request waits for admission
+        """
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._lock = threading.Lock()  # Guards the buckets and counters
+        self._async_head: Optional[asyncio.Lock] = None
+        self._sync_head = threading.Lock()
+        self._queued = 0
+        self._queued_tokens = 0.0
+
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def _try_admit(self, tokens: float) -> float:
+        """Take quota for one request, or return the seconds to wait before retrying."""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(
+                self.requests.admit_wait(1, now) if self.requests else 0.0,
+                self.tokens.admit_wait(tokens, now) if self.tokens else 0.0
+            )
+            if delay == 0.0:
+                if self.requests:
+                    self.requests.take(1)
+                if self.tokens:
+                    self.tokens.take(tokens)
+            return delay
+
+    def _drain_time(self) -> float:
+        """Estimated seconds until the current queue has been admitted."""
+        with self._lock:
+            now = time.monotonic()
+            return max(
+                self.requests.wait_time(self._queued + 1, now) if self.requests else 0.0,
+                self.tokens.wait_time(self._queued_tokens, now) if self.tokens else 0.0,
+                1.0
+            )
+
+    def _reject(self, reason: str) -> RateLimitExceeded:
+        with self._lock:
+            self.rejected += 1
+        error = RateLimitExceeded(self.provider, reason, self._drain_time())
+        logger.warning(str(error))
+        return error
+
+    def _enqueue(self, tokens: float) -> None:
+        with self._lock:
+            if self._queued >= self.max_queue:
+                full = True
+            else:
+                full = False
+                self._queued += 1
+                self._queued_tokens += tokens
+        if full:
+            raise self._reject(f"{self.max_queue} requests queued")
+
+    def _dequeue(self, tokens: float, waited: float, admitted: bool) -> None:
+        with self._lock:
+            self._queued -= 1
+            self._queued_tokens -= tokens
+            if admitted:
+                self.admitted += 1
+                self.total_wait += waited
+
+    async def acquire(self, tokens: float = 0) -> None:
+        """
+        Wait until the request may be sent to the provider.
+
+        Args:
+            tokens: Estimated tokens the request will use
+
+        Raises:
+            RateLimitExceeded: If the queue is full or the wait timed out
+        """
+        if not self.enabled:
+            return
+        if self._async_head is None:
+            self._async_head = asyncio.Lock()
+        self._enqueue(tokens)
+        start = time.monotonic()
+        admitted = False
+        try:
+            await asyncio.wait_for(self._wait_turn(tokens), self.queue_timeout)
+            admitted = True
+        except asyncio.TimeoutError:
+            raise self._reject(f"waited {self.queue_timeout:.0f} s in the queue") from None
+        finally:
+            self._dequeue(tokens, time.monotonic() - start, admitted)
+
+    async def _wait_turn(self, tokens: float) -> None:
+        # asyncio.Lock wakes waiters in FIFO order, so it doubles as the queue
+        async with self._async_head:
+            while True:
+                delay = self._try_admit(tokens)
+                if delay == 0.0:
+                    return
+                await asyncio.sleep(delay)
+
+    def acquire_sync(self, tokens: float = 0) -> None:
+        """Blocking version of acquire for the synchronous provider API."""
+        if not self.enabled:
+            return
+        self._enqueue(tokens)
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+        admitted = False
+        try:
+            if not self._sync_head.acquire(timeout=self.queue_timeout):
+                raise self._reject(f"waited {self.queue_timeout:.0f} s in the queue")
+            try:
+                while True:
+                    delay = self._try_admit(tokens)
+                    if delay == 0.0:
+                        admitted = True
+                        return
+                    if time.monotonic() + delay > deadline:
+                        raise self._reject(f"waited {self.queue_timeout:.0f} s in the queue")
+                    time.sleep(delay)
+            finally:
+                self._sync_head.release()
+        finally:
+            self._dequeue(tokens, time.monotonic() - start, admitted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests_per_minute": self.requests.capacity if self.requests else None,
+                "tokens_per_minute": self.tokens.capacity if self.tokens else None,
+                "queued": self._queued,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "avg_wait": round(self.total_wait / self.admitted, 3) if self.admitted else 0.0
+            }
+
+
+def estimate_tokens(prompt: str, max_output_tokens: Optional[int] = None) -> int:
+    """Tokens to reserve for a request: its estimated prompt size plus its output limit."""
+    return math.ceil(len(prompt) / CHARS_PER_TOKEN) + (max_output_tokens or 0)
+
+
+_limiters: Dict[str, ProviderRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limits_for(provider: str) -> Tuple[float, float]:
+    from config import config
+
+    limits = config.get(f"rate_limit.providers.{provider}", {}) or {}
+    return float(limits.get("requests_per_minute", 0)), float(limits.get("tokens_per_minute", 0))
+
+
+def get_rate_limiter(provider: str) -> ProviderRateLimiter:
+    """Return the shared rate limiter of a provider, configured from the backend config."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            from config import config
+
+            requests_per_minute, tokens_per_minute = _limits_for(provider)
+            _limiters[provider] = ProviderRateLimiter(
+                provider,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                max_queue=int(config.get("rate_limit.max_queue", DEFAULT_MAX_QUEUE)),
+                queue_timeout=float(config.get("rate_limit.queue_timeout", DEFAULT_QUEUE_TIMEOUT))
+            )
+        return _limiters[provider]
+
+
+def rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """Queue length and admission counters of every rate-limited provider used so far."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items() if limiter.enabled}
@@ -0,0 +1,407 @@
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: rate limits, timeouts and server-side failures
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# Defaults, overridable through the "resilience" section of the backend config
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 8.0
+DEFAULT_MAX_RETRY_AFTER = 30.0
+DEFAULT_ATTEMPT_TIMEOUT = 30.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RECOVERY_TIMEOUT = 30.0
+
+# Marks a stream that ended before its first item
+_END = object()
+
+
+class ProviderError(Exception):
+    """
+    Error returned by an LLM provider.
+
+    Attributes:
+        status_code: HTTP status of the failed call, if any
+        retry_after: Seconds the provider asked us to wait, if any
+        retryable: Whether another attempt may succeed
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 retry_after: Optional[float] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+
+class CircuitOpenError(ProviderError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(
+            f"Provider {provider} is unavailable; retry in {retry_after:.0f} s",
+            status_code=503, retry_after=retry_after, retryable=False
+        )
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error: BaseException) -> ProviderError:
+    """
+    Describe any exception raised by a provider call as a ProviderError.
+
+    Handles ProviderError itself, timeouts, connection errors and the
+    HTTP errors of httpx, requests and the genai SDK (anything with a
+    status code and, optionally, a response carrying Retry-After).
+    """
+    if isinstance(error, ProviderError):
+        return error
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return ProviderError(f"{type(error).__name__}: {error}", retryable=True)
+
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    if status is None and isinstance(getattr(error, "code", None), int):
+        status = error.code  # genai APIError
+    headers = getattr(response, "headers", None) or {}
+    retry_after = parse_retry_after(headers.get("Retry-After") if hasattr(headers, "get") else None)
+
+    if status is not None:
+        return ProviderError(str(error), status_code=int(status), retry_after=retry_after,
+                             retryable=int(status) in RETRYABLE_STATUS_CODES)
+
+    # Transport-level failures (httpx.TransportError, requests.ConnectionError/Timeout)
+    name = type(error).__name__
+    retryable = any(word in name for word in ("Timeout", "Connect", "Transport", "Network", "Protocol"))
+    return ProviderError(str(error), retryable=retryable)
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    After failure_threshold consecutive retryable failures the circuit
+    opens and calls fail fast. Once recovery_timeout has passed a single
+    probe call is let through (half-open); its success closes the circuit
+    and its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 recovery_timeout: float = DEFAULT_RECOVERY_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        Check whether a call may proceed.
+
+        Raises:
+            CircuitOpenError: If the circuit is open (or its probe is in flight)
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                logger.info(f"Circuit for {self.name} half-open; sending probe")
+                return
+            raise CircuitOpenError(self.name, max(remaining, 1.0))
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Let another probe through after a probe call was cancelled."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Circuit for {self.name} opened after "
+                                   f"{self.consecutive_failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened
+            }
+
+
+class ProviderResilience:
+    """
+    Retry policy and circuit breaker for one provider.
+
+    Retryable failures (429, 5xx, timeouts, connection errors) are retried
+    with full-jitter exponential backoff, waiting at least as long as the
+    provider's Retry-After. Client errors fail immediately and do not
+    count against the circuit breaker.
+    """
+
+    def __init__(self, name: str,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY,
+                 max_retry_after: float = DEFAULT_MAX_RETRY_AFTER,
+                 attempt_timeout: float = DEFAULT_ATTEMPT_TIMEOUT,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        Args:
+            name: Provider name
+            max_attempts: Attempts per call, including the first
+            base_delay: Backoff of the first retry, doubled per attempt
+            max_delay: Upper bound of the backoff
+            max_retry_after: Longest Retry-After we are willing to honor
+            attempt_timeout: Time limit of a single attempt
+            breaker: Circuit breaker (created with defaults if omitted)
+        """
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.attempt_timeout = attempt_timeout
+        self.breaker = breaker or CircuitBreaker(name)
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.short_circuits = 0
+
+    def backoff(self, attempt: int, error: ProviderError) -> Optional[float]:
+        """
+        Delay before the next attempt, or None if the call should not be retried.
+
+        Args:
+            attempt: Number of attempts made so far (1-based)
+            error: Classified error of the last attempt
+        """
+        if not error.retryable or attempt >= self.max_attempts:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if error.retry_after is not None:
+            if error.retry_after > self.max_retry_after:
+                return None
+            delay = max(delay, error.retry_after)
+        return delay
+
+    def _failed(self, attempt: int, error: BaseException) -> Optional[float]:
+        """Record a failed attempt and return the retry delay, or None to give up."""
+        classified = classify_error(error)
+        if classified.retryable:
+            self.breaker.record_failure()
+        else:
+            # Client errors say nothing about the provider's health; only
+            # let the next probe through if this call was one
+            self.breaker.release_probe()
+        delay = self.backoff(attempt, classified)
+        if delay is None or self.breaker.state == CircuitBreaker.OPEN:
+            self.failures += 1
+            return None
+        self.retries += 1
+        logger.warning(f"{self.name} attempt {attempt} failed ({classified}); retrying in {delay:.2f} s")
+        return delay
+
+    def _before_call(self) -> None:
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.short_circuits += 1
+            raise
+
+    async def call(self, fn: Callable[[], Awaitable[Any]],
+                   admit: Optional[Callable[[], Awaitable[None]]] = None) -> Any:
+        """
+        Await fn with retries, backoff and the circuit breaker.
+
+        Args:
+            fn: Coroutine function performing one attempt
+            admit: Awaited before every attempt, outside its timeout (rate limiting)
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+            ProviderError: The classified error of the last attempt
+        """
+        self.calls += 1
+        attempt = 0
+        while True:
+            attempt += 1
+            if admit is not None:
+                await admit()
+            self._before_call()
+            try:
+                result = await asyncio.wait_for(fn(), self.attempt_timeout)
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                delay = self._failed(attempt, e)
+                if delay is None:
+                    raise classify_error(e) from e
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def stream(self, factory: Callable[[], AsyncIterator[Any]],
+                     admit: Optional[Callable[[], Awaitable[None]]] = None) -> AsyncIterator[Any]:
+        """
+        Iterate a provider stream with retries. Only failures before the
+        first item are retried; once data has been yielded an error is
+        raised to the caller. The attempt timeout applies to the wait for
+        the first item, since a long reply may stream for longer.
+
+        Args:
+            factory: Creates a fresh async iterator for each attempt
+            admit: Awaited before every attempt (rate limiting)
+        """
+        self.calls += 1
+        attempt = 0
+        while True:
+            attempt += 1
+            if admit is not None:
+                await admit()
+            self._before_call()
+            started = False
+            items = factory().__aiter__()
+            try:
+                try:
+                    first = await asyncio.wait_for(items.__anext__(), self.attempt_timeout)
+                except StopAsyncIteration:
+                    first = _END
+                if first is not _END:
+                    started = True
+                    yield first
+                    async for item in items:
+                        yield item
+            except (asyncio.CancelledError, GeneratorExit):
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                delay = None if started else self._failed(attempt, e)
+                if delay is None:
+                    if started:
+                        self.failures += 1
+                        self.breaker.record_failure()
+                    raise classify_error(e) from e
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return
+
+    def call_sync(self, fn: Callable[[], Any], admit: Optional[Callable[[], None]] = None) -> Any:
+        """
+        Blocking version of call for the synchronous provider API.
+
+        A blocking call cannot be interrupted, so fn must enforce the
+        attempt timeout itself through its HTTP client's timeout.
+        """
+        self.calls += 1
+        attempt = 0
+        while True:
+            attempt += 1
+            if admit is not None:
+                admit()
+            self._before_call()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._failed(attempt, e)
+                if delay is None:
+                    raise classify_error(e) from e
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.stats(),
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "short_circuits": self.short_circuits
+        }
+
+
+_resilience: Dict[str, ProviderResilience] = {}
+_resilience_lock = threading.Lock()
+
+
+def get_resilience(provider: str) -> ProviderResilience:
+    """Return the shared resilience layer of a provider, configured from the backend config."""
+    with _resilience_lock:
+        if provider not in _resilience:
+            from config import config
+
+            _resilience[provider] = ProviderResilience(
+                provider,
+                max_attempts=int(config.get("resilience.max_attempts", DEFAULT_MAX_ATTEMPTS)),
+                base_delay=float(config.get("resilience.base_delay", DEFAULT_BASE_DELAY)),
+                max_delay=float(config.get("resilience.max_delay", DEFAULT_MAX_DELAY)),
+                max_retry_after=float(config.get("resilience.max_retry_after", DEFAULT_MAX_RETRY_AFTER)),
+                attempt_timeout=float(config.get("resilience.attempt_timeout", DEFAULT_ATTEMPT_TIMEOUT)),
+                breaker=CircuitBreaker(
+                    provider,
+                    failure_threshold=int(config.get("resilience.failure_threshold", DEFAULT_FAILURE_THRESHOLD)),
+                    recovery_timeout=float(config.get("resilience.recovery_timeout", DEFAULT_RECOVERY_TIMEOUT))
+                )
+            )
+        return _resilience[provider]
+
+
+def resilience_stats() -> Dict[str, Dict[str, Any]]:
+    """Circuit breaker state and retry counters of every provider used so far."""
+    with _resilience_lock:
+        providers = dict(_resilience)
+    return {name: layer.stats() for name, layer in providers.items()}
@@ -0,0 +1,259 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the "cache" section of the backend config
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt so that cosmetically different but equivalent
+    prompts share a cache entry: Unicode NFC, line endings unified and
+    runs of whitespace collapsed.
+    """
+    text = unicodedata.normalize("NFC", prompt).replace("\r\n", "\n")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_cache_key(provider: str, model: str, temperature: float, prompt: str,
+                   max_output_tokens: Optional[int] = None, top_k: Optional[int] = None) -> str:
+    """
+    Build the cache key for an LLM call.
+
+    Args:
+        provider: Provider name (e.g. "gemini")
+        model: Model name
+        temperature: Sampling temperature
+        prompt: Prompt text (normalized before hashing)
+        max_output_tokens: Output limit (a smaller one may truncate the reply)
+        top_k: Top-k sampling parameter
+
+    Returns:
+        Hex SHA-256 digest identifying the call
+    """
+    prompt_hash = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+    identity = json.dumps([provider, model, round(float(temperature), 4), max_output_tokens, top_k, prompt_hash])
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Disk-backed LLM response cache stored in SQLite.
+
+    Entries expire after their TTL and the least recently used entries are
+    evicted once the cache exceeds max_entries or max_bytes. The cache is
+    safe to share between request threads and survives backend restarts.
+    """
+
+    def __init__(self, path: str,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        """
+        Args:
+            path: SQLite database file (":memory:" for a throwaway cache)
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total size of the cached responses
+            ttl_seconds: Default lifetime of an entry
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                temperature REAL NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        logger.info(f"Opened LLM response cache at {path}")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response and mark it as recently used.
+
+        Args:
+            key: Key from make_cache_key
+
+        Returns:
+            The cached response dictionary, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        try:
+            return json.loads(row[0])
+        except ValueError as e:
+            logger.error(f"Discarding unreadable cache entry {key}: {e}")
+            self.delete(key)
+            return None
+
+    def put(self, key: str, response: Dict[str, Any], provider: str, model: str,
+            temperature: float, ttl_seconds: Optional[float] = None) -> bool:
+        """
+        Store a response, evicting expired and least recently used entries as needed.
+
+        Args:
+            key: Key from make_cache_key
+            response: JSON-serializable response dictionary
+            provider: Provider name
+            model: Model name
+            temperature: Sampling temperature
+            ttl_seconds: Lifetime of this entry (defaults to the cache TTL)
+
+        Returns:
+            True if the response was stored
+        """
+        try:
+            payload = json.dumps(response, default=str)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Cannot cache response for {provider}/{model}: {e}")
+            return False
+
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return False
+
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, float(temperature), payload, size, now, now, now + ttl)
+            )
+            self._evict(now)
+        return True
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then LRU entries until the size limits hold. Caller holds the lock."""
+        removed = self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if count > self.max_entries or total > self.max_bytes:
+            # Walk entries from least to most recently used, keeping a running size
+            doomed = []
+            for key, size in self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+            ).fetchall():
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                count -= 1
+                total -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            removed += len(doomed)
+
+        self.evictions += removed
+
+    def delete(self, key: str) -> None:
+        """Remove a single entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self) -> int:
+        """
+        Remove all entries.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            return self._conn.execute("DELETE FROM responses").rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, size and hit/miss counters of the cache."""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": count,
+            "bytes": total,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Return the shared response cache configured in the backend config,
+    opening it on first use. Returns None if caching is disabled or the
+    database cannot be opened.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from config import config
+
+            if not config.get("cache.enabled", True):
+                return None
+            try:
+                _cache = ResponseCache(
+                    config.get("cache.path"),
+                    max_entries=int(config.get("cache.max_entries", DEFAULT_MAX_ENTRIES)),
+                    max_bytes=int(config.get("cache.max_bytes", DEFAULT_MAX_BYTES)),
+                    ttl_seconds=float(config.get("cache.ttl_seconds", DEFAULT_TTL_SECONDS))
+                )
+            except Exception as e:
+                logger.error(f"Could not open LLM response cache: {e}")
+                return None
+        return _cache
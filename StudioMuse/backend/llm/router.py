@@ -0,0 +1,325 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, ClassVar, Dict, List, Optional
+
+from pydantic import PrivateAttr
+
+from .base_llm import BaseLLM
+from .resilience import CircuitBreaker, get_resilience
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the latency and error-rate averages
+EWMA_ALPHA = 0.2
+
+# Latency samples kept per provider for the p95 estimate
+WINDOW_SIZE = 200
+
+# Samples needed before the p95 is trusted as the hedging delay
+MIN_SAMPLES_FOR_P95 = 20
+
+# Each point of error rate costs as much as this many times the latency
+ERROR_PENALTY = 4.0
+
+# Share of requests sent to a random healthy provider so that a provider
+# that had a bad spell gets fresh samples and can win traffic back
+EXPLORE_RATE = 0.05
+
+# Defaults, overridable through the "llm" section of the backend config
+DEFAULT_AUTO_PROVIDERS = ["gemini", "perplexity"]
+DEFAULT_HEDGE_DELAY = 10.0
+MIN_HEDGE_DELAY = 0.2
+
+
+class ProviderStats:
+    """Latency and error-rate statistics of one provider/model."""
+
+    def __init__(self):
+        self.latency_ewma: Optional[float] = None
+        self.first_chunk_ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.hedges_won = 0
+        self._window = deque(maxlen=WINDOW_SIZE)
+
+    def record(self, latency: float, success: bool) -> None:
+        """Add one call: its latency and whether it succeeded."""
+        self.requests += 1
+        self.errors += not success
+        self.error_rate += EWMA_ALPHA * ((0.0 if success else 1.0) - self.error_rate)
+        if success:
+            self.latency_ewma = latency if self.latency_ewma is None else \
+                self.latency_ewma + EWMA_ALPHA * (latency - self.latency_ewma)
+        self._window.append(latency)
+
+    def record_cancelled(self, elapsed: float) -> None:
+        """
+        Add a call cancelled after `elapsed` seconds (a lost hedge or a
+        client disconnect). Its full latency is unknown but at least
+        `elapsed`, so it can only raise the latency estimate. It enters the
+        p95 window as a lower bound; dropping it would bias p95 low, since
+        the slowest calls are the ones that get cancelled.
+        """
+        if self.latency_ewma is not None and elapsed > self.latency_ewma:
+            self.latency_ewma += EWMA_ALPHA * (elapsed - self.latency_ewma)
+        self._window.append(elapsed)
+
+    def record_first_chunk(self, latency: float) -> None:
+        """Add a stream that started: its time to first chunk is kept apart from full-call latency."""
+        self.requests += 1
+        self.error_rate -= EWMA_ALPHA * self.error_rate
+        self.first_chunk_ewma = latency if self.first_chunk_ewma is None else \
+            self.first_chunk_ewma + EWMA_ALPHA * (latency - self.first_chunk_ewma)
+
+    def p95(self) -> Optional[float]:
+        """95th percentile of recent latencies, or None with too few samples."""
+        if len(self._window) < MIN_SAMPLES_FOR_P95:
+            return None
+        ordered = sorted(self._window)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def score(self) -> float:
+        """Expected cost of routing to this provider; lower is better."""
+        if self.latency_ewma is None:
+            return 0.0  # Untried providers are explored first
+        return self.latency_ewma * (1.0 + ERROR_PENALTY * self.error_rate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "first_chunk_ewma": round(self.first_chunk_ewma, 3) if self.first_chunk_ewma is not None else None,
+            "p95": round(self.p95(), 3) if self.p95() is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "hedges_won": self.hedges_won
+        }
+
+
+class ProviderRouter:
+    """Tracks provider statistics and ranks providers for the next request."""
+
+    def __init__(self):
+        self._stats: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(llm: BaseLLM) -> str:
+        return f"{llm.provider_name}/{llm.model}"
+
+    def stats_for(self, llm: BaseLLM) -> ProviderStats:
+        with self._lock:
+            return self._stats.setdefault(self.key(llm), ProviderStats())
+
+    def record(self, llm: BaseLLM, latency: float, success: bool) -> None:
+        stats = self.stats_for(llm)
+        with self._lock:
+            stats.record(latency, success)
+
+    def record_cancelled(self, llm: BaseLLM, elapsed: float) -> None:
+        stats = self.stats_for(llm)
+        with self._lock:
+            stats.record_cancelled(elapsed)
+
+    def record_first_chunk(self, llm: BaseLLM, latency: float) -> None:
+        stats = self.stats_for(llm)
+        with self._lock:
+            stats.record_first_chunk(latency)
+
+    def rank(self, candidates: List[BaseLLM]) -> List[BaseLLM]:
+        """
+        Order candidates from best to worst. Providers whose circuit
+        breaker is open are left out unless every provider is open, and
+        occasionally a random provider is moved to the front to explore.
+        """
+        healthy = [llm for llm in candidates
+                   if get_resilience(llm.provider_name).breaker.state != CircuitBreaker.OPEN]
+        ranked = sorted(healthy or candidates, key=lambda llm: self.stats_for(llm).score())
+        if len(ranked) > 1 and random.random() < EXPLORE_RATE:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {key: stats.to_dict() for key, stats in self._stats.items()}
+
+
+# Shared router used by every AutoLLM instance
+provider_router = ProviderRouter()
+
+
+class AutoLLM(BaseLLM):
+    """
+    Routes each request to the currently fastest healthy provider.
+
+    If the chosen provider has not answered by its p95 latency, a hedged
+    request is sent to the next best provider; the first successful reply
+    wins and the other call is cancelled. Each underlying call keeps its
+    provider's own retries and circuit breaker.
+    """
+    provider_name: ClassVar[str] = "auto"
+    hedge: bool = True
+    _candidates: List[BaseLLM] = PrivateAttr(default_factory=list)
+
+    def __init__(self, temperature: float = 0.7, hedge: Optional[bool] = None,
+                 providers: Optional[List[str]] = None):
+        """
+        Args:
+            temperature: Sampling temperature passed to every provider
+            hedge: Send hedged requests (defaults to the llm.hedge config)
+            providers: Provider names to route between (defaults to llm.auto_providers)
+        """
+        from config import config
+        from .llm_service_provider import LLMServiceProvider
+
+        candidates = []
+        for name in providers or config.get("llm.auto_providers", DEFAULT_AUTO_PROVIDERS):
+            try:
+                candidates.append(LLMServiceProvider.get_llm(name, temperature=temperature))
+            except Exception as e:
+                logger.warning(f"Provider {name} is not available for auto routing: {e}")
+        if not candidates:
+            raise ValueError("No LLM providers are available for auto routing")
+
+        super().__init__(
+            model="auto",
+            api_url="",
+            temperature=temperature,
+            # Chunks must fit the output limit of whichever provider serves them
+            max_output_tokens=min(llm.max_output_tokens or 500 for llm in candidates)
+        )
+        self.hedge = config.get("llm.hedge", True) if hedge is None else hedge
+        self._candidates = candidates
+        logger.info(f"Initialized auto routing between {[llm.provider_name for llm in candidates]}")
+
+    def with_params(self, **params: Any) -> "AutoLLM":
+        """Request-scoped copy whose candidate providers use the same parameters."""
+        llm = super().with_params(**params)
+        if llm is not self:
+            llm._candidates = [candidate.with_params(**params) for candidate in self._candidates]
+        return llm
+
+    def warm_up(self) -> None:
+        for candidate in self._candidates:
+            candidate.warm_up()
+
+    def hedge_delay(self, llm: BaseLLM) -> float:
+        """Time to wait for a provider before hedging: its p95 latency."""
+        from config import config
+
+        p95 = provider_router.stats_for(llm).p95()
+        if p95 is None:
+            return float(config.get("llm.hedge_delay", DEFAULT_HEDGE_DELAY))
+        return max(MIN_HEDGE_DELAY, p95)
+
+    async def _timed_call(self, llm: BaseLLM, prompt: str) -> Dict[str, Any]:
+        """Call one provider and record its latency and outcome."""
+        start = time.perf_counter()
+        try:
+            response = await llm.resilient_acall_api(prompt)
+        except asyncio.CancelledError:
+            # A lost hedge or a client disconnect: the call would have taken at least this long
+            provider_router.record_cancelled(llm, time.perf_counter() - start)
+            raise
+        except Exception:
+            provider_router.record(llm, time.perf_counter() - start, success=False)
+            raise
+        provider_router.record(llm, time.perf_counter() - start, success=True)
+        return {**response, "provider": llm.provider_name}
+
+    async def resilient_acall_api(self, prompt: str) -> Dict[str, Any]:
+        """
+        Route a call to the best provider, hedging to the runner-up when
+        the first one is slower than its p95. Falls back to the next
+        provider when a call fails.
+        """
+        ranked = provider_router.rank(self._candidates)
+        primary, backups = ranked[0], ranked[1:]
+        tasks: Dict[asyncio.Task, BaseLLM] = {
+            asyncio.ensure_future(self._timed_call(primary, prompt)): primary
+        }
+        errors: List[Exception] = []
+
+        try:
+            delay = self.hedge_delay(primary) if self.hedge and backups else None
+            while tasks:
+                done, _ = await asyncio.wait(tasks.keys(), timeout=delay,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Primary is slower than usual: hedge with the next provider
+                    backup = backups.pop(0)
+                    logger.info(f"Hedging {primary.provider_name} with {backup.provider_name} "
+                                f"after {delay:.1f} s")
+                    tasks[asyncio.ensure_future(self._timed_call(backup, prompt))] = backup
+                    delay = None
+                    continue
+
+                for task in done:
+                    llm = tasks.pop(task)
+                    if task.exception() is None:
+                        if llm is not primary:
+                            provider_router.stats_for(llm).hedges_won += 1
+                        return task.result()
+                    errors.append(task.exception())
+                    logger.warning(f"Auto routing: {llm.provider_name} failed: {task.exception()}")
+
+                if not tasks and backups:
+                    # Fall back to the next provider
+                    backup = backups.pop(0)
+                    tasks[asyncio.ensure_future(self._timed_call(backup, prompt))] = backup
+                    delay = self.hedge_delay(backup) if self.hedge and backups else None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        raise errors[-1]
+
+    async def resilient_astream_api(self, prompt: str) -> AsyncIterator[str]:
+        """Stream from the best provider, falling back if it fails before its first chunk."""
+        ranked = provider_router.rank(self._candidates)
+        for index, llm in enumerate(ranked):
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in llm.resilient_astream_api(prompt):
+                    if not started:
+                        started = True
+                        # Time to first chunk is tracked apart from full-call latency
+                        provider_router.record_first_chunk(llm, time.perf_counter() - start)
+                    yield chunk
+                return
+            except Exception as e:
+                if started or index == len(ranked) - 1:
+                    raise
+                provider_router.record(llm, time.perf_counter() - start, success=False)
+                logger.warning(f"Auto routing: {llm.provider_name} stream failed, falling back: {e}")
+
+    def resilient_call_api(self, prompt: str) -> Dict[str, Any]:
+        """Blocking call to the best provider, falling back on failure (no hedging)."""
+        ranked = provider_router.rank(self._candidates)
+        for index, llm in enumerate(ranked):
+            start = time.perf_counter()
+            try:
+                response = llm.resilient_call_api(prompt)
+            except Exception:
+                provider_router.record(llm, time.perf_counter() - start, success=False)
+                if index == len(ranked) - 1:
+                    raise
+                continue
+            provider_router.record(llm, time.perf_counter() - start, success=True)
+            return {**response, "provider": llm.provider_name}
+
+    def call_api(self, prompt: str) -> Dict[str, Any]:
+        return self.resilient_call_api(prompt)
+
+    async def acall_api(self, prompt: str) -> Dict[str, Any]:
+        return await self.resilient_acall_api(prompt)
+
+    async def astream_api(self, prompt: str) -> AsyncIterator[str]:
+        async for chunk in self.resilient_astream_api(prompt):
+            yield chunk
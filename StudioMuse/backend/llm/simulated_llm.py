@@ -0,0 +1,125 @@
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, ClassVar, Dict
+
+from .base_llm import BaseLLM
+from .resilience import ProviderError
+
+# Rough characters per output token, used to turn reply size into latency
+CHARS_PER_TOKEN = 4
+
+SUGGESTION_WORDS = ["mix", "a", "little", "touch", "of", "white", "glaze", "with", "thin", "layer",
+                    "warm", "cool", "deepen", "lighten", "burnt", "sienna", "ultramarine", "ochre"]
+
+
+@dataclass
+class SimulationProfile:
+    """
+    Behaviour of the simulated provider.
+
+    Attributes:
+        latency: Median time to first token in seconds
+        latency_sigma: Spread of the log-normal time to first token (0 for constant)
+        seconds_per_token: Generation time per output token
+        error_rate: Share of calls failing with a retryable 503
+        suggestion_words: Words per mixing suggestion, which sets the reply size
+        physical_colors: Colors listed in a generated physical palette
+    """
+    latency: float = 0.8
+    latency_sigma: float = 0.5
+    seconds_per_token: float = 0.004
+    error_rate: float = 0.0
+    suggestion_words: int = 12
+    physical_colors: int = 24
+
+
+class SimulatedLLM(BaseLLM):
+    """
+    Offline stand-in for a real provider, for load tests and benchmarks.
+
+    Replies are built from the prompt so the whole request path (prompt
+    building, fan-out, parsing, rehydration) runs as it would against a
+    real model: compact and verbose demystify prompts, mixing suggestion
+    prompts and physical palette prompts are all understood. Latency is a
+    log-normal time to first token plus a per-token generation time.
+    """
+    provider_name: ClassVar[str] = "simulated"
+    profile: ClassVar[SimulationProfile] = SimulationProfile()
+
+    def __init__(self, temperature: float = 0.7, max_output_tokens: int = 2048):
+        super().__init__(
+            model="simulated",
+            api_url="",
+            temperature=temperature,
+            max_output_tokens=max_output_tokens
+        )
+
+    def _suggestion(self, rng: random.Random) -> str:
+        return " ".join(rng.choice(SUGGESTION_WORDS) for _ in range(self.profile.suggestion_words))
+
+    def _reply(self, prompt: str) -> str:
+        """Build a well-formed reply for the kind of prompt received."""
+        rng = random.Random(hash(prompt))
+
+        if "set_name" in prompt:
+            colors = [f"Simulated Color {i + 1}" for i in range(self.profile.physical_colors)]
+            return json.dumps({"set_name": "Simulated Set", "piece_count": str(len(colors)),
+                               "colors": colors, "additional_notes": ""}, indent=2)
+
+        # Compact protocol: "id r g b [physical_index]" tables answered with tuples
+        ids = [int(i) for i in re.findall(r"^(\d+) [\d.]+ [\d.]+ [\d.]+", prompt, re.M)]
+        if ids:
+            physical = len(re.findall(r"^\d+ [^\d\s]", prompt, re.M)) or 1
+            if "matched_physical_index" in prompt:
+                return json.dumps([[i, self._suggestion(rng)] for i in ids])
+            return json.dumps([[i, rng.randrange(physical), self._suggestion(rng)] for i in ids])
+
+        # Verbose prompts: echo the color names back as objects
+        names = re.findall(r'^\s*"([^"]+)": \{', prompt, re.M) or \
+            re.findall(r'"gimp_color_name": "([^"]+)"', prompt)
+        entries = [{
+            "gimp_color_name": name,
+            "rgb_color": "rgb(0.500, 0.500, 0.500)",
+            "physical_color_name": "Simulated Color 1",
+            "mixing_suggestions": self._suggestion(rng)
+        } for name in names]
+        return json.dumps(entries, indent=2)
+
+    def _latency(self) -> float:
+        profile = self.profile
+        if profile.latency_sigma <= 0:
+            return profile.latency
+        return random.lognormvariate(math.log(profile.latency), profile.latency_sigma)
+
+    def _maybe_fail(self) -> None:
+        if random.random() < self.profile.error_rate:
+            raise ProviderError("Simulated provider error", status_code=503, retryable=True)
+
+    def call_api(self, prompt: str) -> Dict[str, Any]:
+        text = self._reply(prompt)
+        time.sleep(self._latency())
+        self._maybe_fail()
+        time.sleep(len(text) / CHARS_PER_TOKEN * self.profile.seconds_per_token)
+        return {"text": text, "raw_response": None}
+
+    async def acall_api(self, prompt: str) -> Dict[str, Any]:
+        text = self._reply(prompt)
+        await asyncio.sleep(self._latency())
+        self._maybe_fail()
+        await asyncio.sleep(len(text) / CHARS_PER_TOKEN * self.profile.seconds_per_token)
+        return {"text": text, "raw_response": None}
+
+    async def astream_api(self, prompt: str) -> AsyncIterator[str]:
+        text = self._reply(prompt)
+        await asyncio.sleep(self._latency())
+        self._maybe_fail()
+        # Emit roughly 16 tokens per chunk, at the per-token generation rate
+        step = 16 * CHARS_PER_TOKEN
+        for start in range(0, len(text), step):
+            await asyncio.sleep(step / CHARS_PER_TOKEN * self.profile.seconds_per_token)
+            yield text[start:start + step]
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical async calls.
+
+    The first caller for a key starts the call as a task; callers that
+    arrive while it is in flight await the same task and receive the same
+    result or exception. The task is shielded from its waiters, so a
+    caller that is cancelled or times out neither cancels the call for the
+    others nor leaves a stale entry behind: the key is released as soon as
+    the task finishes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]],
+                 timeout: Optional[float] = None) -> Any:
+        """
+        Run fn once per key among concurrent callers.
+
+        Args:
+            key: Identity of the call (e.g. an LLM cache key)
+            fn: Coroutine function performing the call
+            timeout: Optional time this caller is willing to wait; the
+                shared call keeps running for the other callers
+
+        Returns:
+            The result of the shared call
+
+        Raises:
+            Whatever the shared call raised, or asyncio.TimeoutError
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"Coalesced request onto in-flight call {key[:12]}")
+
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    def _release(self, key: str, task: asyncio.Task) -> None:
+        """Forget a finished call and mark its exception as retrieved."""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Waiters that timed out never retrieve the exception themselves
+            task.exception()
+
+    def in_flight(self) -> int:
+        """Number of calls currently in flight."""
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        """In-flight, leader and coalesced call counters."""
+        return {
+            "in_flight": self.in_flight(),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced
+        }
+
+
+# Shared instance used for all LLM provider calls
+llm_single_flight = SingleFlight()
@@ -0,0 +1,18 @@
+from core.utils.json_stream import JsonStreamParser
+
+from .metrics import json_parse_failures
+
+
+class JsonArrayStreamParser(JsonStreamParser):
+    """
+    Shared incremental JSON parser in array mode, as used for color mapping
+    replies: only object and array elements (entries and compact tuples)
+    are yielded, and malformed ones are also counted in the backend metrics.
+    """
+
+    def __init__(self):
+        super().__init__(array_only=True, scalars=False)
+
+    def on_malformed(self, element: str, error: ValueError) -> None:
+        json_parse_failures.inc(kind="array_element")
+        super().on_malformed(element, error)
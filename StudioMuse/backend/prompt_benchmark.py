@@ -0,0 +1,191 @@
+"""
+Token and latency comparison of the verbose and compact demystify prompts.
+
+Sends the same palettes through /palette/demystify twice, once with
+llm.compact_prompts off and once on, against the simulated provider. Every
+prompt and reply that reaches the provider is recorded and counted with a
+real tokenizer where one is available, and request latency is measured
+with the simulated per-token generation time.
+
+Tokenizers:
+    tiktoken  cl100k_base BPE (pip install tiktoken; the encoding is
+              downloaded once, or read from TIKTOKEN_CACHE_DIR offline)
+    gemini    The Gemini count_tokens API (needs GEMINI_API_KEY and network)
+    chars     Characters / 4, an estimate for when neither is available
+    auto      tiktoken if installed, else chars (default)
+
+Usage:
+    python prompt_benchmark.py --sizes 16 32 64 --tokenizer tiktoken
+    python prompt_benchmark.py --max-output-tokens 500 --json
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmark import PHYSICAL_NAMES, percentile, random_colors
+
+
+def get_token_counter(name: str) -> Callable[[str], int]:
+    """
+    Return a function counting the tokens of a text.
+
+    Args:
+        name: tiktoken, gemini or chars
+
+    Raises:
+        ImportError: If the tokenizer's package is not installed
+    """
+    if name == "tiktoken":
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text))
+
+    if name == "gemini":
+        from llm.gemini_llm import get_genai_client
+
+        client = get_genai_client(os.getenv("GEMINI_API_KEY"))
+        return lambda text: client.models.count_tokens(model="gemini-2.0-flash", contents=[text]).total_tokens
+
+    return lambda text: -(-len(text) // 4)
+
+
+def configure_backend(args: argparse.Namespace, cache_dir: str) -> List[Dict[str, str]]:
+    """Register a simulated provider that records every prompt and reply; return the record list."""
+    os.environ["STUDIOMUSE_CACHE_PATH"] = os.path.join(cache_dir, "llm_cache.sqlite3")
+    os.environ["STUDIOMUSE_CACHE_ENABLED"] = "false"
+
+    from llm.llm_service_provider import LLMServiceProvider
+    from llm.simulated_llm import SimulatedLLM, SimulationProfile
+
+    calls: List[Dict[str, str]] = []
+
+    class RecordingLLM(SimulatedLLM):
+        def __init__(self, temperature: float = 0.7, max_output_tokens: int = args.max_output_tokens):
+            super().__init__(temperature=temperature, max_output_tokens=max_output_tokens)
+
+        async def acall_api(self, prompt: str) -> Dict[str, Any]:
+            response = await super().acall_api(prompt)
+            calls.append({"prompt": prompt, "reply": response["text"]})
+            return response
+
+    RecordingLLM.profile = SimulationProfile(
+        latency=args.latency,
+        latency_sigma=0.0,  # Constant time to first token, so only the output size differs
+        seconds_per_token=args.seconds_per_token,
+        suggestion_words=args.suggestion_words
+    )
+    LLMServiceProvider.register_provider("simulated", RecordingLLM)
+    return calls
+
+
+async def run_mode(client, compact: bool, palettes: List[Dict[str, Any]], calls: List[Dict[str, str]],
+                   count_tokens: Callable[[str], int]) -> Dict[str, Any]:
+    """Send every palette with one prompt style and total what reached the provider."""
+    from config import config
+
+    config._config["llm"]["compact_prompts"] = compact
+    calls.clear()
+    latencies = []
+    for body in palettes:
+        start = time.perf_counter()
+        response = await client.post("/palette/demystify", json=body)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"Request failed ({response.status_code}): {response.text[:200]}")
+
+    latencies.sort()
+    return {
+        "calls": len(calls),
+        "prompt_chars": sum(len(call["prompt"]) for call in calls),
+        "reply_chars": sum(len(call["reply"]) for call in calls),
+        "prompt_tokens": sum(count_tokens(call["prompt"]) for call in calls),
+        "reply_tokens": sum(count_tokens(call["reply"]) for call in calls),
+        "p50": round(percentile(latencies, 0.50), 3),
+        "max": round(latencies[-1], 3)
+    }
+
+
+async def run(args: argparse.Namespace, calls: List[Dict[str, str]]) -> Dict[str, Any]:
+    import httpx
+    import api
+
+    count_tokens = get_token_counter(args.tokenizer)
+    rng = random.Random(args.seed)
+    report = {}
+    async with api.lifespan(api.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://benchmark",
+                                     timeout=300) as client:
+            for size in args.sizes:
+                palettes = [{
+                    "gimp_palette_colors": random_colors(rng, size),
+                    "physical_palette_data": PHYSICAL_NAMES[:args.physical_colors],
+                    "llm_provider": "simulated"
+                } for _ in range(args.repeats)]
+                report[size] = {
+                    "verbose": await run_mode(client, False, palettes, calls, count_tokens),
+                    "compact": await run_mode(client, True, palettes, calls, count_tokens)
+                }
+    return report
+
+
+def print_report(report: Dict[int, Dict[str, Dict[str, Any]]], args: argparse.Namespace) -> None:
+    print(f"\n{args.repeats} palettes per size, {args.physical_colors} physical colors, "
+          f"tokenizer {args.tokenizer}, max_output_tokens {args.max_output_tokens}, "
+          f"{args.seconds_per_token} s/token after {args.latency} s")
+    print(f"{'colors':>7} {'mode':<8}{'calls':>6}{'prompt tok':>12}{'reply tok':>11}{'p50 s':>8}{'max s':>8}")
+    for size, modes in report.items():
+        for mode, row in modes.items():
+            print(f"{size:>7} {mode:<8}{row['calls']:>6}{row['prompt_tokens']:>12}{row['reply_tokens']:>11}"
+                  f"{row['p50']:>8.3f}{row['max']:>8.3f}")
+        verbose, compact = modes["verbose"], modes["compact"]
+        print(f"{'':>7} {'saved':<8}{'':>6}"
+              f"{1 - compact['prompt_tokens'] / verbose['prompt_tokens']:>12.0%}"
+              f"{1 - compact['reply_tokens'] / verbose['reply_tokens']:>11.0%}"
+              f"{1 - compact['p50'] / verbose['p50']:>8.0%}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare verbose and compact demystify prompts")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 32, 64, 128], help="Palette sizes")
+    parser.add_argument("--repeats", type=int, default=5, help="Palettes per size")
+    parser.add_argument("--physical-colors", type=int, default=14, help="Physical palette size")
+    parser.add_argument("--tokenizer", choices=["auto", "tiktoken", "gemini", "chars"], default="auto")
+    parser.add_argument("--max-output-tokens", type=int, default=2048, help="Provider output limit (sets chunking)")
+    parser.add_argument("--latency", type=float, default=0.5, help="Provider time to first token (s)")
+    parser.add_argument("--seconds-per-token", type=float, default=0.01, help="Provider generation time per token")
+    parser.add_argument("--suggestion-words", type=int, default=12, help="Words per mixing suggestion")
+    parser.add_argument("--seed", type=int, default=1, help="Palette random seed")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.tokenizer == "auto":
+        args.tokenizer = "tiktoken" if importlib.util.find_spec("tiktoken") else "chars"
+        if args.tokenizer == "chars":
+            print("tiktoken is not installed (pip install tiktoken); estimating tokens as chars / 4", file=sys.stderr)
+    logging.disable(logging.ERROR)  # Per-request logs would drown the report
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        calls = configure_backend(args, cache_dir)
+        report = asyncio.run(run(args, calls))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from llm.rate_limiter import ProviderRateLimiter, RateLimitExceeded, TokenBucket, estimate_tokens
+
+
+def test_bucket_starts_full():
+    bucket = TokenBucket(60)
+    now = bucket._updated
+    assert bucket.wait_time(60, now) == 0.0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+
+
+def test_bucket_refills_at_the_per_minute_rate():
+    bucket = TokenBucket(120)  # 2 tokens per second
+    start = bucket._updated
+    bucket.take(120)
+    assert bucket.wait_time(10, start) == pytest.approx(5.0)
+    assert bucket.wait_time(10, start + 2.0) == pytest.approx(3.0)
+    assert bucket.wait_time(10, start + 5.0) == 0.0
+
+
+def test_bucket_never_holds_more_than_one_minute():
+    bucket = TokenBucket(60)
+    start = bucket._updated
+    bucket.wait_time(0, start + 3600)
+    assert bucket.tokens == 60
+
+
+def test_oversized_request_waits_for_a_full_bucket():
+    bucket = TokenBucket(100)
+    start = bucket._updated
+    assert bucket.admit_wait(500, start) == 0.0
+    bucket.take(500)
+    assert bucket.tokens == 0
+    assert bucket.admit_wait(500, start) == pytest.approx(60.0)
+
+
+def test_drain_time_is_not_clipped_to_the_bucket():
+    bucket = TokenBucket(100)
+    start = bucket._updated
+    bucket.take(100)
+    assert bucket.wait_time(500, start) == pytest.approx(300.0)
+
+
+def test_retry_after_covers_the_queued_tokens():
+    limiter = ProviderRateLimiter("test", tokens_per_minute=60, queue_timeout=0.05)
+
+    async def send():
+        await limiter.acquire(60)
+        with pytest.raises(RateLimitExceeded) as error:
+            await limiter.acquire(600)
+        return error.value.retry_after
+
+    # The rejected request is still queued when Retry-After is computed
+    assert asyncio.run(send()) > 500
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("x" * 10) == 3
+    assert estimate_tokens("x" * 10, max_output_tokens=100) == 103
+
+
+def test_disabled_limiter_admits_everything():
+    limiter = ProviderRateLimiter("test")
+    assert not limiter.enabled
+    for _ in range(1000):
+        limiter.acquire_sync(10_000)
+    asyncio.run(limiter.acquire(10_000))
+
+
+def test_request_quota_is_enforced():
+    limiter = ProviderRateLimiter("test", requests_per_minute=3, queue_timeout=0.1)
+    for _ in range(3):
+        limiter.acquire_sync()
+    with pytest.raises(RateLimitExceeded) as error:
+        limiter.acquire_sync()
+    assert error.value.status_code == 503
+    assert error.value.retry_after > 0
+    assert (limiter.admitted, limiter.rejected) == (3, 1)
+
+
+def test_token_quota_is_enforced():
+    limiter = ProviderRateLimiter("test", tokens_per_minute=1000, queue_timeout=0.1)
+
+    async def send():
+        await limiter.acquire(600)
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire(600)
+
+    asyncio.run(send())
+    assert limiter.stats()["queued"] == 0
+
+
+def test_full_queue_rejects_immediately():
+    limiter = ProviderRateLimiter("test", requests_per_minute=1, max_queue=1, queue_timeout=5)
+
+    async def send():
+        await limiter.acquire()
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(RateLimitExceeded, match="1 requests queued"):
+            await limiter.acquire()
+        waiting.cancel()
+
+    asyncio.run(send())
@@ -0,0 +1,207 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from llm import resilience
+from llm.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderError,
+    ProviderResilience,
+    classify_error,
+    parse_retry_after
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 1
+
+    clock.now += 10
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == pytest.approx(20)
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # The probe is still in flight
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_released_probe_can_be_retried(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.release_probe()
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+@pytest.mark.parametrize("value, expected", [("5", 5.0), ("0.5", 0.5), (None, None), ("soon", None)])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def test_classify_error():
+    assert classify_error(asyncio.TimeoutError()).retryable
+    assert classify_error(HTTPError(503)).retryable
+    assert not classify_error(HTTPError(400)).retryable
+    assert not classify_error(ValueError("bad request")).retryable
+
+    throttled = classify_error(HTTPError(429, {"Retry-After": "7"}))
+    assert (throttled.status_code, throttled.retry_after, throttled.retryable) == (429, 7.0, True)
+
+
+def test_call_retries_retryable_failures():
+    policy = ProviderResilience("test", max_attempts=3, base_delay=0, max_delay=0)
+    attempts = []
+    admitted = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ProviderError("busy", status_code=503, retryable=True)
+        return "ok"
+
+    async def admit():
+        admitted.append(1)
+
+    assert asyncio.run(policy.call(flaky, admit=admit)) == "ok"
+    assert len(attempts) == len(admitted) == 3
+    assert policy.retries == 2
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_call_does_not_retry_client_errors():
+    policy = ProviderResilience("test", max_attempts=3, base_delay=0)
+    attempts = []
+
+    async def invalid():
+        attempts.append(1)
+        raise ProviderError("bad request", status_code=400)
+
+    with pytest.raises(ProviderError):
+        asyncio.run(policy.call(invalid))
+    assert len(attempts) == 1
+    assert policy.breaker.consecutive_failures == 0
+
+
+def test_client_error_leaves_a_half_open_circuit_unchanged(clock):
+    policy = ProviderResilience("test", breaker=CircuitBreaker("test", failure_threshold=1, recovery_timeout=30))
+    policy.breaker.record_failure()
+    clock.now += 30
+
+    async def invalid():
+        raise ProviderError("bad request", status_code=400)
+
+    with pytest.raises(ProviderError):
+        asyncio.run(policy.call(invalid))
+    assert policy.breaker.state == CircuitBreaker.HALF_OPEN
+    policy.breaker.before_call()  # The next probe is let through
+
+
+def test_stream_retries_a_stalled_first_chunk():
+    policy = ProviderResilience("test", max_attempts=2, base_delay=0, max_delay=0, attempt_timeout=0.05)
+    attempts = []
+
+    async def chunks():
+        attempts.append(1)
+        if len(attempts) == 1:
+            await asyncio.sleep(1)
+        yield "a"
+        await asyncio.sleep(0.1)  # Later chunks are not timed
+        yield "b"
+
+    async def collect():
+        return [item async for item in policy.stream(chunks)]
+
+    assert asyncio.run(collect()) == ["a", "b"]
+    assert policy.retries == 1
+
+
+def test_empty_stream_succeeds():
+    policy = ProviderResilience("test")
+
+    async def nothing():
+        return
+        yield
+
+    async def collect():
+        return [item async for item in policy.stream(nothing)]
+
+    assert asyncio.run(collect()) == []
+
+
+def test_open_circuit_short_circuits_calls():
+    policy = ProviderResilience("test", max_attempts=1,
+                                breaker=CircuitBreaker("test", failure_threshold=1))
+
+    async def failing():
+        raise ProviderError("down", status_code=502, retryable=True)
+
+    with pytest.raises(ProviderError):
+        asyncio.run(policy.call(failing))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(policy.call(failing))
+    assert policy.short_circuits == 1
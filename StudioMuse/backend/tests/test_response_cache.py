@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from llm.response_cache import ResponseCache, make_cache_key, normalize_prompt
+
+
+def test_normalize_prompt():
+    assert normalize_prompt("  Mix\r\nthese   colors:\t\nred  ") == "Mix these colors: red"
+    # Composed and decomposed forms of "é" are the same prompt
+    assert normalize_prompt("Caf\u00e9") == normalize_prompt("Cafe\u0301")
+
+
+def test_cosmetic_prompt_differences_share_a_key():
+    key = make_cache_key("gemini", "gemini-2.0-flash", 0.7, "Describe\nthe palette")
+    assert make_cache_key("gemini", "gemini-2.0-flash", 0.7, "  Describe \r\n the palette\n") == key
+    assert make_cache_key("gemini", "gemini-2.0-flash", 0.70000001, "Describe the palette") == key
+
+
+@pytest.mark.parametrize("provider, model, temperature, prompt", [
+    ("perplexity", "gemini-2.0-flash", 0.7, "Describe the palette"),
+    ("gemini", "gemini-1.5-pro", 0.7, "Describe the palette"),
+    ("gemini", "gemini-2.0-flash", 0.2, "Describe the palette"),
+    ("gemini", "gemini-2.0-flash", 0.7, "Describe the palettes"),
+    ("gemini", "gemini-2.0-flash", 0.7, "describe the palette"),
+])
+def test_any_other_difference_changes_the_key(provider, model, temperature, prompt):
+    key = make_cache_key("gemini", "gemini-2.0-flash", 0.7, "Describe the palette")
+    assert make_cache_key(provider, model, temperature, prompt) != key
+
+
+def test_call_parameters_change_the_key():
+    key = make_cache_key("gemini", "gemini-2.0-flash", 0.7, "Describe the palette", 500, 10)
+    assert make_cache_key("gemini", "gemini-2.0-flash", 0.7, "Describe the palette", 2048, 10) != key
+    assert make_cache_key("gemini", "gemini-2.0-flash", 0.7, "Describe the palette", 500, 40) != key
+
+
+@pytest.fixture
+def cache():
+    cache = ResponseCache(":memory:", max_entries=3)
+    yield cache
+    cache.close()
+
+
+def test_put_and_get(cache):
+    response = {"text": "[]", "raw_response": {"id": 1}}
+    assert cache.put("key", response, "gemini", "model", 0.7)
+    assert cache.get("key") == response
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_entries_are_misses(cache):
+    cache.put("key", {"text": "old"}, "gemini", "model", 0.7, ttl_seconds=-1)
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for key in ("a", "b", "c"):
+        cache.put(key, {"text": key}, "gemini", "model", 0.7)
+        time.sleep(0.002)
+    cache.get("a")
+    cache.put("d", {"text": "d"}, "gemini", "model", 0.7)
+
+    assert cache.get("b") is None
+    assert [cache.get(key)["text"] for key in ("a", "c", "d")] == ["a", "c", "d"]
+    assert cache.evictions == 1
@@ -0,0 +1,77 @@
+"""Deterministic nearest-color matching between GIMP and physical palettes."""
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from core.utils.color_science import (
+    srgb_to_lab,
+    delta_e_2000_matrix,
+    rgb_dicts_to_array,
+    format_rgb_string
+)
+
+
+class ColorMatcher:
+    """
+    Matches digital colors to the closest physical colors using CIEDE2000.
+
+    The physical palette is converted to CIELAB once, then every call to
+    `match` computes the full target x physical ΔE2000 matrix with NumPy
+    and takes the minimum per row.
+    """
+
+    def __init__(self, physical_colors: Dict[str, Dict[str, float]]):
+        """
+        Args:
+            physical_colors: Mapping of physical color names to RGB
+                dictionaries ("R/G/B" or "r/g/b" keys, 0.0-1.0 range)
+        """
+        if not physical_colors:
+            raise ValueError("ColorMatcher requires at least one physical color with RGB values")
+        self.physical_names, physical_rgb = rgb_dicts_to_array(physical_colors)
+        self.physical_lab = srgb_to_lab(physical_rgb)
+
+    def match(self, gimp_palette_colors: Dict[str, Dict[str, float]]) -> List[Dict[str, Any]]:
+        """
+        Find the nearest physical color for every GIMP color.
+
+        Args:
+            gimp_palette_colors: Mapping of GIMP color names to RGB dictionaries
+
+        Returns:
+            List of mappings in the format expected by
+            ColorBitMagic.format_palette_mapping, in input order
+        """
+        if not gimp_palette_colors:
+            return []
+
+        gimp_names, gimp_rgb = rgb_dicts_to_array(gimp_palette_colors)
+        distances = delta_e_2000_matrix(srgb_to_lab(gimp_rgb), self.physical_lab)
+        nearest = np.argmin(distances, axis=1)
+        nearest_delta_e = distances[np.arange(len(gimp_names)), nearest]
+
+        return [
+            {
+                "gimp_color_name": name,
+                "rgb_color": format_rgb_string(rgb),
+                "physical_color_name": self.physical_names[index],
+                "delta_e": round(float(delta_e), 2),
+                "mixing_suggestions": ""
+            }
+            for name, rgb, index, delta_e in zip(gimp_names, gimp_rgb, nearest, nearest_delta_e)
+        ]
+
+
+def match_palette_colors(gimp_palette_colors: Dict[str, Dict[str, float]],
+                         physical_colors: Optional[Dict[str, Dict[str, float]]]) -> List[Dict[str, Any]]:
+    """
+    Convenience wrapper that builds a ColorMatcher and matches a palette.
+
+    Args:
+        gimp_palette_colors: Mapping of GIMP color names to RGB dictionaries
+        physical_colors: Mapping of physical color names to RGB dictionaries
+
+    Returns:
+        List of color mapping dictionaries
+    """
+    return ColorMatcher(physical_colors or {}).match(gimp_palette_colors)
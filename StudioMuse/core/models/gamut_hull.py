@@ -0,0 +1,347 @@
+"""Lab-space convex hull of a physical palette's reachable colors and gamut checks."""
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.utils.color_science import lab_to_srgb, rgb_to_hex
+
+logger = logging.getLogger("gamut_hull")
+
+# Directions sampled to preselect hull vertex candidates from large point sets
+DEFAULT_DIRECTIONS = 2048
+
+# Directions used for the coarse hull that discards interior points first
+COARSE_DIRECTIONS = 64
+
+# Points within this Lab distance (ΔE76) outside a facet still count as in gamut
+DEFAULT_TOLERANCE = 1.0
+
+# Points and planes compared per block in the vectorized point-in-hull test
+CHUNK_ELEMENTS = 4_000_000
+
+# Hulls kept in memory, keyed by palette content hash and source
+MAX_CACHED_HULLS = 16
+
+_hull_cache: "OrderedDict[Tuple[str, str], GamutHull]" = OrderedDict()
+_hull_cache_lock = threading.Lock()
+
+
+def fibonacci_directions(count: int) -> np.ndarray:
+    """Return `count` roughly uniform unit vectors on the sphere."""
+    index = np.arange(count) + 0.5
+    z = 1.0 - 2.0 * index / count
+    radius = np.sqrt(1.0 - z * z)
+    theta = np.pi * (1.0 + 5.0 ** 0.5) * index
+    return np.stack([radius * np.cos(theta), radius * np.sin(theta), z], axis=1)
+
+
+def extreme_points(points: np.ndarray, directions: int = DEFAULT_DIRECTIONS) -> np.ndarray:
+    """
+    Indices of the points that are furthest along at least one sampled direction.
+    Every returned point is a hull vertex, so the hull of the result is a
+    tight inner approximation of the full hull at a fraction of the cost.
+    """
+    dirs = fibonacci_directions(directions)
+    chunk_size = max(1, CHUNK_ELEMENTS // directions)
+    best = np.full(directions, -np.inf)
+    best_ids = np.zeros(directions, dtype=np.int64)
+    for start in range(0, len(points), chunk_size):
+        projection = dirs @ np.asarray(points[start:start + chunk_size], dtype=np.float64).T
+        arg = np.argmax(projection, axis=1)
+        value = projection[np.arange(directions), arg]
+        better = value > best
+        best[better] = value[better]
+        best_ids[better] = arg[better] + start
+    return np.unique(best_ids)
+
+
+def _planes(points: np.ndarray, faces: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit normals (F, 3) and offsets (F,) of the planes through faces (right-hand winding)."""
+    a, b, c = (points[faces[:, i]] for i in range(3))
+    normals = np.cross(b - a, c - a)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = normals / np.where(lengths > 0, lengths, 1.0)
+    return normals, np.einsum("ij,ij->i", normals, a)
+
+
+def convex_hull(points: np.ndarray, eps: float = 1e-9) -> Optional[np.ndarray]:
+    """
+    Incremental 3D convex hull.
+
+    Args:
+        points: Array of shape (N, 3)
+        eps: Distance below which a point counts as lying on a facet
+
+    Returns:
+        (F, 3) array of outward-facing triangle vertex indices into `points`,
+        or None if the points are degenerate (fewer than 4 or coplanar)
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 4:
+        return None
+
+    # Initial tetrahedron from extreme points
+    i0 = int(np.argmin(points[:, 0]))
+    i1 = int(np.argmax(np.linalg.norm(points - points[i0], axis=1)))
+    line = points[i1] - points[i0]
+    if np.linalg.norm(line) <= eps:
+        return None
+    i2 = int(np.argmax(np.linalg.norm(np.cross(points - points[i0], line), axis=1)))
+    normal = np.cross(line, points[i2] - points[i0])
+    if np.linalg.norm(normal) <= eps:
+        return None
+    heights = (points - points[i0]) @ (normal / np.linalg.norm(normal))
+    i3 = int(np.argmax(np.abs(heights)))
+    if abs(heights[i3]) <= eps:
+        return None
+
+    faces = np.array([(i0, i1, i2), (i0, i2, i3), (i0, i3, i1), (i1, i3, i2)], dtype=np.int64)
+    if heights[i3] > 0:
+        faces = faces[:, [0, 2, 1]]
+    normals, offsets = _planes(points, faces)
+
+    # Insert the remaining points furthest-first, so most later points are already inside
+    centroid = points[[i0, i1, i2, i3]].mean(axis=0)
+    order = np.argsort(-np.linalg.norm(points - centroid, axis=1))
+    for index in order:
+        if index in (i0, i1, i2, i3):
+            continue
+        visible = normals @ points[index] - offsets > eps
+        if not visible.any():
+            continue
+
+        # The horizon is every edge of a visible face whose twin is not visible
+        visible_edges = set()
+        for a, b, c in faces[visible].tolist():
+            visible_edges.update([(a, b), (b, c), (c, a)])
+        horizon = [(a, b) for a, b in visible_edges if (b, a) not in visible_edges]
+
+        new_faces = np.array([(a, b, index) for a, b in horizon], dtype=np.int64)
+        new_normals, new_offsets = _planes(points, new_faces)
+        faces = np.concatenate([faces[~visible], new_faces])
+        normals = np.concatenate([normals[~visible], new_normals])
+        offsets = np.concatenate([offsets[~visible], new_offsets])
+
+    return faces
+
+
+class GamutHull:
+    """
+    Convex hull of the Lab colors a physical palette can reach.
+
+    Stored as the hull vertices plus one outward plane per facet, so the
+    point-in-hull test is a single matrix product: a color is inside when
+    it lies behind every plane.
+    """
+
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray, content_hash: str = ""):
+        """
+        Args:
+            vertices: Array of shape (V, 3), Lab hull vertices
+            faces: Array of shape (F, 3), outward triangle indices into `vertices`
+            content_hash: Hash of the palette colors the hull was built from
+        """
+        self.vertices = vertices
+        self.faces = faces
+        self.content_hash = content_hash
+        self.normals, self.offsets = _planes(vertices, faces.reshape(-1, 3))
+
+    @property
+    def is_degenerate(self) -> bool:
+        """True if the colors span no volume (fewer than 4 or coplanar)."""
+        return not len(self.faces)
+
+    @classmethod
+    def from_points(cls, points: np.ndarray, content_hash: str = "",
+                    directions: int = DEFAULT_DIRECTIONS) -> "GamutHull":
+        """
+        Build the hull of a Lab point set.
+
+        Large sets (e.g. a mixing lattice) are first reduced to the points
+        that are extreme along one of `directions` sampled directions.
+
+        Args:
+            points: Array of shape (N, 3) with Lab colors
+            content_hash: Hash of the palette colors
+            directions: Number of sampled directions for large point sets
+
+        Returns:
+            GamutHull instance
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if len(points) > directions:
+            # Points strictly inside a coarse hull can never be hull vertices
+            coarse = points[extreme_points(points, COARSE_DIRECTIONS)]
+            coarse_faces = convex_hull(coarse)
+            if coarse_faces is not None:
+                coarse_hull = cls(coarse, coarse_faces)
+                points = points[coarse_hull.signed_distance(points) > -1e-6]
+            points = points[extreme_points(points, directions)]
+        points = np.unique(np.round(points, 6), axis=0)
+
+        faces = convex_hull(points)
+        if faces is None:
+            logger.info(f"Gamut hull is degenerate ({len(points)} points)")
+            return cls(points, np.zeros((0, 3), dtype=np.int64), content_hash)
+
+        used = np.unique(faces)
+        remap = np.full(len(points), -1, dtype=np.int64)
+        remap[used] = np.arange(len(used))
+        logger.info(f"Built gamut hull with {len(used)} vertices and {len(faces)} facets")
+        return cls(points[used], remap[faces], content_hash)
+
+    def volume(self) -> float:
+        """Hull volume in cubic Lab units."""
+        if self.is_degenerate:
+            return 0.0
+        a, b, c = (self.vertices[self.faces[:, i]] for i in range(3))
+        return float(np.abs(np.einsum("ij,ij->i", a, np.cross(b, c)).sum()) / 6.0)
+
+    def signed_distance(self, lab: np.ndarray) -> np.ndarray:
+        """
+        Largest signed distance of each color to the hull's facet planes.
+
+        Negative inside, positive outside; outside the hull this is a
+        lower bound on the ΔE76 distance to the nearest reachable color.
+
+        Args:
+            lab: Array of shape (M, 3)
+
+        Returns:
+            Array of shape (M,)
+        """
+        lab = np.asarray(lab, dtype=np.float64).reshape(-1, 3)
+        if self.is_degenerate:
+            return np.full(len(lab), np.inf)
+        distance = np.empty(len(lab))
+        chunk_size = max(1, CHUNK_ELEMENTS // len(self.offsets))
+        for start in range(0, len(lab), chunk_size):
+            block = lab[start:start + chunk_size]
+            distance[start:start + len(block)] = (block @ self.normals.T - self.offsets).max(axis=1)
+        return distance
+
+    def contains(self, lab: np.ndarray, tolerance: float = DEFAULT_TOLERANCE) -> np.ndarray:
+        """
+        Vectorized point-in-hull test.
+
+        Args:
+            lab: Array of shape (M, 3)
+            tolerance: Allowed distance outside a facet
+
+        Returns:
+            Boolean array of shape (M,)
+        """
+        return self.signed_distance(lab) <= tolerance
+
+
+@dataclass
+class GamutReport:
+    """Out-of-gamut summary of an image against a physical palette."""
+    palette_name: str
+    source: str
+    total_pixels: int
+    outside_pixels: int
+    outside_fraction: float
+    regions: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return asdict(self)
+
+    def describe(self) -> str:
+        """Return a short human readable summary."""
+        lines = [f"{self.outside_fraction:.1%} of pixels are outside the gamut of "
+                 f"'{self.palette_name}' ({self.source})."]
+        for region in self.regions:
+            lines.append(f"  {region['hex_value']}: {region['pixel_fraction']:.1%} of pixels, "
+                         f"up to ΔE {region['max_distance']:.1f} outside")
+        return "\n".join(lines)
+
+
+def analyze_gamut(histogram, hull: GamutHull, palette_name: str = "", source: str = "",
+                  top_regions: int = 5, tolerance: float = DEFAULT_TOLERANCE) -> GamutReport:
+    """
+    Classify an image's color histogram against a gamut hull.
+
+    Every occupied histogram bin is tested once, so the cost depends on the
+    number of distinct colors, not on the image size. Out-of-gamut bins are
+    grouped by the histogram's coarse Lab bins to report the worst regions.
+
+    Args:
+        histogram: ColorHistogram of the reference image
+        hull: GamutHull of the physical palette
+        palette_name: Name used in the report
+        source: "colors" or "mixing lattice", used in the report
+        top_regions: Number of worst regions reported
+        tolerance: Allowed ΔE76 outside the hull
+
+    Returns:
+        GamutReport instance
+    """
+    lab, counts = histogram.lab_samples()
+    distance = hull.signed_distance(lab)
+    outside = distance > tolerance
+    total = int(counts.sum())
+    outside_pixels = int(counts[outside].sum())
+
+    regions = []
+    if outside.any():
+        out_lab, out_counts, out_distance = lab[outside], counts[outside], distance[outside]
+        region_ids = histogram.lab_bin_index(out_lab)
+        if hull.is_degenerate:
+            out_distance = np.zeros(len(out_lab))
+        # Regions are ranked by pixel count weighted by how far outside they are
+        pixels = np.bincount(region_ids, weights=out_counts)
+        severity = np.bincount(region_ids, weights=out_counts * np.minimum(out_distance, 100.0))
+        for region in np.argsort(-severity)[:top_regions]:
+            if pixels[region] <= 0:
+                break
+            members = region_ids == region
+            center = np.average(out_lab[members], axis=0, weights=out_counts[members])
+            regions.append({
+                "lab": [round(float(v), 2) for v in center],
+                "hex_value": rgb_to_hex(lab_to_srgb(center)),
+                "pixel_fraction": round(float(pixels[region]) / max(1, total), 4),
+                "mean_distance": round(float(severity[region] / pixels[region]), 2),
+                "max_distance": round(float(out_distance[members].max()), 2)
+            })
+
+    return GamutReport(
+        palette_name=palette_name,
+        source=source,
+        total_pixels=total,
+        outside_pixels=outside_pixels,
+        outside_fraction=round(outside_pixels / max(1, total), 4),
+        regions=regions
+    )
+
+
+def get_cached_hull(content_hash: str, source: str, build) -> GamutHull:
+    """
+    Return a hull from the in-memory cache, building it on a miss.
+
+    Args:
+        content_hash: Hash of the palette colors
+        source: Which point set the hull covers ("colors" or "mixing lattice")
+        build: Callable returning a new GamutHull
+
+    Returns:
+        GamutHull instance
+    """
+    key = (content_hash, source)
+    with _hull_cache_lock:
+        hull = _hull_cache.get(key)
+        if hull is not None:
+            _hull_cache.move_to_end(key)
+            return hull
+
+    hull = build()
+    with _hull_cache_lock:
+        _hull_cache[key] = hull
+        while len(_hull_cache) > MAX_CACHED_HULLS:
+            _hull_cache.popitem(last=False)
+    return hull
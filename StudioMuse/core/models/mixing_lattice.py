@@ -0,0 +1,199 @@
+"""Precomputed, memory-mapped mixing lattice for physical palettes."""
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.models.palette_index import LabKDTree
+from core.models.pigment_mixing import PigmentMixer, MixingRecipe
+from core.utils.color_science import srgb_to_lab, lab_to_srgb, delta_e_2000, rgb_dicts_to_array
+from core.utils.file_io import save_json_data, load_json_data
+
+logger = logging.getLogger("mixing_lattice")
+
+LATTICE_SUFFIX = ".lattice.npy"
+RECIPES_SUFFIX = ".recipes.npy"
+TREE_SUFFIX = ".lattice.npz"
+META_SUFFIX = ".lattice.json"
+
+# Ratios are stored as integer parts of this denominator; it is divisible by
+# every supported step count (2, 3, 4, 5, 6, 8, 10, 12, 15, ...)
+LATTICE_DENOMINATOR = 120
+
+
+def get_lattice_base_path(palette_path: str) -> str:
+    """Return the base path (without suffix) of the lattice sidecars for a palette JSON file."""
+    return os.path.splitext(palette_path)[0]
+
+
+class MixingLattice:
+    """
+    All pigment mixes of a physical palette at fixed ratio steps.
+
+    The lattice is stored as a compact float32 Lab array plus an int16 recipe
+    table (three pigment indices and three ratio parts per row). Both are kept
+    in k-d tree order, so the tree sidecar only needs the node arrays and the
+    Lab array can be memory-mapped directly as the tree's points.
+    """
+
+    def __init__(self, lab: np.ndarray, recipes: np.ndarray, pigment_names: List[str],
+                 tree: LabKDTree, content_hash: str = "", complexity_penalty: float = 0.5):
+        """
+        Args:
+            lab: Array of shape (M, 3), float32 Lab values in tree order
+            recipes: Array of shape (M, 6), int16 [index x3, parts x3]
+            pigment_names: Names of the palette pigments
+            tree: k-d tree over `lab`
+            content_hash: Hash of the palette colors the lattice was built from
+            complexity_penalty: ΔE added per extra pigment when ranking recipes
+        """
+        self.lab = lab
+        self.recipes = recipes
+        self.pigment_names = pigment_names
+        self.tree = tree
+        self.content_hash = content_hash
+        self.complexity_penalty = complexity_penalty
+
+    def __len__(self) -> int:
+        return len(self.lab)
+
+    @classmethod
+    def build(cls, pigments: Dict[str, Dict[str, float]], content_hash: str = "",
+              max_pigments: int = 3, pair_steps: int = 8, triple_steps: int = 5) -> "MixingLattice":
+        """
+        Precompute every mix of the given pigments.
+
+        Args:
+            pigments: Mapping of pigment names to RGB dictionaries
+            content_hash: Hash of the palette colors, used to detect stale files
+            max_pigments: 2 for pairs only, 3 to include triples
+            pair_steps: Number of parts used for 2-pigment ratios
+            triple_steps: Number of parts used for 3-pigment ratios
+
+        Returns:
+            MixingLattice instance
+        """
+        for steps in (pair_steps, triple_steps):
+            if LATTICE_DENOMINATOR % steps:
+                raise ValueError(f"Ratio steps must divide {LATTICE_DENOMINATOR}, got {steps}")
+
+        mixer = PigmentMixer(pigments, max_pigments=max_pigments,
+                             pair_steps=pair_steps, triple_steps=triple_steps)
+        tree = LabKDTree(mixer.candidate_lab, leaf_size=32, content_hash=content_hash)
+
+        order = tree.ids
+        recipes = np.empty((len(order), 6), dtype=np.int16)
+        recipes[:, :3] = mixer.indices[order]
+        recipes[:, 3:] = np.rint(mixer.weights[order] * LATTICE_DENOMINATOR)
+
+        lab = tree.points.astype(np.float32)
+        tree.points = lab
+        tree.ids = np.arange(len(lab))
+        logger.info(f"Built mixing lattice with {len(lab)} mixes of {len(mixer.names)} pigments")
+        return cls(lab, recipes, list(mixer.names), tree, content_hash)
+
+    def save(self, base_path: str) -> bool:
+        """
+        Write the lattice sidecars next to the palette JSON.
+
+        Args:
+            base_path: Palette path without the .json extension
+
+        Returns:
+            True if save was successful, False otherwise
+        """
+        try:
+            for suffix, array in ((LATTICE_SUFFIX, self.lab), (RECIPES_SUFFIX, self.recipes)):
+                tmp_path = f"{base_path}{suffix}.tmp"
+                with open(tmp_path, "wb") as f:
+                    np.save(f, np.ascontiguousarray(array))
+                os.replace(tmp_path, f"{base_path}{suffix}")
+
+            if not self.tree.save(f"{base_path}{TREE_SUFFIX}", include_points=False):
+                return False
+
+            # The metadata is written last so a half-written lattice is never considered valid
+            return save_json_data({
+                "content_hash": self.content_hash,
+                "pigment_names": self.pigment_names,
+                "denominator": LATTICE_DENOMINATOR,
+                "count": len(self.lab)
+            }, f"{base_path}{META_SUFFIX}", indent=2)
+        except Exception as e:
+            logger.error(f"Error saving mixing lattice to {base_path}: {e}")
+            return False
+
+    @classmethod
+    def load(cls, base_path: str, content_hash: Optional[str] = None) -> Optional["MixingLattice"]:
+        """
+        Memory-map a saved lattice.
+
+        Args:
+            base_path: Palette path without the .json extension
+            content_hash: If given, the lattice is only returned when it was
+                built from palette colors with the same hash
+
+        Returns:
+            MixingLattice instance, or None if missing, stale or unreadable
+        """
+        meta = load_json_data(f"{base_path}{META_SUFFIX}", default=None,
+                              required_fields=["content_hash", "pigment_names"])
+        if meta is None:
+            return None
+        if content_hash is not None and meta["content_hash"] != content_hash:
+            logger.info(f"Mixing lattice is stale: {base_path}")
+            return None
+        try:
+            lab = np.load(f"{base_path}{LATTICE_SUFFIX}", mmap_mode="r")
+            recipes = np.load(f"{base_path}{RECIPES_SUFFIX}", mmap_mode="r")
+            tree = LabKDTree.load(f"{base_path}{TREE_SUFFIX}", meta["content_hash"], points=lab)
+            if tree is None or len(recipes) != len(lab):
+                return None
+            return cls(lab, recipes, meta["pigment_names"], tree, meta["content_hash"])
+        except Exception as e:
+            logger.error(f"Error loading mixing lattice from {base_path}: {e}")
+            return None
+
+    def lookup(self, targets: Dict[str, Dict[str, float]], k: int = 16) -> List[MixingRecipe]:
+        """
+        Find the best precomputed recipe for each target color.
+
+        Each target is a k-nearest query on the lattice tree (ΔE76); the k
+        hits are then reranked with CIEDE2000 and a per-pigment penalty.
+
+        Args:
+            targets: Mapping of target names to RGB dictionaries
+            k: Number of lattice neighbors reranked per target
+
+        Returns:
+            List of MixingRecipe objects in target order
+        """
+        if not targets or not len(self.lab):
+            return []
+
+        target_names, target_rgb = rgb_dicts_to_array(targets)
+        target_lab = srgb_to_lab(target_rgb)
+        k = min(k, len(self.lab))
+        neighbor_ids = np.array([self.tree.query(lab, k)[1] for lab in target_lab])
+
+        candidate_recipes = np.asarray(self.recipes[neighbor_ids.ravel()]).reshape(len(target_names), k, 6)
+        candidate_lab = np.asarray(self.lab[neighbor_ids.ravel()], dtype=np.float64).reshape(len(target_names), k, 3)
+        delta_e = delta_e_2000(target_lab[:, None, :], candidate_lab)
+        pigment_counts = (candidate_recipes[..., 3:] > 0).sum(axis=2)
+        winner = np.argmin(delta_e + self.complexity_penalty * (pigment_counts - 1), axis=1)
+
+        recipes = []
+        for row, name in enumerate(target_names):
+            column = winner[row]
+            recipe = candidate_recipes[row, column]
+            used = recipe[3:] > 0
+            r, g, b = lab_to_srgb(candidate_lab[row, column])
+            recipes.append(MixingRecipe(
+                target_name=name,
+                pigments=[self.pigment_names[i] for i in recipe[:3][used]],
+                ratios=[round(float(p) / LATTICE_DENOMINATOR, 3) for p in recipe[3:][used]],
+                delta_e=round(float(delta_e[row, column]), 2),
+                predicted_rgb={"r": round(float(r), 3), "g": round(float(g), 3), "b": round(float(b), 3)}
+            ))
+        return recipes
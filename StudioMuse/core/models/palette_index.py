@@ -0,0 +1,300 @@
+"""Persistent Lab-space k-d tree for physical palette lookups."""
+import hashlib
+import heapq
+import json
+import logging
+import os
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("palette_index")
+
+INDEX_SUFFIX = ".kdtree.npz"
+
+# Up to this many points a vectorized scan over all of them beats walking
+# the tree node by node in Python (palettes; mixing lattices use the tree)
+BRUTE_FORCE_MAX_POINTS = 4096
+
+
+def palette_content_hash(colors: List[Any]) -> str:
+    """
+    Hash the names and RGB values of a list of colors.
+    Used to invalidate persisted indexes when a palette changes.
+
+    Args:
+        colors: List of ColorData objects or color dictionaries
+
+    Returns:
+        Hex digest string
+    """
+    entries = []
+    for color in colors:
+        data = color.to_dict() if hasattr(color, "to_dict") else color
+        if isinstance(data, dict):
+            entries.append([data.get("name"), data.get("rgb") or {}])
+        else:
+            entries.append([str(data), {}])
+    payload = json.dumps(entries, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
+def get_index_path(palette_path: str) -> str:
+    """Return the k-d tree sidecar path for a palette JSON file."""
+    return os.path.splitext(palette_path)[0] + INDEX_SUFFIX
+
+
+class LabKDTree:
+    """
+    Static k-d tree over 3D (CIELAB) points.
+
+    Nodes are stored in flat NumPy arrays and points are reordered so every
+    leaf covers a contiguous slice, which keeps the tree cheap to persist
+    and to memory-map. Distances are Euclidean in Lab (ΔE76). Sets of up to
+    BRUTE_FORCE_MAX_POINTS points are searched with one vectorized scan
+    instead of a traversal.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 8,
+                 ids: Optional[np.ndarray] = None, content_hash: str = ""):
+        """
+        Args:
+            points: Array of shape (N, 3) with Lab coordinates
+            leaf_size: Maximum number of points stored in a leaf
+            ids: Optional caller ids for each point (defaults to 0..N-1)
+            content_hash: Hash of the data the tree was built from
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        ids = np.arange(len(points)) if ids is None else np.asarray(ids, dtype=np.int64)
+        self.leaf_size = max(1, int(leaf_size))
+        self.content_hash = content_hash
+
+        order = np.arange(len(points))
+        nodes: List[List[int]] = []
+        split_values: List[float] = []
+        if len(points):
+            self._build(points, order, 0, len(points), nodes, split_values)
+
+        self.points = points[order]
+        self.ids = ids[order]
+        self.nodes = np.array(nodes, dtype=np.int64).reshape(-1, 5)
+        self.split_values = np.array(split_values, dtype=np.float64)
+        self._prepare()
+
+    def _build(self, points, order, start, end, nodes, split_values) -> int:
+        """Recursively build nodes for order[start:end] and return the node index."""
+        node_index = len(nodes)
+        # Node layout: [split_dim, left, right, start, end]; split_dim -1 marks a leaf
+        nodes.append([-1, -1, -1, start, end])
+        split_values.append(0.0)
+
+        if end - start <= self.leaf_size:
+            return node_index
+
+        subset = points[order[start:end]]
+        dim = int(np.argmax(np.ptp(subset, axis=0)))
+        order[start:end] = order[start:end][np.argsort(subset[:, dim], kind="stable")]
+        mid = (start + end) // 2
+        split_values[node_index] = float(points[order[mid], dim])
+
+        left = self._build(points, order, start, mid, nodes, split_values)
+        right = self._build(points, order, mid, end, nodes, split_values)
+        nodes[node_index] = [dim, left, right, start, end]
+        return node_index
+
+    def _prepare(self):
+        """Cache plain Python copies of the node arrays for fast traversal."""
+        self._node_list = self.nodes.tolist()
+        self._split_list = self.split_values.tolist()
+        self._norms = None
+        self._norms_points = None
+
+    def _scan(self, query: np.ndarray) -> np.ndarray:
+        """Squared distances from the query to every point, in one vectorized pass."""
+        # |p - q|^2 = |p|^2 - 2 p.q + |q|^2, with |p|^2 cached for the current points
+        if self._norms_points is not self.points:
+            self._norms = np.einsum("ij,ij->i", self.points, self.points, dtype=np.float64)
+            self._norms_points = self.points
+        return np.maximum(self._norms - 2.0 * (self.points @ query) + query @ query, 0.0)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def query(self, point, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest points.
+
+        Args:
+            point: Lab coordinates of the query point
+            k: Number of neighbors to return
+
+        Returns:
+            Tuple of (distances, ids) sorted by increasing distance
+        """
+        if not len(self.points) or k <= 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+
+        query = np.asarray(point, dtype=np.float64).reshape(3)
+        k = min(int(k), len(self.points))
+        if len(self.points) <= BRUTE_FORCE_MAX_POINTS:
+            dist = self._scan(query)
+            if k < len(dist):
+                positions = np.argpartition(dist, k - 1)[:k]
+                positions = positions[np.argsort(dist[positions], kind="stable")]
+            else:
+                positions = np.argsort(dist, kind="stable")
+            return np.sqrt(dist[positions]), self.ids[positions]
+
+        q = query.tolist()
+        best: List[Tuple[float, int]] = []  # max-heap of (-squared distance, position)
+        stack = [(0, 0.0)]
+
+        while stack:
+            node_index, bound = stack.pop()
+            if len(best) == k and bound > -best[0][0]:
+                continue
+            dim, left, right, start, end = self._node_list[node_index]
+            if dim < 0:
+                diff = self.points[start:end] - query
+                for offset, dist in enumerate(np.einsum("ij,ij->i", diff, diff).tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-dist, start + offset))
+                    elif dist < -best[0][0]:
+                        heapq.heapreplace(best, (-dist, start + offset))
+                continue
+            delta = q[dim] - self._split_list[node_index]
+            near, far = (left, right) if delta < 0 else (right, left)
+            # Push the far side first so the near side is explored first
+            stack.append((far, max(bound, delta * delta)))
+            stack.append((near, bound))
+
+        best.sort(key=lambda item: -item[0])
+        distances = np.sqrt([-d for d, _ in best])
+        positions = [p for _, p in best]
+        return distances, self.ids[positions]
+
+    def query_radius(self, point, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find all points within a radius.
+
+        Args:
+            point: Lab coordinates of the query point
+            radius: Maximum Euclidean Lab distance (ΔE76)
+
+        Returns:
+            Tuple of (distances, ids) sorted by increasing distance
+        """
+        if not len(self.points):
+            return np.empty(0), np.empty(0, dtype=np.int64)
+
+        query = np.asarray(point, dtype=np.float64).reshape(3)
+        radius_sq = float(radius) ** 2
+        if len(self.points) <= BRUTE_FORCE_MAX_POINTS:
+            dist = self._scan(query)
+            positions = np.nonzero(dist <= radius_sq)[0]
+            positions = positions[np.argsort(dist[positions], kind="stable")]
+            return np.sqrt(dist[positions]), self.ids[positions]
+
+        q = query.tolist()
+        hits_dist: List[np.ndarray] = []
+        hits_pos: List[np.ndarray] = []
+        stack = [0]
+
+        while stack:
+            node_index = stack.pop()
+            dim, left, right, start, end = self._node_list[node_index]
+            if dim < 0:
+                diff = self.points[start:end] - query
+                dist = np.einsum("ij,ij->i", diff, diff)
+                mask = dist <= radius_sq
+                if mask.any():
+                    hits_dist.append(dist[mask])
+                    hits_pos.append(np.nonzero(mask)[0] + start)
+                continue
+            delta = q[dim] - self._split_list[node_index]
+            if delta < 0 or delta * delta <= radius_sq:
+                stack.append(left)
+            if delta >= 0 or delta * delta <= radius_sq:
+                stack.append(right)
+
+        if not hits_dist:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        dist = np.concatenate(hits_dist)
+        positions = np.concatenate(hits_pos)
+        order = np.argsort(dist, kind="stable")
+        return np.sqrt(dist[order]), self.ids[positions[order]]
+
+    def save(self, path: str, include_points: bool = True) -> bool:
+        """
+        Persist the tree to an .npz file.
+
+        Args:
+            path: Target file path
+            include_points: Store the points and ids as well. Callers that
+                keep the points in tree order elsewhere (e.g. a memory-mapped
+                .npy file) can store only the node arrays.
+
+        Returns:
+            True if save was successful, False otherwise
+        """
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            arrays = {
+                "nodes": self.nodes,
+                "split_values": self.split_values,
+                "leaf_size": np.array(self.leaf_size),
+                "content_hash": np.array(self.content_hash)
+            }
+            if include_points:
+                arrays["points"] = self.points
+                arrays["ids"] = self.ids
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+            logger.info(f"Palette index saved to {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving palette index to {path}: {e}")
+            return False
+
+    @classmethod
+    def load(cls, path: str, content_hash: Optional[str] = None,
+             points: Optional[np.ndarray] = None) -> Optional["LabKDTree"]:
+        """
+        Load a persisted tree.
+
+        Args:
+            path: Path to the .npz file
+            content_hash: If given, the tree is only returned when it was
+                built from data with the same hash
+            points: Points in tree order for trees saved without them;
+                ids are then the point positions
+
+        Returns:
+            LabKDTree instance, or None if missing, stale or unreadable
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                stored_hash = str(data["content_hash"])
+                if content_hash is not None and stored_hash != content_hash:
+                    logger.info(f"Palette index is stale: {path}")
+                    return None
+                tree = cls.__new__(cls)
+                if points is None:
+                    tree.points = data["points"]
+                    tree.ids = data["ids"]
+                else:
+                    tree.points = points
+                    tree.ids = np.arange(len(points))
+                tree.nodes = data["nodes"]
+                tree.split_values = data["split_values"]
+                tree.leaf_size = int(data["leaf_size"])
+                tree.content_hash = stored_hash
+            tree._prepare()
+            return tree
+        except Exception as e:
+            logger.error(f"Error loading palette index from {path}: {e}")
+            return None
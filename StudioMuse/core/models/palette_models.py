@@ -1,7 +1,14 @@
 """Basic data models for palette processing."""
 from datetime import datetime
 import json
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
+
+from core.models.palette_index import LabKDTree, palette_content_hash
+from core.models.mixing_lattice import MixingLattice
+from core.models.gamut_hull import GamutHull, get_cached_hull
+from core.models.pigment_mixing import PigmentMixer
+from core.utils.color_science import srgb_to_lab, rgb_dict_to_tuple, rgb_dicts_to_array
+from core.utils.color_names import ColorNameResolver, get_color_name_resolver
 
 class ColorData:
     """Model for a single color with metadata."""
@@ -23,6 +30,9 @@ class ColorData:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "ColorData":
         """Create from dictionary."""
+        # Palettes saved from LLM responses store plain color names
+        if isinstance(data, str):
+            return cls(name=data, hex_value="#000000")
         return cls(
             name=data.get("name", "Unnamed"),
             hex_value=data.get("hex_value", "#000000"),
@@ -84,6 +94,157 @@ class PhysicalPalette(PaletteData):
         self.additional_notes = additional_notes
         self.manufacturer = manufacturer
         self.palette_type = "physical"
+        self.index_path: Optional[str] = None
+        self.lattice_path: Optional[str] = None
+        self._index: Optional[LabKDTree] = None
+        self._lattice: Optional[MixingLattice] = None
+    
+    def content_hash(self) -> str:
+        """Return a hash of the color names and RGB values in this palette."""
+        return palette_content_hash(self.colors)
+    
+    def get_pigment_colors(self) -> Dict[str, Dict[str, float]]:
+        """Return a name -> RGB mapping for the colors that have RGB values."""
+        return {color.name: color.rgb for color in self.colors if color.rgb}
+    
+    def resolve_color_values(self, resolver: Optional[ColorNameResolver] = None) -> int:
+        """
+        Fill in RGB and hex values for colors that only have a name, using
+        the offline color-name resolver.
+        
+        Args:
+            resolver: Optional resolver (defaults to the bundled dictionary)
+            
+        Returns:
+            Number of colors that were resolved
+        """
+        resolver = resolver or get_color_name_resolver()
+        resolved_count = 0
+        for color in self.colors:
+            if color.rgb:
+                continue
+            resolved = resolver.resolve(color.name)
+            if resolved is None:
+                continue
+            color.rgb = resolved.rgb
+            color.hex_value = resolved.hex_value
+            if not color.notes:
+                color.notes = f"Reference color: {resolved.name}"
+            resolved_count += 1
+        return resolved_count
+    
+    def build_index(self) -> LabKDTree:
+        """Build a Lab-space k-d tree over the colors that have RGB values."""
+        color_ids = [i for i, color in enumerate(self.colors) if color.rgb]
+        rgb = [rgb_dict_to_tuple(self.colors[i].rgb) for i in color_ids]
+        lab = srgb_to_lab(rgb) if rgb else []
+        return LabKDTree(lab, ids=color_ids, content_hash=self.content_hash())
+    
+    def get_index(self) -> LabKDTree:
+        """
+        Return the k-d tree for this palette.
+        Uses the persisted index at `index_path` when it matches the current
+        colors, otherwise rebuilds it and writes it back.
+        """
+        content_hash = self.content_hash()
+        if self._index is not None and self._index.content_hash == content_hash:
+            return self._index
+        
+        index = LabKDTree.load(self.index_path, content_hash) if self.index_path else None
+        if index is None:
+            index = self.build_index()
+            if self.index_path:
+                index.save(self.index_path)
+        self._index = index
+        return index
+    
+    def build_mixing_lattice(self, max_pigments: int = 3) -> Optional[MixingLattice]:
+        """
+        Precompute the mixing lattice for this palette and save it to `lattice_path`.
+        
+        Args:
+            max_pigments: 2 for pairs only, 3 to include triples
+            
+        Returns:
+            MixingLattice instance, or None if no colors have RGB values
+        """
+        pigments = self.get_pigment_colors()
+        if not pigments:
+            return None
+        lattice = MixingLattice.build(pigments, self.content_hash(), max_pigments=max_pigments)
+        if self.lattice_path:
+            lattice.save(self.lattice_path)
+        self._lattice = lattice
+        return lattice
+    
+    def get_mixing_lattice(self) -> Optional[MixingLattice]:
+        """
+        Return the memory-mapped mixing lattice for this palette.
+        Returns None if it has not been built yet or is stale.
+        """
+        content_hash = self.content_hash()
+        if self._lattice is not None and self._lattice.content_hash == content_hash:
+            return self._lattice
+        if not self.lattice_path:
+            return None
+        self._lattice = MixingLattice.load(self.lattice_path, content_hash)
+        return self._lattice
+    
+    def get_gamut_hull(self, include_mixes: bool = True) -> Optional[GamutHull]:
+        """
+        Return the Lab convex hull of the colors this palette can reach.
+        Hulls are cached per palette content, so checking another image is instant.
+        
+        Args:
+            include_mixes: Build the hull over all pigment mixes (the saved
+                mixing lattice if available) instead of the pure colors only
+            
+        Returns:
+            GamutHull instance, or None if no colors have RGB values
+        """
+        pigments = self.get_pigment_colors()
+        if not pigments:
+            return None
+        content_hash = self.content_hash()
+        
+        if not include_mixes:
+            _, rgb = rgb_dicts_to_array(pigments)
+            return get_cached_hull(content_hash, "colors",
+                                   lambda: GamutHull.from_points(srgb_to_lab(rgb), content_hash))
+        
+        def build():
+            lattice = self.get_mixing_lattice()
+            points = lattice.lab if lattice is not None else PigmentMixer(pigments).candidate_lab
+            return GamutHull.from_points(points, content_hash)
+        return get_cached_hull(content_hash, "mixes", build)
+    
+    def nearest_colors(self, rgb: Dict[str, float], k: int = 1) -> List[Tuple[ColorData, float]]:
+        """
+        Find the k physical colors closest to an RGB color.
+        
+        Args:
+            rgb: RGB dictionary ("r/g/b" or "R/G/B" keys, 0.0-1.0 range)
+            k: Number of colors to return
+            
+        Returns:
+            List of (ColorData, ΔE76 distance) tuples, closest first
+        """
+        distances, ids = self.get_index().query(srgb_to_lab(rgb_dict_to_tuple(rgb)), k)
+        return [(self.colors[i], float(d)) for d, i in zip(distances, ids)]
+    
+    def colors_within(self, rgb: Dict[str, float], radius: float) -> List[Tuple[ColorData, float]]:
+        """
+        Find all physical colors within a Lab distance of an RGB color.
+        
+        Args:
+            rgb: RGB dictionary ("r/g/b" or "R/G/B" keys, 0.0-1.0 range)
+            radius: Maximum ΔE76 distance
+            
+        Returns:
+            List of (ColorData, ΔE76 distance) tuples, closest first
+        """
+        distances, ids = self.get_index().query_radius(srgb_to_lab(rgb_dict_to_tuple(rgb)), radius)
+        return [(self.colors[i], float(d)) for d, i in zip(distances, ids)]
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary including physical palette specific fields."""
@@ -99,7 +260,7 @@ class PhysicalPalette(PaletteData):
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "PhysicalPalette":
         """Create from dictionary."""
-        palette = super().from_dict(data)
+        palette = PaletteData.from_dict(data)
         return cls(
             name=palette.name,
             colors=palette.colors,
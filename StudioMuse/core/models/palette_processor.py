@@ -2,6 +2,7 @@
 import os
 import json
 import logging
+import threading
 from typing import Dict, List, Any, Optional, Union
 from gi.repository import Gimp, Gegl
 import gi
@@ -9,6 +10,8 @@ gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Gdk
 
 from .palette_models import PaletteData, PhysicalPalette, ColorData
+from .palette_index import get_index_path
+from .mixing_lattice import get_lattice_base_path
 from core.utils.file_io import get_plugin_storage_path, save_json_data, load_json_data
 
 # Configure logging
@@ -43,6 +46,9 @@ class PaletteProcessor:
             # Create full path
             filepath = os.path.join(base_dir, filename)
             
+            # Give name-only physical colors reference RGB values before saving
+            palette = PaletteProcessor.resolve_palette_colors(palette)
+            
             # Use the centralized utility to save the file
             if hasattr(palette, 'to_json'):
                 # First convert to dict if the palette object has custom serialization
@@ -53,12 +59,82 @@ class PaletteProcessor:
                 save_success = save_json_data(palette, filepath, create_dirs=True, indent=2)
             
             if save_success:
+                PaletteProcessor.build_palette_index(palette, filepath)
+                PaletteProcessor.build_mixing_lattice_async(palette, filepath)
                 return filepath
             return None
         except Exception as e:
             log_error("Failed to save palette", e)
             return None
     
+    @staticmethod
+    def resolve_palette_colors(palette: Union[PaletteData, Dict[str, Any]]) -> Union[PaletteData, Dict[str, Any]]:
+        """
+        Enrich a physical palette's colors with reference RGB and hex values.
+        Dictionaries are returned as a copy whose colors are ColorData dictionaries;
+        other fields (e.g. the raw LLM response) are kept as they are.
+        """
+        try:
+            physical = PaletteProcessor._as_physical_palette(palette)
+            if physical is None:
+                return palette
+            
+            resolved_count = physical.resolve_color_values()
+            logger.info(f"Resolved {resolved_count} of {len(physical.colors)} colors for '{physical.name}'")
+            if isinstance(palette, dict):
+                return {**palette, "colors": [color.to_dict() for color in physical.colors]}
+            return physical
+        except Exception as e:
+            log_error("Failed to resolve palette colors", e)
+            return palette
+    
+    @staticmethod
+    def build_palette_index(palette: Union[PaletteData, Dict[str, Any]], filepath: str) -> Optional[str]:
+        """Build and persist the k-d tree sidecar for a saved physical palette."""
+        try:
+            palette = PaletteProcessor._as_physical_palette(palette)
+            if palette is None:
+                return None
+            
+            index_path = get_index_path(filepath)
+            palette.index_path = index_path
+            if palette.build_index().save(index_path):
+                return index_path
+            return None
+        except Exception as e:
+            log_error("Failed to build palette index", e)
+            return None
+    
+    @staticmethod
+    def build_mixing_lattice_async(palette: Union[PaletteData, Dict[str, Any]], filepath: str,
+                                   max_pigments: int = 3) -> Optional[threading.Thread]:
+        """
+        Precompute the mixing lattice for a saved physical palette in a background thread.
+        The lattice sidecars are written next to the palette JSON.
+        """
+        palette = PaletteProcessor._as_physical_palette(palette)
+        if palette is None or not palette.get_pigment_colors():
+            return None
+        
+        def build():
+            try:
+                palette.lattice_path = get_lattice_base_path(filepath)
+                lattice = palette.build_mixing_lattice(max_pigments=max_pigments)
+                logger.info(f"Mixing lattice ready for '{palette.name}' ({len(lattice)} mixes)")
+            except Exception as e:
+                log_error(f"Failed to build mixing lattice for '{palette.name}'", e)
+        
+        thread = threading.Thread(target=build, name=f"lattice-{palette.name}", daemon=True)
+        thread.start()
+        return thread
+    
+    @staticmethod
+    def _as_physical_palette(palette: Union[PaletteData, Dict[str, Any]]) -> Optional[PhysicalPalette]:
+        """Return the palette as a PhysicalPalette, or None if it is not one."""
+        if isinstance(palette, dict) and palette.get("palette_type") == "physical":
+            palette = PhysicalPalette.from_dict(palette)
+        return palette if isinstance(palette, PhysicalPalette) else None
+    
     @staticmethod
     def load_palette(palette_name: str, base_dir: str = None) -> PaletteData:
         """Load a palette from file."""
@@ -85,7 +161,13 @@ class PaletteProcessor:
             
             # Determine palette type and create appropriate object
             if isinstance(data, dict) and data.get("palette_type") == "physical":
-                return PhysicalPalette.from_dict(data)
+                palette = PhysicalPalette.from_dict(data)
+                # Palettes saved before name resolution existed only have color names
+                palette.resolve_color_values()
+                # The k-d tree is loaded lazily and rebuilt if its hash is stale
+                palette.index_path = get_index_path(filepath)
+                palette.lattice_path = get_lattice_base_path(filepath)
+                return palette
             else:
                 return PaletteData.from_dict(data)
         except Exception as e:
@@ -130,8 +212,11 @@ class PaletteProcessor:
             if not os.path.exists(base_dir):
                 return []
             
-            # Get all JSON files in the directory
-            palette_files = [f for f in os.listdir(base_dir) if f.endswith('.json')]
+            # Get all JSON files in the directory, skipping mixing lattice metadata
+            palette_files = [
+                f for f in os.listdir(base_dir)
+                if f.endswith('.json') and not f.endswith('.lattice.json')
+            ]
             
             # Extract palette names (remove .json extension)
             palette_names = [os.path.splitext(f)[0] for f in palette_files]
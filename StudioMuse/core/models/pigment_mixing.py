@@ -0,0 +1,231 @@
+"""Kubelka-Munk pigment mixing solver for local mixing suggestions."""
+from dataclasses import dataclass, field, asdict
+from itertools import combinations
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from core.utils.color_science import (
+    srgb_to_linear,
+    linear_to_srgb,
+    srgb_to_lab,
+    delta_e_2000,
+    rgb_dicts_to_array
+)
+
+# Reflectance is clamped away from zero so K/S stays finite for near-black pigments
+MIN_REFLECTANCE = 1e-3
+
+
+@dataclass
+class MixingRecipe:
+    """Model for a pigment mixing recipe that approximates a target color."""
+    target_name: str
+    pigments: List[str]
+    ratios: List[float]
+    delta_e: float
+    predicted_rgb: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MixingRecipe":
+        """Create a MixingRecipe from a dictionary."""
+        return cls(
+            target_name=data.get("target_name", "Unknown"),
+            pigments=list(data.get("pigments", [])),
+            ratios=[float(r) for r in data.get("ratios", [])],
+            delta_e=float(data.get("delta_e", 0.0)),
+            predicted_rgb=data.get("predicted_rgb", {})
+        )
+
+    def describe(self) -> str:
+        """Return a short human readable recipe, e.g. '60% Prussian Blue + 40% Yellow Ochre (ΔE 2.1)'."""
+        if len(self.pigments) == 1:
+            parts = self.pigments[0]
+        else:
+            parts = " + ".join(
+                f"{round(ratio * 100)}% {name}" for name, ratio in zip(self.pigments, self.ratios)
+            )
+        return f"{parts} (ΔE {self.delta_e:.1f})"
+
+
+def reflectance_to_ks(reflectance: np.ndarray) -> np.ndarray:
+    """Kubelka-Munk absorption/scattering ratio K/S for an opaque layer."""
+    reflectance = np.clip(reflectance, MIN_REFLECTANCE, 1.0)
+    return (1.0 - reflectance) ** 2 / (2.0 * reflectance)
+
+
+def ks_to_reflectance(ks: np.ndarray) -> np.ndarray:
+    """Invert the Kubelka-Munk function back to reflectance."""
+    return 1.0 + ks - np.sqrt(ks * ks + 2.0 * ks)
+
+
+def _weight_compositions(pigment_count: int, steps: int) -> np.ndarray:
+    """All ways to split `steps` parts across `pigment_count` pigments, each getting at least one part."""
+    if pigment_count == 1:
+        return np.array([[1.0]])
+    compositions = [
+        np.diff([0, *cuts, steps])
+        for cuts in combinations(range(1, steps), pigment_count - 1)
+    ]
+    return np.array(compositions, dtype=np.float64) / steps
+
+
+class PigmentMixer:
+    """
+    Searches single pigments and 2- and 3-pigment mixes for each target color.
+
+    Pigments are modelled per RGB band with Kubelka-Munk theory: each pigment
+    has an absorption K and scattering S derived from its reflectance and a
+    relative tinting strength. A mix's K and S are the concentration-weighted
+    sums of its pigments, and its reflectance follows from the mixed K/S.
+
+    All candidate mixes are generated once per palette. Solving then compares
+    every target against every candidate with a single ΔE76 matrix product,
+    and reranks the closest candidates per target with CIEDE2000.
+    """
+
+    def __init__(self, pigments: Dict[str, Dict[str, float]],
+                 strengths: Optional[Dict[str, float]] = None,
+                 max_pigments: int = 3,
+                 pair_steps: int = 8,
+                 triple_steps: int = 5,
+                 complexity_penalty: float = 0.5):
+        """
+        Args:
+            pigments: Mapping of pigment names to RGB dictionaries (0.0-1.0 range)
+            strengths: Optional relative tinting strength per pigment (default 1.0)
+            max_pigments: Largest number of pigments in a recipe (1-3)
+            pair_steps: Number of parts used for 2-pigment ratios
+            triple_steps: Number of parts used for 3-pigment ratios
+            complexity_penalty: ΔE added per extra pigment when ranking recipes,
+                so simpler recipes win when the difference is negligible
+        """
+        if not pigments:
+            raise ValueError("PigmentMixer requires at least one pigment with RGB values")
+        self.names, rgb = rgb_dicts_to_array(pigments)
+        strengths = strengths or {}
+        self.strengths = np.array([float(strengths.get(name, 1.0)) for name in self.names])
+        self.ks = reflectance_to_ks(srgb_to_linear(rgb))
+        self.max_pigments = max(1, min(int(max_pigments), 3))
+        self.pair_steps = pair_steps
+        self.triple_steps = triple_steps
+        self.complexity_penalty = complexity_penalty
+
+        self.indices, self.weights = self._build_candidates()
+        self.candidate_rgb = self.mix(self.indices, self.weights)
+        self.candidate_lab = srgb_to_lab(self.candidate_rgb)
+        self.pigment_counts = (self.weights > 0).sum(axis=1)
+
+    def _build_candidates(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Enumerate candidate recipes as (M, 3) pigment indices and weights."""
+        count = len(self.names)
+        groups = [(1, 1)]
+        if self.max_pigments >= 2:
+            groups.append((2, self.pair_steps))
+        if self.max_pigments >= 3:
+            groups.append((3, self.triple_steps))
+
+        all_indices, all_weights = [], []
+        for size, steps in groups:
+            if count < size:
+                continue
+            combos = np.array(list(combinations(range(count), size)), dtype=np.int32)
+            compositions = _weight_compositions(size, steps)
+            indices = np.zeros((len(combos) * len(compositions), 3), dtype=np.int32)
+            weights = np.zeros((len(combos) * len(compositions), 3), dtype=np.float64)
+            indices[:, :size] = np.repeat(combos, len(compositions), axis=0)
+            weights[:, :size] = np.tile(compositions, (len(combos), 1))
+            all_indices.append(indices)
+            all_weights.append(weights)
+
+        return np.concatenate(all_indices), np.concatenate(all_weights)
+
+    def mix(self, indices: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        Predict the sRGB color of pigment mixes.
+
+        Args:
+            indices: Array of shape (M, P) with pigment indices
+            weights: Array of shape (M, P) with concentrations (unused slots 0)
+
+        Returns:
+            Array of shape (M, 3) with sRGB values
+        """
+        scatter = weights * self.strengths[indices]                      # (M, P)
+        absorb = (scatter[..., None] * self.ks[indices]).sum(axis=1)     # (M, 3)
+        ks_mix = absorb / scatter.sum(axis=1)[:, None]
+        return linear_to_srgb(ks_to_reflectance(ks_mix))
+
+    def solve(self, targets: Dict[str, Dict[str, float]], shortlist: int = 24,
+              chunk_size: int = 32768) -> List[MixingRecipe]:
+        """
+        Find the best recipe for every target color at once.
+
+        Args:
+            targets: Mapping of target names to RGB dictionaries
+            shortlist: Candidates per target kept for CIEDE2000 reranking
+            chunk_size: Candidates compared per block, bounding peak memory
+
+        Returns:
+            List of MixingRecipe objects in target order
+        """
+        if not targets:
+            return []
+
+        target_names, target_rgb = rgb_dicts_to_array(targets)
+        target_lab = srgb_to_lab(target_rgb)
+        shortlist = min(shortlist, len(self.candidate_lab))
+
+        # ΔE76 prefilter: keep the closest `shortlist` candidates per target
+        best_dist = np.full((len(target_names), 0), np.inf)
+        best_ids = np.zeros((len(target_names), 0), dtype=np.int64)
+        target_sq = (target_lab ** 2).sum(axis=1)[:, None]
+        for start in range(0, len(self.candidate_lab), chunk_size):
+            block = self.candidate_lab[start:start + chunk_size]
+            dist = target_sq + (block ** 2).sum(axis=1)[None, :] - 2.0 * target_lab @ block.T
+            dist = np.concatenate([best_dist, dist], axis=1)
+            ids = np.concatenate([best_ids, np.broadcast_to(
+                np.arange(start, start + len(block)), (len(target_names), len(block)))], axis=1)
+            keep = np.argpartition(dist, shortlist - 1, axis=1)[:, :shortlist]
+            best_dist = np.take_along_axis(dist, keep, axis=1)
+            best_ids = np.take_along_axis(ids, keep, axis=1)
+
+        # CIEDE2000 rerank with a small penalty for extra pigments
+        delta_e = delta_e_2000(target_lab[:, None, :], self.candidate_lab[best_ids])
+        score = delta_e + self.complexity_penalty * (self.pigment_counts[best_ids] - 1)
+        winner = np.argmin(score, axis=1)
+        rows = np.arange(len(target_names))
+        chosen = best_ids[rows, winner]
+        chosen_delta_e = delta_e[rows, winner]
+
+        recipes = []
+        for name, candidate, de in zip(target_names, chosen, chosen_delta_e):
+            used = self.weights[candidate] > 0
+            r, g, b = self.candidate_rgb[candidate]
+            recipes.append(MixingRecipe(
+                target_name=name,
+                pigments=[self.names[i] for i in self.indices[candidate][used]],
+                ratios=[round(float(w), 3) for w in self.weights[candidate][used]],
+                delta_e=round(float(de), 2),
+                predicted_rgb={"r": round(float(r), 3), "g": round(float(g), 3), "b": round(float(b), 3)}
+            ))
+        return recipes
+
+
+def suggest_mixes(targets: Dict[str, Dict[str, float]],
+                  pigments: Dict[str, Dict[str, float]]) -> List[MixingRecipe]:
+    """
+    Convenience wrapper that builds a PigmentMixer and solves all targets.
+
+    Args:
+        targets: Mapping of target color names to RGB dictionaries
+        pigments: Mapping of physical color names to RGB dictionaries
+
+    Returns:
+        List of MixingRecipe objects in target order
+    """
+    return PigmentMixer(pigments).solve(targets)
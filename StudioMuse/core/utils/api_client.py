@@ -1,8 +1,9 @@
 import os
 import json
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, Iterator, List, Optional
 import sys
+import time
 from urllib import request, error
 import urllib.parse
 
@@ -39,7 +40,7 @@ class BackendAPIClient:
                 
         except error.HTTPError as e:
             logger.error(f"HTTP error: {e.code} - {e.reason}")
-            return {"success": False, "error": f"API error: {e.reason}"}
+            return {"success": False, "error": f"API error: {self._error_detail(e)}", "status": e.code}
         except error.URLError as e:
             logger.error(f"URL error: {e.reason}")
             return {"success": False, "error": f"Connection error: {e.reason}"}
@@ -47,6 +48,14 @@ class BackendAPIClient:
             logger.error(f"Request error: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    @staticmethod
+    def _error_detail(e: error.HTTPError) -> str:
+        """The backend's error detail from an HTTP error response, else its reason"""
+        try:
+            return json.loads(e.read().decode('utf-8')).get("detail") or e.reason
+        except Exception:
+            return e.reason
+
     def health_check(self) -> Dict[str, Any]:
         return self._make_request("health", timeout=3)
 
@@ -59,28 +68,41 @@ class BackendAPIClient:
         except Exception as e:
             raise Exception(f"Failed to get backend config: {str(e)}")
 
-    def demystify_palette(self, gimp_palette_colors, physical_palette_data):
-        try:
-            from core.models.palette_processor import PaletteProcessor
-
-            # Convert GIMP palette colors to a serializable format
-            serializable_colors = {}
-            for i, color in enumerate(gimp_palette_colors):
-                name = f"Color {i+1}"
-                color_data = PaletteProcessor.convert_gegl_to_color_data(color, name)
-                serializable_colors[name] = {
-                    "R": color_data.rgb["r"],
-                    "G": color_data.rgb["g"],
-                    "B": color_data.rgb["b"],
-                    "A": 1.0
-                }
+    def _serialize_colors(self, gimp_palette_colors) -> Dict[str, Dict[str, float]]:
+        """Convert GIMP palette colors to the name -> RGB format the backend expects"""
+        from core.models.palette_processor import PaletteProcessor
 
-            payload = {
-                "gimp_palette_colors": serializable_colors,
-                "physical_palette_data": physical_palette_data,
-                "llm_provider": "gemini",
-                "temperature": 0.7
+        serializable_colors = {}
+        for i, color in enumerate(gimp_palette_colors):
+            name = f"Color {i+1}"
+            color_data = PaletteProcessor.convert_gegl_to_color_data(color, name)
+            serializable_colors[name] = {
+                "R": color_data.rgb["r"],
+                "G": color_data.rgb["g"],
+                "B": color_data.rgb["b"],
+                "A": 1.0
             }
+        return serializable_colors
+
+    def _demystify_payload(self, gimp_palette_colors, physical_palette_data, physical_palette_colors=None,
+                           fast=False, mixing_recipes=True) -> Dict[str, Any]:
+        """Build the request body shared by the demystify endpoints"""
+        return {
+            "gimp_palette_colors": self._serialize_colors(gimp_palette_colors),
+            "physical_palette_data": physical_palette_data,
+            "physical_palette_colors": physical_palette_colors or None,
+            "fast": fast,
+            "mixing_recipes": mixing_recipes,
+            "llm_provider": "gemini",
+            "temperature": 0.7
+        }
+
+    def demystify_palette(self, gimp_palette_colors, physical_palette_data, physical_palette_colors=None,
+                          fast=False, mixing_recipes=True):
+        try:
+            payload = self._demystify_payload(
+                gimp_palette_colors, physical_palette_data, physical_palette_colors, fast, mixing_recipes
+            )
 
             logger.info("Sending palette demystification request")
             api_result = self._make_request("palette/demystify", method="POST", data=payload)
@@ -95,7 +117,154 @@ class BackendAPIClient:
             logger.error(f"Palette demystification error: {e}")
             return {"success": False, "error": str(e)}
 
-    def create_physical_palette(self, entry_text: str, llm_provider: str = "perplexity", temperature: float = 0.7):
+    def demystify_palette_stream(self, gimp_palette_colors, physical_palette_data, physical_palette_colors=None,
+                                 fast=False, mixing_recipes=True, timeout: int = 60) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a palette demystification from the backend.
+
+        Yields the backend's events as they arrive: {"type": "mapping", "data": ...}
+        for each color mapping, {"type": "suggestion", "data": ...} for mixing
+        suggestions that refine earlier mappings, then {"type": "done"}. Failures
+        are yielded as {"type": "error", "error": ...} instead of raised.
+
+        Args:
+            timeout: Maximum time to wait for each line, not for the whole response
+        """
+        try:
+            payload = self._demystify_payload(
+                gimp_palette_colors, physical_palette_data, physical_palette_colors, fast, mixing_recipes
+            )
+            req = request.Request(
+                f"{self.base_url}/palette/demystify/stream",
+                data=json.dumps(payload).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+                method="POST"
+            )
+
+            logger.info("Sending streaming palette demystification request")
+            with request.urlopen(req, timeout=timeout) as response:
+                for line in response:
+                    line = line.decode('utf-8').strip()
+                    if line:
+                        yield json.loads(line)
+
+        except error.HTTPError as e:
+            logger.error(f"HTTP error: {e.code} - {e.reason}")
+            yield {"type": "error", "error": f"API error: {self._error_detail(e)}", "status": e.code}
+        except error.URLError as e:
+            logger.error(f"URL error: {e.reason}")
+            yield {"type": "error", "error": f"Connection error: {e.reason}"}
+        except Exception as e:
+            logger.error(f"Streaming demystification error: {e}")
+            yield {"type": "error", "error": str(e)}
+
+    def demystify_palettes_batch(self, gimp_palettes: Dict[str, List[Any]], physical_palettes: Dict[str, Dict[str, Any]],
+                                 fast=False, mixing_recipes=True, timeout: int = 300) -> Dict[str, Any]:
+        """
+        Demystify many GIMP palettes against one or more physical palettes in one request.
+
+        Args:
+            gimp_palettes: Palette name -> list of GIMP colors
+            physical_palettes: Physical palette name -> {"physical_palette_data": [color names],
+                "physical_palette_colors": optional name -> RGB dictionary}
+            timeout: Maximum time to wait for the whole batch
+
+        Returns:
+            The backend response: "results" holds one entry per palette and physical
+            palette with its own "success", "response", "missing_colors" and "error"
+        """
+        try:
+            payload = {
+                "palettes": {name: self._serialize_colors(colors) for name, colors in gimp_palettes.items()},
+                "physical_palettes": {
+                    name: {
+                        "physical_palette_data": physical["physical_palette_data"],
+                        "physical_palette_colors": physical.get("physical_palette_colors") or None
+                    }
+                    for name, physical in physical_palettes.items()
+                },
+                "fast": fast,
+                "mixing_recipes": mixing_recipes,
+                "llm_provider": "gemini",
+                "temperature": 0.7
+            }
+
+            logger.info(f"Sending batch demystification request for {len(gimp_palettes)} palettes")
+            api_result = self._make_request("palette/demystify/batch", method="POST", data=payload, timeout=timeout)
+
+            if api_result["success"]:
+                return api_result["response"]
+            return {"success": False, "error": api_result["error"]}
+
+        except Exception as e:
+            logger.error(f"Batch demystification error: {e}")
+            return {"success": False, "error": str(e)}
+
+    def submit_job(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a request as a background job on the backend.
+
+        Args:
+            endpoint: Request endpoint, e.g. "palette/create" (posted to /jobs/<endpoint>)
+            payload: Request body
+
+        Returns:
+            {"success": True, "response": job status with "job_id"} or an error
+        """
+        return self._make_request(f"jobs/{endpoint}", method="POST", data=payload)
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        """Return the status of a background job"""
+        return self._make_request(f"jobs/{job_id}", timeout=10)
+
+    def wait_for_job(self, job_id: str, timeout: float = 600, poll_interval: float = 1.0,
+                     on_poll: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Poll a background job until it finishes and return its result.
+        This blocks between polls, so call it from a worker thread, not the GTK main thread.
+
+        Args:
+            job_id: ID returned by submit_job
+            timeout: Maximum seconds to wait; the job keeps running on the backend
+            poll_interval: Seconds between status checks
+            on_poll: Called with the job status after each check, on the polling thread (e.g. to report progress)
+
+        Returns:
+            The job's result, or {"success": False, "error": ...} if it failed or expired.
+            If the job may still finish (timeout, backend unreachable) the error also
+            includes "job_id" so the caller can resume waiting later.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.get_job(job_id)
+            if not status["success"]:
+                if status.get("status") == 404:
+                    return {"success": False, "error": status["error"]}
+                return {"success": False, "error": status["error"], "job_id": job_id}
+            if on_poll is not None:
+                on_poll(status["response"])
+            if status["response"]["status"] not in ("queued", "running"):
+                break
+            if time.monotonic() >= deadline:
+                return {"success": False, "error": "Timed out waiting for the backend", "job_id": job_id}
+            time.sleep(poll_interval)
+
+        result = self._make_request(f"jobs/{job_id}/result")
+        if result["success"]:
+            return result["response"]
+        return {"success": False, "error": result["error"]}
+
+    def create_physical_palette(self, entry_text: str, llm_provider: str = "perplexity", temperature: float = 0.7,
+                                job_id: Optional[str] = None, timeout: float = 600,
+                                on_poll: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Generate a physical palette as a background job and wait for it.
+
+        Args:
+            job_id: ID of an earlier job for the same request to collect instead of resubmitting
+            timeout: Maximum seconds to wait; on timeout the result includes the job_id to resume with
+            on_poll: Called while waiting, see wait_for_job
+        """
         try:
             payload = {
                 "entry_text": entry_text,
@@ -103,9 +272,21 @@ class BackendAPIClient:
                 "temperature": temperature
             }
 
-            logger.info(f"Sending request to: {self.base_url}/palette/create")
-            logger.info(f"Payload:\n{json.dumps(payload, indent=2)}")
+            if job_id is None:
+                logger.info(f"Submitting palette creation job to: {self.base_url}/jobs/palette/create")
+                logger.info(f"Payload:\n{json.dumps(payload, indent=2)}")
+                submitted = self.submit_job("palette/create", payload)
+                if submitted["success"]:
+                    job_id = submitted["response"]["job_id"]
+                elif submitted.get("status") not in (404, 405):
+                    return {"success": False, "error": submitted["error"]}
+
+            if job_id is not None:
+                logger.info(f"Waiting for palette creation job {job_id}")
+                return self.wait_for_job(job_id, timeout=timeout, on_poll=on_poll)
 
+            # Backends without the job endpoints: one blocking request
+            logger.info(f"Sending request to: {self.base_url}/palette/create")
             result = self._make_request("palette/create", method="POST", data=payload)
             logger.info(f"API Response: {result}")
             
@@ -2,12 +2,12 @@ import gi
 gi.require_version('Gimp', '3.0')
 from gi.repository import Gimp, Gtk, Gegl
 
-import json
 import os
 
 from core.models.palette_models import PaletteData, PhysicalPalette, ColorData
 from core.models.palette_processor import PaletteProcessor, log_error
 from core.utils.file_io import get_plugin_storage_path, load_json_data, save_json_data
+from core.utils.json_stream import loads_llm_json
 
 def populate_dropdown(builder, dropdown_id, items, error_message="No items found"):
     """
@@ -190,18 +190,8 @@ def clean_and_verify_json(json_string):
     Works independently of any LLM class, supporting the decoupling effort.
     """
     try:
-        # Remove markdown code block formatting
-        cleaned = json_string.strip()
-        if cleaned.startswith("```json"):
-            cleaned = cleaned.split("```json")[1].strip()
-        if cleaned.startswith("```"):
-            cleaned = cleaned.split("```")[1].strip()
-        if cleaned.endswith("```"):
-            cleaned = cleaned.rsplit("```", 1)[0].strip()
-            
-        # Parse the JSON
-        parsed = json.loads(cleaned)
-        return parsed
+        # Skips prose and code fences; a truncated array keeps its complete elements
+        return loads_llm_json(json_string)
     except Exception as e:
         log_error("Error parsing JSON from LLM response", e)
         return {"error": str(e)}
@@ -0,0 +1,273 @@
+"""
+Color histogram service for StudioMuse.
+Computes quantized 3D RGB and CIELAB histograms of a drawable in a single
+tile-streaming pass and caches them by image, drawable and saved
+revision, so every ColorBitMagic feature can reuse the same color
+distribution without rescanning the image.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from core.utils.color_science import srgb_to_lab
+from core.utils.tile_reader import DrawableTileReader
+
+# Set up logging
+logger = logging.getLogger("color_histogram")
+
+# Pixels are first counted in a fine 64x64x64 RGB histogram (6 bits per
+# channel); the RGB and Lab histograms are derived from it
+FINE_BITS = 6
+FINE_LEVELS = 1 << FINE_BITS
+FINE_BINS = FINE_LEVELS ** 3
+
+# Lab histogram ranges: L* in [0, 100], a* and b* in [-128, 128)
+LAB_MIN = np.array([0.0, -128.0, -128.0])
+LAB_MAX = np.array([100.0, 128.0, 128.0])
+
+# Histograms are computed from a mipmap level with at most this many pixels
+DEFAULT_MAX_PIXELS = 4_000_000
+
+_fine_lab: Optional[np.ndarray] = None
+_fine_lab_lock = threading.Lock()
+
+
+def fine_bin_rgb() -> np.ndarray:
+    """sRGB coordinates (0.0-1.0) of the center of every fine RGB bin."""
+    width = 256 // FINE_LEVELS
+    levels = (np.arange(FINE_LEVELS, dtype=np.float32) * width + (width - 1) / 2) / 255.0
+    r, g, b = np.meshgrid(levels, levels, levels, indexing="ij")
+    return np.stack([r, g, b], axis=-1).reshape(-1, 3)
+
+
+def fine_bin_lab() -> np.ndarray:
+    """Lab coordinates of the center of every fine RGB bin, computed once."""
+    global _fine_lab
+    with _fine_lab_lock:
+        if _fine_lab is None:
+            _fine_lab = srgb_to_lab(fine_bin_rgb())
+        return _fine_lab
+
+
+class ColorHistogram:
+    """
+    Quantized 3D color distribution of a drawable.
+
+    Attributes:
+        fine_counts: Pixel counts per fine 64^3 RGB bin
+        rgb_counts: (bins, bins, bins) RGB histogram
+        lab_counts: (bins, bins, bins) Lab histogram
+        total: Number of opaque pixels counted
+        level: Mipmap level the histogram was computed from
+    """
+
+    def __init__(self, fine_counts: np.ndarray, bins: int = 32, level: int = 0):
+        if FINE_LEVELS % bins:
+            raise ValueError(f"bins must divide {FINE_LEVELS}, got {bins}")
+        self.fine_counts = fine_counts
+        self.bins = bins
+        self.level = level
+        self.total = int(fine_counts.sum())
+
+        # RGB: merge neighbouring fine bins
+        factor = FINE_LEVELS // bins
+        self.rgb_counts = fine_counts.reshape(
+            bins, factor, bins, factor, bins, factor
+        ).sum(axis=(1, 3, 5))
+
+        # Lab: route every fine bin to the Lab bin holding its center
+        lab_index = self.lab_bin_index(fine_bin_lab())
+        self.lab_counts = np.bincount(
+            lab_index, weights=fine_counts, minlength=bins ** 3
+        ).astype(np.int64).reshape(bins, bins, bins)
+
+    def lab_bin_index(self, lab: np.ndarray) -> np.ndarray:
+        """Flat Lab histogram bin index for each Lab color."""
+        scaled = (lab - LAB_MIN) / (LAB_MAX - LAB_MIN) * self.bins
+        cells = np.clip(scaled.astype(np.int64), 0, self.bins - 1)
+        return (cells[:, 0] * self.bins + cells[:, 1]) * self.bins + cells[:, 2]
+
+    def lab_bin_centers(self) -> np.ndarray:
+        """Lab coordinates of every Lab histogram bin center, shape (bins^3, 3)."""
+        step = (LAB_MAX - LAB_MIN) / self.bins
+        axes = [LAB_MIN[i] + (np.arange(self.bins) + 0.5) * step[i] for i in range(3)]
+        grid = np.meshgrid(*axes, indexing="ij")
+        return np.stack(grid, axis=-1).reshape(-1, 3)
+
+    def rgb_bin_centers(self) -> np.ndarray:
+        """sRGB coordinates (0.0-1.0) of every RGB histogram bin center, shape (bins^3, 3)."""
+        levels = (np.arange(self.bins) + 0.5) / self.bins
+        grid = np.meshgrid(levels, levels, levels, indexing="ij")
+        return np.stack(grid, axis=-1).reshape(-1, 3)
+
+    def lab_samples(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The occupied fine bins as weighted Lab samples.
+
+        Returns:
+            Tuple of (float32 Lab centers (N, 3), pixel counts (N,))
+        """
+        occupied = np.nonzero(self.fine_counts)[0]
+        return fine_bin_lab()[occupied], self.fine_counts[occupied]
+
+    def rgb_samples(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The occupied fine bins as weighted sRGB samples.
+
+        Returns:
+            Tuple of (float32 sRGB centers (N, 3), pixel counts (N,))
+        """
+        occupied = np.nonzero(self.fine_counts)[0]
+        return fine_bin_rgb()[occupied], self.fine_counts[occupied]
+
+
+def compute_fine_histogram(reader: DrawableTileReader, alpha_threshold: int = 128) -> np.ndarray:
+    """
+    Count a drawable's opaque pixels in the fine 64^3 RGB histogram.
+    One np.bincount per tile; nothing larger than a tile is allocated.
+
+    Args:
+        reader: Tile reader using the "R'G'B'A u8" format
+        alpha_threshold: Pixels with lower alpha are ignored
+
+    Returns:
+        int64 array of shape (FINE_BINS,)
+    """
+    shift = 8 - FINE_BITS
+
+    def accumulate(counts, pixels, rect):
+        flat = pixels.reshape(-1, 4)
+        flat = flat[flat[:, 3] >= alpha_threshold]
+        index = (
+            (flat[:, 0].astype(np.uint32) >> shift) << (2 * FINE_BITS)
+            | (flat[:, 1].astype(np.uint32) >> shift) << FINE_BITS
+            | (flat[:, 2].astype(np.uint32) >> shift)
+        )
+        counts += np.bincount(index, minlength=FINE_BINS)
+        return counts
+
+    return reader.fold(accumulate, np.zeros(FINE_BINS, dtype=np.int64))
+
+
+def drawable_revision(drawable) -> Optional[tuple]:
+    """
+    Identify the saved state of a drawable's content, or None if it may have changed.
+
+    GIMP exposes no per-drawable revision counter to plug-ins, and a hash of
+    a downscaled thumbnail misses small edits. An image that is not dirty
+    still shows the content it was loaded or last saved with, identified by
+    its file and modification time; any edit marks it dirty until saved.
+    """
+    image = drawable.get_image()
+    if image.is_dirty():
+        return None
+    image_file = image.get_file()
+    path = image_file.get_path() if image_file is not None else None
+    try:
+        modified = os.path.getmtime(path) if path else None
+    except OSError:
+        modified = None
+    return path, modified
+
+
+class HistogramCache:
+    """
+    Thread-safe LRU cache of ColorHistogram objects.
+
+    Keys are (image ID, drawable ID, bins, level, saved revision). Images
+    with unsaved changes are never served from the cache, since their
+    content may differ from any earlier scan.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, ColorHistogram]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def prepare_histogram(self, drawable, bins: int = 32,
+                          max_pixels: int = DEFAULT_MAX_PIXELS) -> Callable[[], ColorHistogram]:
+        """
+        Look up the histogram of a drawable and return a function producing it.
+
+        All GIMP calls happen here, on the calling thread. On a cache miss
+        the returned function reads the pixels through GEGL and caches the
+        result, so it may run on a worker thread.
+
+        Args:
+            drawable: Gimp.Drawable to analyze
+            bins: Bins per axis of the RGB and Lab histograms
+            max_pixels: Pixel budget used to pick the mipmap level
+
+        Returns:
+            Function without arguments returning the ColorHistogram
+        """
+        level = DrawableTileReader.level_for_max_pixels(drawable, max_pixels)
+        revision = drawable_revision(drawable)
+        key = (drawable.get_image().get_id(), drawable.get_id(), bins, level, revision)
+
+        with self._lock:
+            cached = self._entries.get(key) if revision is not None else None
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return lambda: cached
+            self.misses += 1
+
+        reader = DrawableTileReader(drawable, level=level)
+
+        def compute() -> ColorHistogram:
+            histogram = ColorHistogram(compute_fine_histogram(reader), bins=bins, level=level)
+            logger.info(f"Computed color histogram for drawable {key[1]} ({histogram.total} pixels)")
+            if revision is None:
+                return histogram
+
+            with self._lock:
+                self._entries[key] = histogram
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return histogram
+
+        return compute
+
+    def get_histogram(self, drawable, bins: int = 32,
+                      max_pixels: int = DEFAULT_MAX_PIXELS) -> ColorHistogram:
+        """
+        Return the histogram of a drawable, computing it on a cache miss.
+
+        Args:
+            drawable: Gimp.Drawable to analyze
+            bins: Bins per axis of the RGB and Lab histograms
+            max_pixels: Pixel budget used to pick the mipmap level
+
+        Returns:
+            ColorHistogram instance
+        """
+        return self.prepare_histogram(drawable, bins, max_pixels)()
+
+    def clear(self):
+        """Drop all cached histograms."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared cache used by all ColorBitMagic features
+histogram_cache = HistogramCache()
+
+
+def get_histogram(drawable, bins: int = 32, max_pixels: int = DEFAULT_MAX_PIXELS) -> ColorHistogram:
+    """Return the cached histogram of a drawable from the shared cache."""
+    return histogram_cache.get_histogram(drawable, bins, max_pixels)
+
+
+def prepare_histogram(drawable, bins: int = 32,
+                      max_pixels: int = DEFAULT_MAX_PIXELS) -> Callable[[], ColorHistogram]:
+    """Prepare a histogram from the shared cache; see HistogramCache.prepare_histogram."""
+    return histogram_cache.prepare_histogram(drawable, bins, max_pixels)
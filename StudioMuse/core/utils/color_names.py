@@ -0,0 +1,264 @@
+"""
+Offline color-name resolver for StudioMuse.
+Maps pigment and color names ("Prussian Blue", "Yellow Ochre", "PB29") to
+reference sRGB and Lab values from a bundled dictionary, using exact
+lookups, Colour Index pigment codes and a trigram fuzzy index.
+"""
+
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from core.utils.color_science import hex_to_rgb, srgb_to_lab
+from core.utils.file_io import load_json_data
+
+# Set up logging
+logger = logging.getLogger("color_names")
+
+DEFAULT_COLOR_NAMES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data", "colors", "color_names.json"
+)
+
+# Minimum trigram similarity (0-1) for a fuzzy match to be accepted
+DEFAULT_MIN_SCORE = 0.45
+
+# Colour Index pigment codes such as PB29, PBk9, PB15:3 or PBr7
+PIGMENT_CODE_PATTERN = re.compile(r"\b([PN])\s*(BK|BR|B|G|O|R|V|W|Y)\s*-?\s*(\d+)(?::(\d+))?\b", re.IGNORECASE)
+
+# Words that qualify a paint line rather than the color itself
+QUALIFIER_WORDS = {"hue", "genuine", "tint", "imitation"}
+
+
+def normalize_pigment_code(code: str) -> Optional[str]:
+    """Return a pigment code in canonical form (e.g. 'pbk 9' -> 'PBK9'), or None."""
+    match = PIGMENT_CODE_PATTERN.fullmatch(code.strip())
+    if not match:
+        return None
+    prefix, family, number, variant = match.groups()
+    return f"{prefix}{family}{number}".upper() + (f":{variant}" if variant else "")
+
+
+def compact_name(name: str) -> str:
+    """Lowercase a name, drop everything except letters and digits and unify grey/gray."""
+    return "".join(ch for ch in name.lower() if ch.isalnum()).replace("grey", "gray")
+
+
+def _trigrams(text: str) -> List[str]:
+    """Distinct character trigrams of a compact name, padded at both ends."""
+    padded = f"^{text}$"
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+@dataclass
+class ResolvedColor:
+    """Reference color found for a color name."""
+    query: str
+    name: str
+    hex_value: str
+    rgb: Dict[str, float]
+    lab: List[float]
+    score: float
+    method: str
+    codes: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return asdict(self)
+
+
+class ColorNameResolver:
+    """
+    Resolves color names against a reference dictionary.
+
+    Lookups try, in order: the exact name or an alias; the name without
+    qualifiers such as "Hue"; any Colour Index codes in the name; and
+    finally a trigram index over all names and aliases, scored with the
+    cosine similarity of the trigram sets.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], min_score: float = DEFAULT_MIN_SCORE):
+        """
+        Args:
+            entries: Dictionaries with "name", "hex" and optional "codes" and "aliases"
+            min_score: Minimum trigram similarity for fuzzy matches
+        """
+        self.min_score = min_score
+        self.names: List[str] = []
+        self.hex_values: List[str] = []
+        self.codes: List[List[str]] = []
+        rgb = []
+
+        self._exact: Dict[str, int] = {}
+        self._by_code: Dict[str, List[int]] = {}
+        keys: List[str] = []
+        key_entries: List[int] = []
+
+        for entry in entries:
+            try:
+                color_rgb = hex_to_rgb(entry["hex"])
+            except (KeyError, ValueError) as e:
+                logger.error(f"Skipping invalid color name entry {entry!r}: {e}")
+                continue
+
+            index = len(self.names)
+            self.names.append(entry["name"])
+            self.hex_values.append(entry["hex"].lower())
+            rgb.append(color_rgb)
+
+            codes = [c for c in (normalize_pigment_code(code) for code in entry.get("codes", [])) if c]
+            self.codes.append(codes)
+            for code in codes:
+                self._by_code.setdefault(code, []).append(index)
+                base = code.split(":")[0]
+                if base != code:
+                    self._by_code.setdefault(base, []).append(index)
+
+            # Earlier entries win on duplicate names, so pigments take priority over CSS names
+            for key in [entry["name"], *entry.get("aliases", [])]:
+                key = compact_name(key)
+                if key and key not in self._exact:
+                    self._exact[key] = index
+                    keys.append(key)
+                    key_entries.append(index)
+
+        self.rgb = np.array(rgb, dtype=np.float64).reshape(-1, 3)
+        self.lab = srgb_to_lab(self.rgb)
+        self._build_trigram_index(keys, key_entries)
+
+    def _build_trigram_index(self, keys: List[str], key_entries: List[int]) -> None:
+        """Build the inverted trigram index over all names and aliases."""
+        self._key_entries = np.array(key_entries, dtype=np.int64)
+        self._key_sizes = np.zeros(len(keys), dtype=np.float64)
+        postings: Dict[str, List[int]] = {}
+        for key_id, key in enumerate(keys):
+            grams = _trigrams(key)
+            self._key_sizes[key_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(key_id)
+        self._postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_COLOR_NAMES_PATH, **kwargs) -> "ColorNameResolver":
+        """
+        Load a resolver from a color names JSON file.
+
+        Args:
+            path: Path to the JSON file (defaults to the bundled dictionary)
+
+        Returns:
+            ColorNameResolver instance (empty if the file cannot be read)
+        """
+        data = load_json_data(path, default={}, required_fields=["colors"])
+        entries = data.get("colors", []) if isinstance(data, dict) else []
+        logger.info(f"Loaded {len(entries)} reference colors from {path}")
+        return cls(entries, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _result(self, query: str, index: int, score: float, method: str) -> ResolvedColor:
+        """Build a ResolvedColor for a dictionary entry."""
+        r, g, b = self.rgb[index]
+        return ResolvedColor(
+            query=query,
+            name=self.names[index],
+            hex_value=self.hex_values[index],
+            rgb={"r": round(float(r), 3), "g": round(float(g), 3), "b": round(float(b), 3)},
+            lab=[round(float(v), 2) for v in self.lab[index]],
+            score=round(float(score), 3),
+            method=method,
+            codes=list(self.codes[index])
+        )
+
+    def _fuzzy(self, text: str, allowed: Optional[List[int]] = None):
+        """Return (entry index, score) of the best trigram match, or (None, 0.0)."""
+        grams = _trigrams(text)
+        hits = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not hits:
+            return None, 0.0
+
+        shared = np.bincount(np.concatenate(hits), minlength=len(self._key_sizes))
+        scores = shared / np.sqrt(self._key_sizes * len(grams))
+        if allowed is not None:
+            scores = np.where(np.isin(self._key_entries, allowed), scores, 0.0)
+
+        best = int(np.argmax(scores))
+        return int(self._key_entries[best]), float(scores[best])
+
+    def resolve(self, name: str) -> Optional[ResolvedColor]:
+        """
+        Find the reference color for a name.
+
+        Args:
+            name: Color or pigment name, optionally with Colour Index codes
+
+        Returns:
+            ResolvedColor, or None if nothing matches well enough
+        """
+        if not name or not len(self.names):
+            return None
+
+        key = compact_name(name)
+        if key in self._exact:
+            return self._result(name, self._exact[key], 1.0, "exact")
+
+        # Split out pigment codes and qualifiers such as "Hue"
+        codes = [normalize_pigment_code(match.group(0)) for match in PIGMENT_CODE_PATTERN.finditer(name)]
+        words = re.sub(r"[()\[\],/]", " ", PIGMENT_CODE_PATTERN.sub(" ", name)).split()
+        text = compact_name(" ".join(w for w in words if w.lower() not in QUALIFIER_WORDS))
+
+        if text and text != key and text in self._exact:
+            return self._result(name, self._exact[text], 1.0, "exact")
+
+        for code in codes:
+            candidates = self._by_code.get(code) or self._by_code.get(code.split(":")[0])
+            if not candidates:
+                continue
+            if text:
+                index, score = self._fuzzy(text, candidates)
+                if index is not None and score > 0:
+                    return self._result(name, index, score, "code")
+            return self._result(name, candidates[0], 1.0, "code")
+
+        if not text:
+            return None
+        index, score = self._fuzzy(text)
+        if index is None or score < self.min_score:
+            return None
+        return self._result(name, index, score, "fuzzy")
+
+    def resolve_many(self, names: Iterable[str]) -> Dict[str, Optional[ResolvedColor]]:
+        """
+        Resolve several names at once.
+
+        Args:
+            names: Color names
+
+        Returns:
+            Mapping of each name to its ResolvedColor (or None)
+        """
+        return {name: self.resolve(name) for name in names}
+
+
+_resolver: Optional[ColorNameResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_color_name_resolver() -> ColorNameResolver:
+    """Return the shared resolver for the bundled dictionary, loading it on first use."""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = ColorNameResolver.load()
+        return _resolver
+
+
+def resolve_color_name(name: str) -> Optional[ResolvedColor]:
+    """Resolve a color name with the shared resolver."""
+    return get_color_name_resolver().resolve(name)
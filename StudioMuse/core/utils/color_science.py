@@ -0,0 +1,295 @@
+"""
+Color science utilities for StudioMuse.
+Provides vectorized sRGB <-> CIELAB conversions and CIEDE2000 color
+differences. This module only depends on NumPy so it can be shared by the
+GIMP plugin and the backend server.
+"""
+
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+# D65 reference white used by sRGB
+D65_WHITE = np.array([0.95047, 1.00000, 1.08883])
+
+# Linear sRGB -> CIE XYZ (D65)
+SRGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041]
+])
+XYZ_TO_SRGB = np.linalg.inv(SRGB_TO_XYZ)
+
+_LAB_EPSILON = 216.0 / 24389.0
+_LAB_KAPPA = 24389.0 / 27.0
+
+
+def _as_float(values) -> np.ndarray:
+    """Return values as a float array, keeping float32 input as float32."""
+    values = np.asarray(values)
+    if values.dtype in (np.float32, np.float64):
+        return values
+    return values.astype(np.float64)
+
+
+def srgb_to_linear(rgb: np.ndarray) -> np.ndarray:
+    """
+    Remove the sRGB transfer curve.
+
+    Args:
+        rgb: Array of gamma-encoded sRGB values in the 0.0-1.0 range
+
+    Returns:
+        Array of linear-light values with the same shape and float dtype
+    """
+    rgb = _as_float(rgb)
+    return np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(linear: np.ndarray) -> np.ndarray:
+    """
+    Apply the sRGB transfer curve to linear-light values.
+
+    Args:
+        linear: Array of linear-light values in the 0.0-1.0 range
+
+    Returns:
+        Array of gamma-encoded sRGB values with the same shape
+    """
+    linear = np.clip(_as_float(linear), 0.0, 1.0)
+    return np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1.0 / 2.4) - 0.055)
+
+
+def srgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """
+    Convert gamma-encoded sRGB colors to CIELAB (D65).
+
+    Args:
+        rgb: Array of shape (..., 3) with values in the 0.0-1.0 range.
+             float32 input stays float32 so large images are not promoted.
+
+    Returns:
+        Array of shape (..., 3) with L*, a*, b* values
+    """
+    linear = srgb_to_linear(rgb)
+    matrix = (SRGB_TO_XYZ / D65_WHITE[:, None]).astype(linear.dtype)
+    xyz = linear @ matrix.T
+
+    f = np.where(
+        xyz > _LAB_EPSILON,
+        np.cbrt(xyz),
+        (_LAB_KAPPA * xyz + 16.0) / 116.0
+    )
+
+    lab = np.empty_like(f)
+    lab[..., 0] = 116.0 * f[..., 1] - 16.0
+    lab[..., 1] = 500.0 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200.0 * (f[..., 1] - f[..., 2])
+    return lab
+
+
+def lab_to_srgb(lab: np.ndarray) -> np.ndarray:
+    """
+    Convert CIELAB (D65) colors back to gamma-encoded sRGB.
+
+    Args:
+        lab: Array of shape (..., 3) with L*, a*, b* values
+
+    Returns:
+        Array of shape (..., 3) with sRGB values clipped to 0.0-1.0
+    """
+    lab = _as_float(lab)
+    fy = (lab[..., 0] + 16.0) / 116.0
+    fx = fy + lab[..., 1] / 500.0
+    fz = fy - lab[..., 2] / 200.0
+    f = np.stack([fx, fy, fz], axis=-1)
+
+    xyz = np.where(f ** 3 > _LAB_EPSILON, f ** 3, (116.0 * f - 16.0) / _LAB_KAPPA)
+    xyz = xyz * D65_WHITE.astype(xyz.dtype)
+    linear = xyz @ XYZ_TO_SRGB.astype(xyz.dtype).T
+    return linear_to_srgb(linear)
+
+
+def delta_e_2000(lab1: np.ndarray, lab2: np.ndarray) -> np.ndarray:
+    """
+    Compute the CIEDE2000 color difference between two sets of Lab colors.
+
+    Inputs are broadcast against each other, so passing shapes (N, 1, 3) and
+    (1, M, 3) returns the full (N, M) distance matrix in one pass.
+
+    Args:
+        lab1: Array of shape (..., 3)
+        lab2: Array of shape (..., 3)
+
+    Returns:
+        Array of ΔE2000 values with the broadcast shape minus the last axis
+    """
+    lab1 = np.asarray(lab1, dtype=np.float64)
+    lab2 = np.asarray(lab2, dtype=np.float64)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    C_bar = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2.0
+    C_bar7 = C_bar ** 7
+    G = 0.5 * (1.0 - np.sqrt(C_bar7 / (C_bar7 + 25.0 ** 7)))
+
+    a1p = (1.0 + G) * a1
+    a2p = (1.0 + G) * a2
+    C1p = np.hypot(a1p, b1)
+    C2p = np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360.0
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360.0
+
+    chroma_product = C1p * C2p
+    achromatic = chroma_product == 0
+
+    dLp = L2 - L1
+    dCp = C2p - C1p
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180.0, dhp - 360.0, dhp)
+    dhp = np.where(dhp < -180.0, dhp + 360.0, dhp)
+    dhp = np.where(achromatic, 0.0, dhp)
+    dHp = 2.0 * np.sqrt(chroma_product) * np.sin(np.radians(dhp / 2.0))
+
+    Lp_bar = (L1 + L2) / 2.0
+    Cp_bar = (C1p + C2p) / 2.0
+
+    h_sum = h1p + h2p
+    h_diff = np.abs(h1p - h2p)
+    hp_bar = np.where(
+        achromatic,
+        h_sum,
+        np.where(
+            h_diff <= 180.0,
+            h_sum / 2.0,
+            np.where(h_sum < 360.0, (h_sum + 360.0) / 2.0, (h_sum - 360.0) / 2.0)
+        )
+    )
+
+    T = (1.0
+         - 0.17 * np.cos(np.radians(hp_bar - 30.0))
+         + 0.24 * np.cos(np.radians(2.0 * hp_bar))
+         + 0.32 * np.cos(np.radians(3.0 * hp_bar + 6.0))
+         - 0.20 * np.cos(np.radians(4.0 * hp_bar - 63.0)))
+
+    d_theta = 30.0 * np.exp(-(((hp_bar - 275.0) / 25.0) ** 2))
+    Cp_bar7 = Cp_bar ** 7
+    R_C = 2.0 * np.sqrt(Cp_bar7 / (Cp_bar7 + 25.0 ** 7))
+    L_term = (Lp_bar - 50.0) ** 2
+    S_L = 1.0 + 0.015 * L_term / np.sqrt(20.0 + L_term)
+    S_C = 1.0 + 0.045 * Cp_bar
+    S_H = 1.0 + 0.015 * Cp_bar * T
+    R_T = -np.sin(np.radians(2.0 * d_theta)) * R_C
+
+    dL = dLp / S_L
+    dC = dCp / S_C
+    dH = dHp / S_H
+    return np.sqrt(np.maximum(dL ** 2 + dC ** 2 + dH ** 2 + R_T * dC * dH, 0.0))
+
+
+def delta_e_2000_matrix(lab_a: np.ndarray, lab_b: np.ndarray) -> np.ndarray:
+    """
+    Compute all pairwise ΔE2000 values between two lists of Lab colors.
+
+    Args:
+        lab_a: Array of shape (N, 3)
+        lab_b: Array of shape (M, 3)
+
+    Returns:
+        Array of shape (N, M)
+    """
+    lab_a = np.asarray(lab_a).reshape(-1, 3)
+    lab_b = np.asarray(lab_b).reshape(-1, 3)
+    return delta_e_2000(lab_a[:, None, :], lab_b[None, :, :])
+
+
+def rgb_dict_to_tuple(rgb: Dict[str, float]) -> Tuple[float, float, float]:
+    """
+    Read an RGB dictionary using either the "R/G/B" keys sent to the backend
+    or the "r/g/b" keys used by ColorData.
+
+    Args:
+        rgb: Dictionary with red, green and blue values in the 0.0-1.0 range
+
+    Returns:
+        Tuple of (r, g, b) floats
+    """
+    return (
+        float(rgb.get("R", rgb.get("r", 0.0))),
+        float(rgb.get("G", rgb.get("g", 0.0))),
+        float(rgb.get("B", rgb.get("b", 0.0)))
+    )
+
+
+def rgb_dicts_to_array(colors: Dict[str, Dict[str, float]]) -> Tuple[List[str], np.ndarray]:
+    """
+    Convert a name -> RGB dictionary into parallel name and array lists.
+
+    Args:
+        colors: Mapping of color names to RGB dictionaries
+
+    Returns:
+        Tuple of (names, array of shape (N, 3))
+    """
+    names = list(colors.keys())
+    values = np.array([rgb_dict_to_tuple(colors[name]) for name in names], dtype=np.float64)
+    return names, values.reshape(-1, 3)
+
+
+def hex_to_rgb(hex_value: str) -> Tuple[float, float, float]:
+    """
+    Convert a "#rrggbb" string to floating point RGB values.
+
+    Args:
+        hex_value: Hex color string, with or without the leading '#'
+
+    Returns:
+        Tuple of (r, g, b) floats in the 0.0-1.0 range
+    """
+    hex_value = hex_value.lstrip("#")
+    if len(hex_value) == 3:
+        hex_value = "".join(c * 2 for c in hex_value)
+    return tuple(int(hex_value[i:i + 2], 16) / 255.0 for i in (0, 2, 4))
+
+
+def rgb_to_hex(rgb: Union[Tuple[float, float, float], np.ndarray]) -> str:
+    """
+    Convert floating point RGB values to a "#rrggbb" string.
+
+    Args:
+        rgb: Sequence of (r, g, b) floats in the 0.0-1.0 range
+
+    Returns:
+        Hex color string
+    """
+    r, g, b = (min(max(float(c), 0.0), 1.0) for c in rgb)
+    return "#{:02x}{:02x}{:02x}".format(round(r * 255), round(g * 255), round(b * 255))
+
+
+def format_rgb_string(rgb: Union[Tuple[float, float, float], np.ndarray]) -> str:
+    """
+    Format RGB values the way the demystify results expect them,
+    e.g. "rgb(0.123, 0.456, 0.789)".
+    """
+    r, g, b = (float(c) for c in rgb)
+    return f"rgb({r:.3f}, {g:.3f}, {b:.3f})"
+
+
+def parse_rgb_string(rgb_color: str) -> Dict[str, float]:
+    """
+    Parse an "rgb(0.123, 0.456, 0.789)" string into an RGB dictionary.
+
+    Args:
+        rgb_color: String in the format produced by format_rgb_string
+
+    Returns:
+        Dictionary with "r", "g" and "b" keys
+
+    Raises:
+        ValueError: If the string does not contain three numbers
+    """
+    values = rgb_color.replace("rgb(", "").replace(")", "").split(",")
+    if len(values) != 3:
+        raise ValueError(f"Invalid RGB string: {rgb_color}")
+    r, g, b = (float(v.strip()) for v in values)
+    return {"r": r, "g": g, "b": b}
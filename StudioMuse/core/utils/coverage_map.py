@@ -0,0 +1,439 @@
+"""
+Per-pixel physical-palette coverage maps for StudioMuse.
+Finds the nearest physical color and its CIEDE2000 error for every pixel of
+a drawable. Tiles are processed in parallel by a process pool that reads
+and writes shared-memory buffers, so no pixel data is pickled between
+processes, and the results are rendered back into GIMP as new layers.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.utils.color_science import srgb_to_lab, delta_e_2000
+from core.utils.tile_reader import DrawableTileReader
+
+# Set up logging
+logger = logging.getLogger("coverage_map")
+
+# Color/candidate pairs compared per block, bounding worker memory
+CHUNK_ELEMENTS = 262144
+
+# The RGB cube is split into (2^CELL_BITS)^3 cells for candidate pruning
+CELL_BITS = 5
+
+# Largest number of palette candidates kept per cell
+MAX_CANDIDATES = 12
+
+# Assumed bound on how much faster ΔE2000 can change than ΔE76 inside a cell.
+# ΔE2000 is discontinuous where the two hues are 180° apart, so no finite
+# slack is exact; this value trades a few near-ties per million pixels for speed
+CELL_SLACK = 1.5
+
+# Images smaller than this are processed in the calling process
+MIN_PARALLEL_PIXELS = 1_000_000
+
+# ΔE mapped to the hottest heat map color
+DEFAULT_MAX_DELTA_E = 20.0
+
+# Heat map ramp: blue (exact) -> green -> yellow -> red (ΔE >= max)
+HEAT_MAP_STOPS = np.array([0.0, 0.33, 0.66, 1.0])
+HEAT_MAP_COLORS = np.array([
+    [40, 60, 200],
+    [40, 190, 80],
+    [250, 220, 40],
+    [220, 30, 30]
+], dtype=np.float64)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def build_candidate_table(palette_lab: np.ndarray) -> np.ndarray:
+    """
+    Precompute which palette colors can be nearest for each RGB cell.
+
+    For every cell the palette is ranked by ΔE2000 to the cell center. A
+    color stays a candidate if it is within twice the cell's radius
+    (ΔE76 from center to corners, scaled by CELL_SLACK) of the best one,
+    so per pixel only a handful of exact CIEDE2000 comparisons remain.
+    The pruning is heuristic; see nearest_palette_colors.
+
+    Args:
+        palette_lab: Array of shape (N, 3) with the palette in Lab
+
+    Returns:
+        int16 array of shape (cells, K), best candidates first, padded with -1
+    """
+    levels = 1 << CELL_BITS
+    width = 256 // levels
+    axis = np.arange(levels)
+    cells = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3) * width
+
+    center = srgb_to_lab((cells + (width - 1) / 2.0) / 255.0)
+    radius = np.zeros(len(cells))
+    for corner in np.ndindex(2, 2, 2):
+        corner_lab = srgb_to_lab((cells + np.array(corner) * (width - 1)) / 255.0)
+        radius = np.maximum(radius, np.linalg.norm(corner_lab - center, axis=1))
+
+    palette_lab = np.asarray(palette_lab, dtype=np.float64)
+    count = min(MAX_CANDIDATES, len(palette_lab))
+    table = np.full((len(cells), count), -1, dtype=np.int16)
+    chunk_size = max(1, CHUNK_ELEMENTS // len(palette_lab))
+    for start in range(0, len(cells), chunk_size):
+        stop = start + chunk_size
+        delta_e = delta_e_2000(center[start:stop, None, :], palette_lab[None, :, :])
+        order = np.argsort(delta_e, axis=1)[:, :count]
+        ranked = np.take_along_axis(delta_e, order, axis=1)
+        keep = ranked <= ranked[:, :1] + 2.0 * CELL_SLACK * radius[start:stop, None]
+        table[start:stop] = np.where(keep, order, -1)
+    return table
+
+
+def nearest_palette_colors(rgb: np.ndarray, palette_lab: np.ndarray,
+                           candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the nearest palette color (CIEDE2000) for a list of 8-bit RGB pixels.
+
+    Each distinct pixel value is converted and compared only once, and
+    only against the candidates of its RGB cell.
+
+    The result is approximate: candidate pruning can drop the true nearest
+    color for pixels near a ΔE2000 hue discontinuity. Against a brute-force
+    search over 1M random pixels, a few dozen per million (random 24-color
+    palette) got a different color, up to about 4 ΔE2000 worse. Pass a
+    table with every palette index per cell for an exact search.
+
+    Args:
+        rgb: uint8 array of shape (M, 3)
+        palette_lab: Array of shape (N, 3) with the palette in Lab
+        candidates: Table from build_candidate_table (built if omitted)
+
+    Returns:
+        Tuple of (uint16 palette indices (M,), float32 ΔE2000 values (M,))
+    """
+    if candidates is None:
+        candidates = build_candidate_table(palette_lab)
+
+    packed = (rgb[:, 0].astype(np.uint32) << 16) | (rgb[:, 1].astype(np.uint32) << 8) | rgb[:, 2]
+    unique, inverse = np.unique(packed, return_inverse=True)
+    palette_lab = np.asarray(palette_lab, dtype=np.float64)
+
+    shift = 8 - CELL_BITS
+    unique_index = np.empty(len(unique), dtype=np.uint16)
+    unique_delta = np.empty(len(unique), dtype=np.float32)
+    chunk_size = max(1, CHUNK_ELEMENTS // candidates.shape[1])
+    for start in range(0, len(unique), chunk_size):
+        block = unique[start:start + chunk_size]
+        block_rgb = np.stack([(block >> 16) & 255, (block >> 8) & 255, block & 255], axis=1)
+        lab = srgb_to_lab(block_rgb / 255.0)
+
+        cell = ((block_rgb[:, 0] >> shift) << (2 * CELL_BITS)) | ((block_rgb[:, 1] >> shift) << CELL_BITS) | (block_rgb[:, 2] >> shift)
+        block_candidates = candidates[cell]
+        # Candidates are sorted with padding last, so unused columns can be dropped
+        used = int((block_candidates >= 0).sum(axis=1).max())
+        block_candidates = block_candidates[:, :used]
+        valid = block_candidates >= 0
+
+        delta_e = delta_e_2000(lab[:, None, :], palette_lab[np.where(valid, block_candidates, 0)])
+        delta_e[~valid] = np.inf
+        winner = np.argmin(delta_e, axis=1)
+        rows = np.arange(len(block))
+        unique_index[start:start + len(block)] = block_candidates[rows, winner]
+        unique_delta[start:start + len(block)] = delta_e[rows, winner]
+
+    return unique_index[inverse], unique_delta[inverse]
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing shared memory block without taking ownership of it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no `track` argument
+        return shared_memory.SharedMemory(name=name)
+
+
+def _coverage_tile(task: tuple) -> Tuple[np.ndarray, float, int]:
+    """
+    Worker: compute one tile of the coverage map in shared memory.
+
+    Args:
+        task: (shared block names, (height, width), candidate table shape,
+               (x, y, width, height), palette Lab, alpha threshold)
+
+    Returns:
+        Tuple of (pixel count per palette color, ΔE sum, opaque pixel count)
+    """
+    names, (height, width), table_shape, rect, palette_lab, alpha_threshold = task
+    blocks = [_attach(name) for name in names]
+    try:
+        pixels = np.ndarray((height, width, 4), dtype=np.uint8, buffer=blocks[0].buf)
+        indices = np.ndarray((height, width), dtype=np.uint16, buffer=blocks[1].buf)
+        delta = np.ndarray((height, width), dtype=np.float32, buffer=blocks[2].buf)
+        candidates = np.ndarray(table_shape, dtype=np.int16, buffer=blocks[3].buf)
+
+        x, y, w, h = rect
+        tile = pixels[y:y + h, x:x + w].reshape(-1, 4)
+        tile_index, tile_delta = nearest_palette_colors(tile[:, :3], palette_lab, candidates)
+        indices[y:y + h, x:x + w] = tile_index.reshape(h, w)
+        delta[y:y + h, x:x + w] = tile_delta.reshape(h, w)
+
+        opaque = tile[:, 3] >= alpha_threshold
+        counts = np.bincount(tile_index[opaque], minlength=len(palette_lab))
+        return counts, float(tile_delta[opaque].sum(dtype=np.float64)), int(opaque.sum())
+    finally:
+        del pixels, indices, delta, candidates
+        for block in blocks:
+            block.close()
+
+
+def get_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Return the shared worker pool, creating it on first use.
+
+    Workers are started with the "spawn" method, which is safe in a
+    process that already runs GTK threads, and are reused across runs so
+    the start-up cost is only paid once.
+
+    Args:
+        workers: Number of worker processes (defaults to the CPU count)
+
+    Returns:
+        ProcessPoolExecutor instance
+    """
+    global _pool, _pool_workers
+    workers = workers or os.cpu_count() or 1
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the shared worker pool, if it was started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+class CoverageMap:
+    """
+    Nearest-physical-color indices and ΔE2000 for every pixel of a drawable.
+
+    The pixel, index and ΔE arrays live in shared memory owned by this
+    object; call close() (or use it as a context manager) to release them.
+
+    Attributes:
+        palette_names: Names of the physical colors
+        palette_rgb: (N, 3) sRGB values of the physical colors (0.0-1.0)
+        pixels: (H, W, 4) uint8 source pixels
+        indices: (H, W) uint16 nearest palette index per pixel
+        delta_e: (H, W) float32 ΔE2000 per pixel
+        counts: Opaque pixels mapped to each palette color
+        mean_delta_e: Mean ΔE2000 over opaque pixels
+    """
+
+    def __init__(self, width: int, height: int, palette_names: List[str], palette_rgb: np.ndarray):
+        self.width = width
+        self.height = height
+        self.palette_names = list(palette_names)
+        self.palette_rgb = np.asarray(palette_rgb, dtype=np.float64).reshape(-1, 3)
+        self.palette_lab = srgb_to_lab(self.palette_rgb)
+        table = build_candidate_table(self.palette_lab)
+        self.counts = np.zeros(len(self.palette_names), dtype=np.int64)
+        self.mean_delta_e = 0.0
+        self.opaque_pixels = 0
+
+        pixel_count = width * height
+        self._blocks = [
+            shared_memory.SharedMemory(create=True, size=max(1, pixel_count * 4)),
+            shared_memory.SharedMemory(create=True, size=max(1, pixel_count * 2)),
+            shared_memory.SharedMemory(create=True, size=max(1, pixel_count * 4)),
+            shared_memory.SharedMemory(create=True, size=table.nbytes)
+        ]
+        self.pixels = np.ndarray((height, width, 4), dtype=np.uint8, buffer=self._blocks[0].buf)
+        self.indices = np.ndarray((height, width), dtype=np.uint16, buffer=self._blocks[1].buf)
+        self.delta_e = np.ndarray((height, width), dtype=np.float32, buffer=self._blocks[2].buf)
+        self.candidates = np.ndarray(table.shape, dtype=np.int16, buffer=self._blocks[3].buf)
+        self.candidates[:] = table
+
+    def __enter__(self) -> "CoverageMap":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the shared memory buffers."""
+        self.pixels = self.indices = self.delta_e = self.candidates = None
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def _task(self, rect: Tuple[int, int, int, int], alpha_threshold: int) -> tuple:
+        """Build the worker task for one tile."""
+        return (
+            [block.name for block in self._blocks], (self.height, self.width),
+            self.candidates.shape, rect, self.palette_lab, alpha_threshold
+        )
+
+    def coverage(self) -> List[Tuple[str, float]]:
+        """
+        Fraction of opaque pixels mapped to each physical color.
+
+        Returns:
+            List of (color name, fraction) tuples, largest first
+        """
+        total = max(1, int(self.counts.sum()))
+        order = np.argsort(-self.counts, kind="stable")
+        return [(self.palette_names[i], float(self.counts[i]) / total) for i in order if self.counts[i]]
+
+    def render_posterized(self, y: int = 0, height: Optional[int] = None) -> np.ndarray:
+        """
+        Render rows of the image using only the physical colors.
+
+        Returns:
+            uint8 RGBA array of shape (rows, W, 4)
+        """
+        height = self.height - y if height is None else height
+        palette = np.rint(self.palette_rgb * 255).astype(np.uint8)
+        rows = np.empty((height, self.width, 4), dtype=np.uint8)
+        rows[..., :3] = palette[self.indices[y:y + height]]
+        rows[..., 3] = self.pixels[y:y + height, :, 3]
+        return rows
+
+    def render_heat_map(self, y: int = 0, height: Optional[int] = None,
+                        max_delta_e: float = DEFAULT_MAX_DELTA_E) -> np.ndarray:
+        """
+        Render rows of the ΔE2000 error as a blue-to-red heat map.
+
+        Returns:
+            uint8 RGBA array of shape (rows, W, 4)
+        """
+        height = self.height - y if height is None else height
+        level = np.clip(self.delta_e[y:y + height] / max_delta_e, 0.0, 1.0)
+        rows = np.empty((height, self.width, 4), dtype=np.uint8)
+        for channel in range(3):
+            rows[..., channel] = np.interp(level, HEAT_MAP_STOPS, HEAT_MAP_COLORS[:, channel])
+        rows[..., 3] = self.pixels[y:y + height, :, 3]
+        return rows
+
+
+def compute_coverage_map(reader: DrawableTileReader, palette_names: List[str], palette_rgb: np.ndarray,
+                         workers: Optional[int] = None, alpha_threshold: int = 128) -> CoverageMap:
+    """
+    Compute the coverage map of a drawable against a physical palette.
+
+    Tiles are read from GEGL in this thread and handed to the worker pool
+    as soon as they are in shared memory, so reading overlaps with
+    computing. Small images are processed in-process. Nothing here calls
+    GIMP, so this can run on a worker thread with a reader created on the
+    GTK main thread.
+
+    Args:
+        reader: Tile reader of the Gimp.Drawable to analyze (its tile size
+            is the size of the tiles handed to workers)
+        palette_names: Names of the physical colors
+        palette_rgb: (N, 3) sRGB values of the physical colors (0.0-1.0)
+        workers: Number of worker processes (defaults to the CPU count)
+        alpha_threshold: Pixels with lower alpha are excluded from the statistics
+
+    Returns:
+        CoverageMap; the caller must close() it
+    """
+    if not len(palette_names):
+        raise ValueError("A coverage map requires at least one physical color with RGB values")
+
+    coverage = CoverageMap(reader.width, reader.height, palette_names, palette_rgb)
+    try:
+        workers = workers or os.cpu_count() or 1
+        parallel = workers > 1 and reader.pixel_count >= MIN_PARALLEL_PIXELS
+        pool = get_pool(workers) if parallel else None
+
+        results = []
+        for (x, y, width, height), tile in reader.tiles():
+            local = (x - reader.x, y - reader.y, width, height)
+            coverage.pixels[local[1]:local[1] + height, local[0]:local[0] + width] = tile
+            task = coverage._task(local, alpha_threshold)
+            results.append(pool.submit(_coverage_tile, task) if pool else _coverage_tile(task))
+
+        delta_sum = 0.0
+        for result in results:
+            counts, tile_delta, opaque = result.result() if pool else result
+            coverage.counts += counts
+            delta_sum += tile_delta
+            coverage.opaque_pixels += opaque
+
+        coverage.mean_delta_e = delta_sum / max(1, coverage.opaque_pixels)
+        logger.info(f"Coverage map of {reader.pixel_count} pixels against {len(palette_names)} colors "
+                    f"(mean ΔE {coverage.mean_delta_e:.2f}, {workers if parallel else 1} processes)")
+        return coverage
+    except Exception:
+        coverage.close()
+        raise
+
+
+def _write_layer(image, drawable, name: str, render, coverage: CoverageMap, band: int = 512):
+    """Create an RGBA layer above `drawable` and fill it band by band from `render(y, height)`."""
+    from gi.repository import Gimp, Gegl
+
+    layer = Gimp.Layer.new(image, name, coverage.width, coverage.height,
+                           Gimp.ImageType.RGBA_IMAGE, 100.0, Gimp.LayerMode.NORMAL)
+    image.insert_layer(layer, drawable.get_parent(), image.get_item_position(drawable))
+    _, offset_x, offset_y = drawable.get_offsets()
+    layer.set_offsets(offset_x, offset_y)
+
+    buffer = layer.get_buffer()
+    for y in range(0, coverage.height, band):
+        rows = render(y, min(band, coverage.height - y))
+        buffer.set(Gegl.Rectangle.new(0, y, coverage.width, len(rows)), "R'G'B'A u8", rows.tobytes())
+    buffer.flush()
+    layer.update(0, 0, coverage.width, coverage.height)
+    return layer
+
+
+def create_coverage_layers(image, drawable, coverage: CoverageMap, palette_name: str,
+                           max_delta_e: float = DEFAULT_MAX_DELTA_E) -> Dict[str, object]:
+    """
+    Add the posterized preview and the ΔE heat map as new layers.
+
+    Args:
+        image: Gimp.Image owning the drawable
+        drawable: The analyzed Gimp.Drawable; layers are inserted above it
+        coverage: Computed CoverageMap
+        palette_name: Physical palette name used in the layer names
+        max_delta_e: ΔE shown as the hottest heat map color
+
+    Returns:
+        Dictionary with the "preview" and "heat_map" Gimp.Layer objects
+    """
+    from gi.repository import Gimp
+
+    image.undo_group_start()
+    try:
+        heat_map = _write_layer(
+            image, drawable, f"ΔE heat map ({palette_name})",
+            lambda y, height: coverage.render_heat_map(y, height, max_delta_e), coverage
+        )
+        heat_map.set_visible(False)
+        preview = _write_layer(
+            image, drawable, f"Coverage ({palette_name})", coverage.render_posterized, coverage
+        )
+    finally:
+        image.undo_group_end()
+    Gimp.displays_flush()
+    return {"preview": preview, "heat_map": heat_map}
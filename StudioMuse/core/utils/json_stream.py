@@ -0,0 +1,197 @@
+"""
+Incremental JSON parsing for LLM output.
+Extracts JSON from model replies chunk by chunk, skipping prose and
+markdown code fences, so complete entries can be used while the rest of
+the reply is still arriving and a truncated reply still yields every
+entry that was fully received. This module only uses the standard
+library so it can be shared by the GIMP plugin and the backend server.
+"""
+
+import json
+import logging
+from typing import Any, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+class JsonStreamParser:
+    """
+    Incrementally parses the first JSON array or object in streamed text.
+
+    Text before the opening bracket or brace (prose, ```json fences) and
+    after the closing one is ignored. For a top-level array, each element
+    is yielded as soon as it is complete: objects and arrays at their
+    closing bracket, scalars (strings, numbers, ...) at the following comma
+    or closing bracket. For a top-level object, the whole object is
+    yielded once it closes, unless array_only is set: then everything up
+    to the first bracket is skipped, so an array wrapped in an object
+    ({"colors": [...]}) still yields its elements one by one.
+
+    Example:
+        parser = JsonStreamParser()
+        for chunk in chunks:
+            for entry in parser.feed(chunk):
+                show(entry)
+    """
+
+    ARRAY = "array"
+    OBJECT = "object"
+
+    def __init__(self, array_only: bool = False, scalars: bool = True):
+        """
+        Args:
+            array_only: Only look for an array, ignoring braces before it
+            scalars: Yield scalar array elements (otherwise they are skipped)
+        """
+        self.array_only = array_only
+        self.scalars = scalars
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._scalar = False  # buffering a scalar array element
+        self._in_string = False
+        self._escaped = False
+        self._done = False
+        self.top_level = None  # ARRAY or OBJECT once the opening character is seen
+        self.malformed = 0
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        Consume a chunk of text.
+
+        Args:
+            text: Next chunk of the streamed response
+
+        Returns:
+            Values completed by this chunk, in order
+        """
+        values = []
+        for char in text:
+            if self._done:
+                break
+
+            if self._in_string:
+                self._buffer.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if self._depth == 0:
+                # Outside the JSON value: wait for the opening bracket or brace
+                if char == "[":
+                    self.top_level = self.ARRAY
+                    self._depth = 1
+                elif char == "{" and not self.array_only:
+                    self.top_level = self.OBJECT
+                    self._buffer = [char]
+                    self._depth = 1
+                continue
+
+            if self._depth == 1 and self.top_level == self.ARRAY:
+                # Between elements, or inside a scalar element
+                if char in "{[":
+                    self._buffer = [char]
+                    self._scalar = False
+                    self._depth = 2
+                elif char in ",]":
+                    if self._scalar:
+                        self._emit_scalar(values)
+                    self._done = char == "]"
+                elif self._scalar or not char.isspace():
+                    if not self._scalar:
+                        self._buffer = []
+                        self._scalar = True
+                    self._buffer.append(char)
+                    # Strings are buffered whole so their brackets are not mistaken for structure
+                    self._in_string = char == '"'
+                continue
+
+            self._buffer.append(char)
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                # An array element closes at depth 1, a top-level object at depth 0
+                if self._depth == (1 if self.top_level == self.ARRAY else 0):
+                    self._emit(values)
+
+        return values
+
+    def _emit(self, values: List[Any]) -> None:
+        element = "".join(self._buffer)
+        self._buffer = []
+        if self.top_level == self.OBJECT:
+            self._done = True
+        try:
+            values.append(json.loads(element))
+        except ValueError as e:
+            self.malformed += 1
+            self.on_malformed(element, e)
+
+    def _emit_scalar(self, values: List[Any]) -> None:
+        element = "".join(self._buffer).strip()
+        self._buffer = []
+        self._scalar = False
+        if self.scalars:
+            try:
+                values.append(json.loads(element))
+            except ValueError as e:
+                self.malformed += 1
+                self.on_malformed(element, e)
+
+    def on_malformed(self, element: str, error: ValueError) -> None:
+        """Called for each element that is not valid JSON; override to count or report them."""
+        logger.warning(f"Skipping malformed JSON element: {error}")
+
+    @property
+    def done(self) -> bool:
+        """True once the closing bracket or brace of the top-level value has been seen."""
+        return self._done
+
+
+def parse_json_stream(chunks: Iterable[str]) -> List[Any]:
+    """
+    Parse complete values from an iterable of text chunks.
+
+    Args:
+        chunks: Streamed response text
+
+    Returns:
+        Every complete array element, or the top-level object as a single item
+    """
+    parser = JsonStreamParser()
+    values = []
+    for chunk in chunks:
+        values.extend(parser.feed(chunk))
+        if parser.done:
+            break
+    return values
+
+
+def loads_llm_json(text: str) -> Any:
+    """
+    Parse the JSON in an LLM reply, tolerating prose, code fences and truncation.
+
+    Args:
+        text: Complete (or truncated) reply text
+
+    Returns:
+        The top-level object, or the list of complete elements of the top-level array
+
+    Raises:
+        ValueError: If the reply holds no JSON array or object, or its object is incomplete
+    """
+    parser = JsonStreamParser()
+    values = parser.feed(text)
+    if parser.top_level == JsonStreamParser.ARRAY:
+        if not parser.done:
+            logger.warning(f"JSON array was truncated; keeping {len(values)} complete elements")
+        return values
+    if values:
+        return values[0]
+    raise ValueError("No complete JSON array or object found in the response")
@@ -0,0 +1,236 @@
+"""
+Palette extraction utilities for StudioMuse.
+Builds a color palette directly from an image layer by clustering its
+color histogram in CIELAB space with mini-batch k-means or median cut.
+"""
+
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from core.utils.color_histogram import get_histogram
+from core.utils.color_science import lab_to_srgb
+
+# Set up logging
+logger = logging.getLogger("palette_extraction")
+
+
+def get_active_drawable(image=None):
+    """
+    Get the drawable the user is working on.
+
+    Args:
+        image: Optional Gimp.Image; defaults to the first open image
+
+    Returns:
+        Gimp.Drawable or None if no image/drawable is available
+    """
+    from gi.repository import Gimp
+
+    if image is None:
+        images = Gimp.get_images()
+        if not images:
+            return None
+        image = images[0]
+
+    drawables = image.get_selected_drawables()
+    if drawables:
+        return drawables[0]
+
+    layers = image.get_layers()
+    return layers[0] if layers else None
+
+
+def _squared_distances(samples: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """Squared Euclidean distances between samples (N, 3) and centers (K, 3)."""
+    return (
+        (samples ** 2).sum(axis=1)[:, None]
+        + (centers ** 2).sum(axis=1)[None, :]
+        - 2.0 * samples @ centers.T
+    )
+
+
+def _assign(samples: np.ndarray, centers: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """Index of the nearest center for every sample, computed in chunks."""
+    labels = np.empty(len(samples), dtype=np.int64)
+    for start in range(0, len(samples), chunk_size):
+        labels[start:start + chunk_size] = np.argmin(
+            _squared_distances(samples[start:start + chunk_size], centers), axis=1
+        )
+    return labels
+
+
+def _kmeans_plus_plus(samples: np.ndarray, k: int, rng: np.random.Generator,
+                      weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """k-means++ seeding, optionally with per-sample weights."""
+    if weights is None:
+        weights = np.ones(len(samples))
+    centers = [samples[rng.choice(len(samples), p=weights / weights.sum())]]
+    closest = _squared_distances(samples, centers[0][None, :])[:, 0]
+    for _ in range(1, k):
+        score = np.maximum(closest, 0.0) * weights
+        total = score.sum()
+        if total <= 0:
+            break
+        index = rng.choice(len(samples), p=score / total)
+        centers.append(samples[index])
+        closest = np.minimum(closest, _squared_distances(samples, samples[index][None, :])[:, 0])
+    return np.array(centers, dtype=samples.dtype)
+
+
+def mini_batch_kmeans(samples: np.ndarray, k: int, batch_size: int = 4096,
+                      iterations: int = 100, seed: int = 0,
+                      weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster Lab samples with mini-batch k-means.
+
+    Args:
+        samples: float32 array of shape (N, 3)
+        k: Number of clusters
+        batch_size: Samples drawn per iteration
+        iterations: Number of mini-batch updates
+        seed: Random seed, so the same image always gives the same palette
+        weights: Optional pixel count per sample (e.g. histogram bins);
+            batches are then drawn in proportion to the weights
+
+    Returns:
+        Tuple of (centers (K, 3), pixel counts (K,))
+    """
+    rng = np.random.default_rng(seed)
+    probabilities = None if weights is None else weights / weights.sum()
+    seed_ids = rng.choice(len(samples), min(len(samples), 10000), replace=False)
+    centers = _kmeans_plus_plus(
+        samples[seed_ids], k, rng, None if weights is None else weights[seed_ids].astype(np.float64)
+    ).astype(np.float64)
+    k = len(centers)
+    seen = np.zeros(k)
+
+    for _ in range(iterations):
+        batch = samples[rng.choice(len(samples), batch_size, p=probabilities)]
+        labels = np.argmin(_squared_distances(batch, centers), axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=batch[:, d], minlength=k) for d in range(3)], axis=1)
+        seen += counts
+        updated = counts > 0
+        # Per-center learning rate 1/seen, applied to the whole batch at once
+        centers[updated] += (sums[updated] - counts[updated, None] * centers[updated]) / seen[updated, None]
+
+    labels = _assign(samples, centers.astype(samples.dtype))
+    counts = np.bincount(labels, weights=weights, minlength=k).astype(np.int64)
+    return centers, counts
+
+
+def median_cut(samples: np.ndarray, k: int,
+               weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster Lab samples with median cut.
+
+    The box with the largest (range x population) is repeatedly split at
+    the (weighted) median of its widest axis.
+
+    Args:
+        samples: float32 array of shape (N, 3)
+        k: Number of clusters
+        weights: Optional pixel count per sample
+
+    Returns:
+        Tuple of (centers (K, 3), pixel counts (K,))
+    """
+    if weights is None:
+        weights = np.ones(len(samples))
+    weights = weights.astype(np.float64)
+
+    boxes = [(samples, weights)]
+    while len(boxes) < k:
+        scores = [np.ptp(box, axis=0).max() * w.sum() if len(box) > 1 else -1.0 for box, w in boxes]
+        index = int(np.argmax(scores))
+        if scores[index] <= 0:
+            break
+        box, w = boxes.pop(index)
+        dim = int(np.argmax(np.ptp(box, axis=0)))
+        order = np.argsort(box[:, dim], kind="stable")
+        cumulative = np.cumsum(w[order])
+        half = int(np.searchsorted(cumulative, cumulative[-1] / 2))
+        half = min(max(half, 1), len(box) - 1)
+        boxes.extend([(box[order[:half]], w[order[:half]]), (box[order[half:]], w[order[half:]])])
+
+    centers = np.array([np.average(box, axis=0, weights=w) for box, w in boxes])
+    counts = np.array([int(round(w.sum())) for _, w in boxes])
+    return centers, counts
+
+
+def cluster_lab_samples(samples: np.ndarray, num_colors: int = 16, method: str = "kmeans",
+                        weights: Optional[np.ndarray] = None) -> List[Tuple[Tuple[float, float, float], float]]:
+    """
+    Cluster (optionally weighted) Lab samples into a palette.
+
+    Args:
+        samples: float32 array of shape (N, 3)
+        num_colors: Number of palette colors
+        method: "kmeans" or "median_cut"
+        weights: Optional pixel count per sample
+
+    Returns:
+        List of ((r, g, b), coverage) tuples sorted by coverage
+    """
+    if not len(samples):
+        return []
+
+    if method == "median_cut":
+        centers, counts = median_cut(samples, num_colors, weights)
+    elif method == "kmeans":
+        centers, counts = mini_batch_kmeans(samples, num_colors, weights=weights)
+    else:
+        raise ValueError(f"Unknown palette extraction method: {method}")
+
+    order = np.argsort(-counts, kind="stable")
+    order = order[counts[order] > 0]
+    rgb = lab_to_srgb(centers[order])
+    coverage = counts[order] / counts.sum()
+    return [(tuple(float(c) for c in color), float(share)) for color, share in zip(rgb, coverage)]
+
+
+def extract_palette(drawable, num_colors: int = 16,
+                    method: str = "kmeans") -> List[Tuple[Tuple[float, float, float], float]]:
+    """
+    Extract a palette from a GIMP drawable.
+
+    The drawable's cached color histogram is clustered instead of raw
+    pixels: every occupied bin is one Lab sample weighted by its pixel
+    count, so an unchanged layer is never rescanned.
+
+    Args:
+        drawable: Gimp.Drawable to analyze
+        num_colors: Number of palette colors
+        method: "kmeans" or "median_cut"
+
+    Returns:
+        List of ((r, g, b), coverage) tuples sorted by coverage
+    """
+    histogram = get_histogram(drawable)
+    samples, counts = histogram.lab_samples()
+    logger.info(f"Extracting {num_colors} colors from {len(samples)} histogram bins "
+                f"({histogram.total} pixels)")
+    return cluster_lab_samples(samples, num_colors, method, weights=counts)
+
+
+def palette_to_gegl_colors(palette: List[Tuple[Tuple[float, float, float], float]]) -> list:
+    """
+    Convert an extracted palette to Gegl.Color objects, the format
+    returned by Gimp.Palette.get_colors.
+
+    Args:
+        palette: List of ((r, g, b), coverage) tuples
+
+    Returns:
+        List of Gegl.Color objects
+    """
+    from gi.repository import Gegl
+
+    colors = []
+    for (r, g, b), _ in palette:
+        color = Gegl.Color.new("black")
+        color.set_rgba(r, g, b, 1.0)
+        colors.append(color)
+    return colors
@@ -0,0 +1,218 @@
+"""
+Tile-streaming pixel reader for StudioMuse.
+Walks a Gimp.Drawable's GEGL buffer tile by tile, optionally at a reduced
+mipmap level, so image analysis never holds more than one tile of a large
+layer in memory at a time.
+"""
+
+import logging
+import math
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger("tile_reader")
+
+# Babl formats and the NumPy dtype of each channel
+PIXEL_FORMATS = {
+    "R'G'B'A u8": (np.uint8, 4),
+    "R'G'B' u8": (np.uint8, 3),
+    "R'G'B'A float": (np.float32, 4),
+    "R'G'B' float": (np.float32, 3),
+}
+
+DEFAULT_TILE_SIZE = 512
+
+# (x, y, width, height) of a tile in level coordinates
+TileRect = Tuple[int, int, int, int]
+
+
+class DrawableTileReader:
+    """
+    Streams a drawable's pixels as NumPy arrays, one tile at a time.
+
+    Level 0 is full resolution; each level above halves both dimensions and
+    is served from GEGL's mipmaps. Peak memory is one tile plus whatever a
+    reduction keeps, independent of the image size.
+
+    Create the reader on the GTK main thread, since that calls GIMP. Its
+    tiles are read through GEGL only, so they can then be read from a
+    worker thread: libgimp's tile backend serializes tile transfers for
+    GEGL's own threads.
+    """
+
+    def __init__(self, drawable, tile_size: int = DEFAULT_TILE_SIZE, level: int = 0,
+                 pixel_format: str = "R'G'B'A u8"):
+        """
+        Args:
+            drawable: Gimp.Drawable to read
+            tile_size: Edge length of the square tiles, in level pixels
+            level: Mipmap level (0 = full resolution)
+            pixel_format: One of PIXEL_FORMATS
+        """
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f"Unsupported pixel format: {pixel_format}")
+
+        self.buffer = drawable.get_buffer()
+        self.extent = self.buffer.get_extent()
+        self.tile_size = max(1, int(tile_size))
+        self.level = max(0, int(level))
+        self.scale = 1.0 / (2 ** self.level)
+        self.pixel_format = pixel_format
+        self.dtype, self.channels = PIXEL_FORMATS[pixel_format]
+
+        self.x = int(math.floor(self.extent.x * self.scale))
+        self.y = int(math.floor(self.extent.y * self.scale))
+        self.width = max(1, int(math.ceil(self.extent.width * self.scale)))
+        self.height = max(1, int(math.ceil(self.extent.height * self.scale)))
+
+    @staticmethod
+    def level_for_max_pixels(drawable, max_pixels: int) -> int:
+        """
+        Return the lowest mipmap level whose pixel count fits in `max_pixels`.
+
+        Args:
+            drawable: Gimp.Drawable to read
+            max_pixels: Pixel budget
+
+        Returns:
+            Mipmap level
+        """
+        pixels = drawable.get_width() * drawable.get_height()
+        level = 0
+        while pixels > max_pixels and level < 16:
+            pixels /= 4
+            level += 1
+        return level
+
+    @property
+    def pixel_count(self) -> int:
+        """Number of pixels at the current level."""
+        return self.width * self.height
+
+    def tile_rects(self) -> Iterator[TileRect]:
+        """Yield the (x, y, width, height) of every tile in row-major order."""
+        for y in range(self.y, self.y + self.height, self.tile_size):
+            for x in range(self.x, self.x + self.width, self.tile_size):
+                yield (
+                    x,
+                    y,
+                    min(self.tile_size, self.x + self.width - x),
+                    min(self.tile_size, self.y + self.height - y)
+                )
+
+    def read_tile(self, rect: TileRect) -> np.ndarray:
+        """
+        Read one tile.
+
+        Args:
+            rect: (x, y, width, height) in level coordinates
+
+        Returns:
+            Read-only array of shape (height, width, channels) viewing the tile bytes
+        """
+        from gi.repository import Gegl
+
+        x, y, width, height = rect
+        data = self.buffer.get(
+            Gegl.Rectangle.new(x, y, width, height),
+            self.scale,
+            self.pixel_format,
+            Gegl.AbyssPolicy.CLAMP
+        )
+        return np.frombuffer(data, dtype=self.dtype).reshape(height, width, self.channels)
+
+    def tiles(self) -> Iterator[Tuple[TileRect, np.ndarray]]:
+        """Yield (rect, pixels) for every tile."""
+        for rect in self.tile_rects():
+            yield rect, self.read_tile(rect)
+
+    def fold(self, func: Callable[[Any, np.ndarray, TileRect], Any], initial: Any) -> Any:
+        """
+        Fold a reduction over all tiles.
+
+        Args:
+            func: Called as func(accumulator, pixels, rect) and returns the
+                new accumulator. `pixels` is only valid during the call.
+            initial: Initial accumulator
+
+        Returns:
+            Final accumulator
+        """
+        accumulator = initial
+        for rect, pixels in self.tiles():
+            accumulator = func(accumulator, pixels, rect)
+        return accumulator
+
+    def channel_sums(self) -> np.ndarray:
+        """
+        Sum every channel over the whole drawable.
+
+        Returns:
+            float64 array of shape (channels,)
+        """
+        return self.fold(
+            lambda total, pixels, rect: total + pixels.reshape(-1, self.channels).sum(axis=0, dtype=np.float64),
+            np.zeros(self.channels)
+        )
+
+    def histogram(self, bins: int = 256) -> np.ndarray:
+        """
+        Per-channel histograms of an 8-bit format.
+
+        Args:
+            bins: Number of bins per channel (must divide 256)
+
+        Returns:
+            int64 array of shape (channels, bins)
+        """
+        if self.dtype != np.uint8:
+            raise ValueError("histogram() requires an 8-bit pixel format")
+        shift = int(math.log2(256 // bins))
+
+        def accumulate(counts, pixels, rect):
+            flat = pixels.reshape(-1, self.channels) >> shift
+            for channel in range(self.channels):
+                counts[channel] += np.bincount(flat[:, channel], minlength=bins)
+            return counts
+
+        return self.fold(accumulate, np.zeros((self.channels, bins), dtype=np.int64))
+
+    def sample(self, max_samples: int, seed: int = 0,
+               alpha_threshold: Optional[int] = None) -> np.ndarray:
+        """
+        Draw a uniform random pixel sample across all tiles.
+
+        Each tile contributes in proportion to its area, so the result never
+        holds more than `max_samples` pixels.
+
+        Args:
+            max_samples: Maximum number of pixels returned
+            seed: Random seed, so repeated runs return the same sample
+            alpha_threshold: If set (8-bit RGBA only), pixels with lower
+                alpha are dropped after sampling
+
+        Returns:
+            Array of shape (N, channels) in the reader's dtype
+        """
+        rng = np.random.default_rng(seed)
+        fraction = min(1.0, max_samples / max(1, self.pixel_count))
+
+        def accumulate(samples, pixels, rect):
+            flat = pixels.reshape(-1, self.channels)
+            count = min(len(flat), int(round(len(flat) * fraction)))
+            if count == len(flat):
+                samples.append(flat.copy())
+            elif count:
+                samples.append(flat[rng.choice(len(flat), count, replace=False)])
+            return samples
+
+        samples = self.fold(accumulate, [])
+        if not samples:
+            return np.empty((0, self.channels), dtype=self.dtype)
+        samples = np.concatenate(samples)[:max_samples]
+
+        if alpha_threshold is not None and self.channels == 4:
+            samples = samples[samples[:, 3] >= alpha_threshold]
+        return samples
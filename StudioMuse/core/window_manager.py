@@ -12,7 +12,8 @@ class WindowManager:
     Implements the suite-style UI architecture as defined in suiteUpdate.md
     """
     
-    def __init__(self):
+    def __init__(self, image=None):
+        self.image = image  # Image the suite was launched on
         self.ui_loader = UILoader()
         self.main_builder = None
         self.main_window = None
@@ -73,7 +74,7 @@ class WindowManager:
                             # Connect signals based on category
                             if category_id == "analysis":
                                 Gimp.message("Connecting analysis signals")
-                                color_bit_magic = ColorBitMagic()
+                                color_bit_magic = ColorBitMagic(self.image)
                                 color_bit_magic.set_builder(notebook_builder)
                                 self.tool_handlers["analysis"] = color_bit_magic
                                 notebook_builder.connect_signals(color_bit_magic)
@@ -112,7 +112,7 @@ class StudioMuse(Gimp.PlugIn):
             print(f"Python path: {sys.path}")
             
             try:
-                window_manager = WindowManager()
+                window_manager = WindowManager(image)
                 window_manager.load_main_ui()
                 Gtk.main()
             except Exception as e:
@@ -132,4 +132,7 @@ class StudioMuse(Gimp.PlugIn):
         return procedure.new_return_values(Gimp.PDBStatusType.SUCCESS, GLib.Error())
 
 
-Gimp.main(StudioMuse.__gtype__, sys.argv)
+# Guarded so worker processes started with "spawn" (coverage maps), which
+# re-import this script as __mp_main__, do not re-enter the plug-in entry point
+if __name__ == "__main__":
+    Gimp.main(StudioMuse.__gtype__, sys.argv)
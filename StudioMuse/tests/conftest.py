@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The plug-in imports its modules as top-level packages (core, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,115 @@
+import os
+
+import numpy as np
+import pytest
+
+from core.utils import color_histogram
+from core.utils.color_histogram import FINE_BINS, HistogramCache
+
+
+class FakeFile:
+    def __init__(self, path):
+        self.path = path
+
+    def get_path(self):
+        return self.path
+
+
+class FakeImage:
+    def __init__(self, path=None):
+        self.dirty = False
+        self.file = FakeFile(path) if path else None
+
+    def get_id(self):
+        return 1
+
+    def is_dirty(self):
+        return self.dirty
+
+    def get_file(self):
+        return self.file
+
+
+class FakeDrawable:
+    def __init__(self, image):
+        self.image = image
+
+    def get_image(self):
+        return self.image
+
+    def get_id(self):
+        return 2
+
+
+class FakeReader:
+    def __init__(self, drawable, level=0):
+        self.level = level
+
+    @staticmethod
+    def level_for_max_pixels(drawable, max_pixels):
+        return 0
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    """Count full histogram scans instead of reading pixels from GIMP."""
+    scans = []
+
+    def compute_fine_histogram(reader):
+        scans.append(reader)
+        counts = np.zeros(FINE_BINS, dtype=np.int64)
+        counts[len(scans)] = 10
+        return counts
+
+    monkeypatch.setattr(color_histogram, "DrawableTileReader", FakeReader)
+    monkeypatch.setattr(color_histogram, "compute_fine_histogram", compute_fine_histogram)
+    return scans
+
+
+def test_saved_image_is_served_from_the_cache(scans, tmp_path):
+    path = tmp_path / "image.xcf"
+    path.write_bytes(b"")
+    cache = HistogramCache()
+    drawable = FakeDrawable(FakeImage(str(path)))
+
+    first = cache.get_histogram(drawable)
+    assert cache.get_histogram(drawable) is first
+    assert (len(scans), cache.hits, cache.misses) == (1, 1, 1)
+
+
+def test_unsaved_edits_always_rescan(scans):
+    cache = HistogramCache()
+    image = FakeImage()
+    drawable = FakeDrawable(image)
+    cache.get_histogram(drawable)
+
+    image.dirty = True
+    edited = cache.get_histogram(drawable)
+    assert cache.get_histogram(drawable) is not edited
+    assert len(scans) == 3
+
+
+def test_saving_again_invalidates_the_entry(scans, tmp_path):
+    path = tmp_path / "image.xcf"
+    path.write_bytes(b"")
+    cache = HistogramCache()
+    drawable = FakeDrawable(FakeImage(str(path)))
+    first = cache.get_histogram(drawable)
+
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert cache.get_histogram(drawable) is not first
+    assert len(scans) == 2
+
+
+def test_prepared_histogram_scans_when_called(scans, tmp_path):
+    path = tmp_path / "image.xcf"
+    path.write_bytes(b"")
+    cache = HistogramCache()
+    drawable = FakeDrawable(FakeImage(str(path)))
+
+    build = cache.prepare_histogram(drawable)
+    assert scans == []
+    first = build()
+    assert cache.prepare_histogram(drawable)() is first
+    assert len(scans) == 1
@@ -0,0 +1,97 @@
+import pytest
+
+from core.utils.color_names import (
+    ColorNameResolver,
+    compact_name,
+    get_color_name_resolver,
+    normalize_pigment_code
+)
+
+ENTRIES = [
+    {"name": "Ultramarine Blue", "hex": "#120a8f", "codes": ["PB 29"], "aliases": ["French Ultramarine"]},
+    {"name": "Yellow Ochre", "hex": "#cb9d06", "codes": ["PY43"]},
+    {"name": "Cerulean Blue", "hex": "#2a52be", "codes": ["PB35", "PB36"]},
+    {"name": "Cobalt Blue", "hex": "#0047ab", "codes": ["PB28"]},
+    {"name": "Payne's Grey", "hex": "#536878", "codes": ["PB29", "PBk9"]},
+    {"name": "Broken", "hex": "not a color"},
+    {"name": "Ultramarine Blue", "hex": "#000000"},
+]
+
+
+@pytest.fixture
+def resolver():
+    return ColorNameResolver(ENTRIES)
+
+
+def test_invalid_entries_are_skipped(resolver):
+    assert "Broken" not in resolver.names
+    assert len(resolver) == 6
+
+
+@pytest.mark.parametrize("code, expected", [
+    ("PB29", "PB29"),
+    ("pbk 9", "PBK9"),
+    ("PR-122", "PR122"),
+    ("PG7:1", "PG7:1"),
+    ("Blue", None),
+])
+def test_normalize_pigment_code(code, expected):
+    assert normalize_pigment_code(code) == expected
+
+
+def test_compact_name():
+    assert compact_name("Payne's  Gray") == compact_name("paynes-grey") == "paynesgray"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Ultramarine Blue", "Ultramarine Blue"),
+    ("ultramarine-blue", "Ultramarine Blue"),
+    ("French Ultramarine", "Ultramarine Blue"),
+    ("Payne's Gray", "Payne's Grey"),
+    ("Cerulean Blue Hue", "Cerulean Blue"),
+])
+def test_exact_matches(resolver, query, expected):
+    result = resolver.resolve(query)
+    assert result.name == expected
+    assert result.method == "exact"
+    assert result.score == 1.0
+
+
+def test_earlier_entry_wins_on_duplicate_names(resolver):
+    assert resolver.resolve("Ultramarine Blue").hex_value == "#120a8f"
+
+
+def test_code_match(resolver):
+    result = resolver.resolve("PB28")
+    assert (result.name, result.method, result.codes) == ("Cobalt Blue", "code", ["PB28"])
+
+
+def test_code_shared_by_several_entries_uses_the_name(resolver):
+    # PB29 is listed for Ultramarine Blue and Payne's Grey; the words decide
+    assert resolver.resolve("Paynes mix PB29").name == "Payne's Grey"
+    assert resolver.resolve("Ultramarine deep (PB29)").name == "Ultramarine Blue"
+
+
+def test_fuzzy_match(resolver):
+    result = resolver.resolve("Yelow Ocher")
+    assert result.name == "Yellow Ochre"
+    assert result.method == "fuzzy"
+    assert resolver.min_score <= result.score < 1.0
+
+
+@pytest.mark.parametrize("query", ["", "Hue", "Quinacridone Magenta"])
+def test_no_match(resolver, query):
+    assert resolver.resolve(query) is None
+
+
+def test_resolved_values(resolver):
+    result = resolver.resolve("Yellow Ochre").to_dict()
+    assert result["rgb"] == {"r": round(0xcb / 255, 3), "g": round(0x9d / 255, 3), "b": round(0x06 / 255, 3)}
+    assert len(result["lab"]) == 3
+
+
+def test_bundled_dictionary():
+    resolver = get_color_name_resolver()
+    assert len(resolver) > 100
+    assert resolver.resolve("Prussian Blue").codes == ["PB27"]
+    assert resolver.resolve("PB29").name == "Ultramarine Blue"
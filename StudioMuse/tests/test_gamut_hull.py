@@ -0,0 +1,59 @@
+import numpy as np
+
+from core.models.gamut_hull import GamutHull, convex_hull
+
+
+def random_lab(rng, count):
+    return np.column_stack([
+        rng.uniform(0, 100, count),
+        rng.uniform(-80, 80, count),
+        rng.uniform(-80, 80, count)
+    ])
+
+
+def test_hull_contains_its_own_points():
+    points = random_lab(np.random.default_rng(0), 500)
+    hull = GamutHull.from_points(points)
+    assert not hull.is_degenerate
+    assert hull.contains(points, tolerance=1e-6).all()
+
+
+def test_hull_of_large_point_set_contains_its_own_points():
+    # Large sets are reduced to sampled extreme points, an inner approximation
+    # of the hull that stays within the default tolerance
+    points = random_lab(np.random.default_rng(1), 20000)
+    hull = GamutHull.from_points(points)
+    assert len(hull.vertices) < len(points)
+    assert hull.contains(points).all()
+
+
+def test_cube_hull():
+    corners = np.array([[x, y, z] for x in (0, 10) for y in (0, 10) for z in (0, 10)], dtype=np.float64)
+    inner = np.random.default_rng(2).uniform(1, 9, (100, 3))
+    hull = GamutHull.from_points(np.vstack([corners, inner]))
+
+    assert len(hull.vertices) == 8
+    assert hull.volume() == 1000.0
+    assert hull.contains([[5.0, 5.0, 5.0]], tolerance=0.0).all()
+    assert not hull.contains([[5.0, 5.0, 12.0]], tolerance=1.0).any()
+    # Outside the hull the signed distance is the distance to the nearest facet plane
+    np.testing.assert_allclose(hull.signed_distance([[5.0, 5.0, 12.0], [5.0, 5.0, 5.0]]), [2.0, -5.0])
+
+
+def test_faces_point_outward():
+    points = random_lab(np.random.default_rng(3), 200)
+    faces = convex_hull(points)
+    assert faces is not None
+    centroid = points.mean(axis=0)
+    a, b, c = (points[faces[:, i]] for i in range(3))
+    normals = np.cross(b - a, c - a)
+    assert np.all(np.einsum("ij,ij->i", normals, a - centroid) > 0)
+
+
+def test_coplanar_points_are_degenerate():
+    rng = np.random.default_rng(4)
+    points = np.column_stack([rng.uniform(0, 100, 50), rng.uniform(-50, 50, 50), np.zeros(50)])
+    hull = GamutHull.from_points(points)
+    assert hull.is_degenerate
+    assert hull.volume() == 0.0
+    assert not hull.contains(points).any()
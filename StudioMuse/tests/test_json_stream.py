@@ -0,0 +1,83 @@
+import pytest
+
+from core.utils.json_stream import JsonStreamParser, loads_llm_json, parse_json_stream
+
+ENTRIES = '[{"name": "Sky [light]", "rgb": [0.1, 0.2, 0.3]}, {"name": "Brace } \\" quote"}, {"nested": {"a": [1, 2]}}]'
+EXPECTED = [
+    {"name": "Sky [light]", "rgb": [0.1, 0.2, 0.3]},
+    {"name": 'Brace } " quote'},
+    {"nested": {"a": [1, 2]}}
+]
+
+
+def feed_chunks(parser, text, size):
+    values = []
+    for start in range(0, len(text), size):
+        values.extend(parser.feed(text[start:start + size]))
+    return values
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1000])
+def test_elements_are_the_same_for_any_chunking(size):
+    parser = JsonStreamParser()
+    assert feed_chunks(parser, ENTRIES, size) == EXPECTED
+    assert parser.done
+    assert parser.top_level == JsonStreamParser.ARRAY
+
+
+def test_elements_are_yielded_as_soon_as_they_close():
+    parser = JsonStreamParser()
+    assert parser.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(': 2}') == [{"b": 2}]
+    assert not parser.done
+    assert parser.feed("]") == []
+    assert parser.done
+
+
+def test_prose_and_code_fences_are_skipped():
+    text = "Here are the mappings:\n```json\n" + ENTRIES + "\n```\nLet me know if [you] need more."
+    assert parse_json_stream([text]) == EXPECTED
+
+
+def test_truncated_array_keeps_complete_elements():
+    truncated = ENTRIES[:ENTRIES.index('{"nested"') + 8]
+    parser = JsonStreamParser()
+    assert parser.feed(truncated) == EXPECTED[:2]
+    assert not parser.done
+    assert loads_llm_json(truncated) == EXPECTED[:2]
+
+
+def test_scalar_elements():
+    text = '["a, [b]", 1.5, true, null, -2]'
+    assert feed_chunks(JsonStreamParser(), text, 3) == ["a, [b]", 1.5, True, None, -2]
+    assert loads_llm_json(text) == ["a, [b]", 1.5, True, None, -2]
+    assert JsonStreamParser(scalars=False).feed('[1, {"a": 2}, "x"]') == [{"a": 2}]
+
+
+def test_truncated_scalar_is_not_yielded():
+    assert loads_llm_json('["red", "gre') == ["red"]
+
+
+def test_top_level_object():
+    text = 'Sure! {"colors": [{"a": 1}], "note": "}"} trailing {"b": 2}'
+    parser = JsonStreamParser()
+    assert feed_chunks(parser, text, 4) == [{"colors": [{"a": 1}], "note": "}"}]
+    assert parser.top_level == JsonStreamParser.OBJECT
+    assert loads_llm_json(text) == {"colors": [{"a": 1}], "note": "}"}
+
+
+def test_array_only_yields_elements_of_a_wrapped_array():
+    parser = JsonStreamParser(array_only=True)
+    assert parser.feed('{"colors": [{"a": 1}, {"b": 2}]}') == [{"a": 1}, {"b": 2}]
+
+
+def test_malformed_elements_are_counted_and_skipped():
+    parser = JsonStreamParser()
+    assert parser.feed('[{"a": 1}, {"b": oops}, {"c": 3}]') == [{"a": 1}, {"c": 3}]
+    assert parser.malformed == 1
+
+
+@pytest.mark.parametrize("text", ["", "no json here", '{"truncated": '])
+def test_loads_llm_json_without_complete_value_raises(text):
+    with pytest.raises(ValueError):
+        loads_llm_json(text)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from core.models import palette_index
+from core.models.palette_index import LabKDTree
+
+
+def random_lab(rng, count):
+    return np.column_stack([
+        rng.uniform(0, 100, count),
+        rng.uniform(-100, 100, count),
+        rng.uniform(-100, 100, count)
+    ])
+
+
+def brute_force(points, query, k):
+    distances = np.linalg.norm(points - query, axis=1)
+    order = np.argsort(distances, kind="stable")[:k]
+    return distances[order], order
+
+
+@pytest.fixture(params=["scan", "traversal"])
+def search_path(request, monkeypatch):
+    """Run each test through the vectorized scan and through the tree traversal."""
+    if request.param == "traversal":
+        monkeypatch.setattr(palette_index, "BRUTE_FORCE_MAX_POINTS", 0)
+    return request.param
+
+
+@pytest.mark.parametrize("count, k", [(1, 1), (50, 1), (500, 5), (3000, 20)])
+def test_query_matches_brute_force(search_path, count, k):
+    rng = np.random.default_rng(count)
+    points = random_lab(rng, count)
+    tree = LabKDTree(points, leaf_size=8)
+
+    for query in random_lab(rng, 25):
+        distances, ids = tree.query(query, k=k)
+        expected_distances, expected_ids = brute_force(points, query, k)
+        np.testing.assert_allclose(distances, expected_distances, atol=1e-9)
+        np.testing.assert_array_equal(ids, expected_ids)
+
+
+def test_query_radius_matches_brute_force(search_path):
+    rng = np.random.default_rng(7)
+    points = random_lab(rng, 2000)
+    tree = LabKDTree(points)
+
+    for query in random_lab(rng, 25):
+        distances, ids = tree.query_radius(query, 20.0)
+        all_distances = np.linalg.norm(points - query, axis=1)
+        expected = np.nonzero(all_distances <= 20.0)[0]
+        assert sorted(ids.tolist()) == sorted(expected.tolist())
+        assert np.all(np.diff(distances) >= 0)
+        np.testing.assert_allclose(distances, all_distances[ids], atol=1e-9)
+
+
+def test_query_returns_caller_ids(search_path):
+    points = np.array([[10.0, 0, 0], [50.0, 0, 0], [90.0, 0, 0]])
+    tree = LabKDTree(points, ids=np.array([7, 8, 9]))
+    distances, ids = tree.query([48.0, 0, 0], k=2)
+    assert ids.tolist() == [8, 7]
+    np.testing.assert_allclose(distances, [2.0, 38.0])
+
+
+def test_k_larger_than_point_count_returns_all_points(search_path):
+    points = np.array([[10.0, 0, 0], [50.0, 0, 0]])
+    distances, ids = LabKDTree(points).query([0.0, 0, 0], k=5)
+    assert ids.tolist() == [0, 1]
+
+
+def test_empty_tree():
+    tree = LabKDTree(np.empty((0, 3)))
+    assert len(tree) == 0
+    distances, ids = tree.query_radius([50.0, 0, 0], 10.0)
+    assert len(distances) == 0 and len(ids) == 0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    rng = np.random.default_rng(3)
+    points = random_lab(rng, 300)
+    tree = LabKDTree(points, content_hash="abc")
+    path = str(tmp_path / "palette.kdtree.npz")
+    assert tree.save(path)
+
+    loaded = LabKDTree.load(path, content_hash="abc")
+    assert loaded is not None
+    query = random_lab(rng, 1)[0]
+    np.testing.assert_array_equal(loaded.query(query, k=3)[1], tree.query(query, k=3)[1])
+    # A tree built from other palette colors is not reused
+    assert LabKDTree.load(path, content_hash="other") is None
@@ -0,0 +1,77 @@
+from math import comb
+
+import numpy as np
+import pytest
+
+from core.models.pigment_mixing import (
+    PigmentMixer,
+    _weight_compositions,
+    ks_to_reflectance,
+    reflectance_to_ks,
+    suggest_mixes
+)
+from core.utils.color_science import srgb_to_lab
+
+PIGMENTS = {
+    "Titanium White": {"r": 0.96, "g": 0.96, "b": 0.94},
+    "Ultramarine Blue": {"r": 0.12, "g": 0.15, "b": 0.55},
+    "Cadmium Yellow": {"r": 0.98, "g": 0.80, "b": 0.05},
+    "Cadmium Red": {"r": 0.80, "g": 0.10, "b": 0.10},
+    "Burnt Umber": {"r": 0.35, "g": 0.22, "b": 0.14},
+}
+
+
+def test_kubelka_munk_round_trip():
+    reflectance = np.linspace(0.01, 1.0, 50)
+    np.testing.assert_allclose(ks_to_reflectance(reflectance_to_ks(reflectance)), reflectance, atol=1e-12)
+
+
+@pytest.mark.parametrize("pigments, steps", [(1, 8), (2, 8), (3, 5)])
+def test_weight_compositions_cover_every_split(pigments, steps):
+    compositions = _weight_compositions(pigments, steps)
+    assert len(compositions) == comb(steps - 1, pigments - 1)
+    np.testing.assert_allclose(compositions.sum(axis=1), 1.0)
+    assert np.all(compositions > 0)
+
+
+def test_pure_pigment_targets_resolve_to_themselves():
+    recipes = PigmentMixer(PIGMENTS).solve(PIGMENTS)
+    for name, recipe in zip(PIGMENTS, recipes):
+        assert recipe.target_name == name
+        assert recipe.pigments == [name]
+        assert recipe.ratios == [1.0]
+        assert recipe.delta_e < 0.5
+
+
+def test_mix_of_two_pigments_is_recovered():
+    mixer = PigmentMixer(PIGMENTS)
+    blue, yellow = mixer.names.index("Ultramarine Blue"), mixer.names.index("Cadmium Yellow")
+    r, g, b = mixer.mix(np.array([[blue, yellow]]), np.array([[0.5, 0.5]]))[0]
+
+    recipe = mixer.solve({"Green": {"r": r, "g": g, "b": b}})[0]
+    assert sorted(recipe.pigments) == ["Cadmium Yellow", "Ultramarine Blue"]
+    assert recipe.ratios == [0.5, 0.5]
+    assert recipe.delta_e < 0.5
+
+
+def test_white_tints_a_pigment():
+    mixer = PigmentMixer(PIGMENTS)
+    white, blue = mixer.names.index("Titanium White"), mixer.names.index("Ultramarine Blue")
+    lightness = srgb_to_lab(mixer.mix(
+        np.array([[blue, white]] * 3), np.array([[1.0, 0.0], [0.75, 0.25], [0.25, 0.75]])))[:, 0]
+    assert lightness[0] < lightness[1] < lightness[2]
+
+
+def test_recipe_ratios_sum_to_one():
+    targets = {f"Color {i}": dict(zip("rgb", rgb)) for i, rgb in
+               enumerate(np.random.default_rng(2).random((20, 3)))}
+    recipes = suggest_mixes(targets, PIGMENTS)
+    assert [recipe.target_name for recipe in recipes] == list(targets)
+    for recipe in recipes:
+        assert 1 <= len(recipe.pigments) <= 3
+        assert sum(recipe.ratios) == pytest.approx(1.0, abs=1e-2)
+
+
+def test_solver_requires_pigments():
+    with pytest.raises(ValueError):
+        PigmentMixer({})
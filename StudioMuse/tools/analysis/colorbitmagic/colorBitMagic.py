@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from gi.repository import Gtk, Gimp
+from gi.repository import Gtk, Gimp, GLib
 from core.utils.colorBitMagic_utils import (
     get_palette_colors,
     load_physical_palette_data,
@@ -21,8 +21,12 @@ from core.utils.ui import (
     populate_dropdown,
     cleanup_resources
 )
-import json
+from core.utils.json_stream import loads_llm_json
 import os
+import threading
+
+# Palette dropdown entry that extracts a palette from the active image
+ACTIVE_IMAGE_PALETTE = "Extract from active image"
 
 class ColorBitMagic:
     """
@@ -30,13 +34,20 @@ class ColorBitMagic:
     Controls the UI interactions for the Analysis notebook tab.
     """
     
-    def __init__(self):
-        """Initialize the ColorBitMagic tool."""
+    def __init__(self, image=None):
+        """
+        Initialize the ColorBitMagic tool.
+        
+        Args:
+            image (Gimp.Image): Optional image the suite was launched on
+        """
+        self.image = image
         self.builder = None
         self.palette_name = None
         self.results_view = None
         self.widgets = {}  # Store widget references
         self.color_results = []  # Store color mapping results
+        self._pending_palette_jobs = {}  # Entry text -> backend job ID still running
         self.is_active = True
 
     def set_builder(self, builder):
@@ -51,6 +62,8 @@ class ColorBitMagic:
         widget_ids = [
             # Demystify tab widgets
             'submitButton',
+            'coverageButton',
+            'gamutButton',
             'paletteDropdown',
             'physicalPaletteDropdown',
             'resultListBox',
@@ -78,6 +91,8 @@ class ColorBitMagic:
         custom_handlers = {
             'resultListBox': [('row-selected', self.on_color_selected)],
             'submitButton': [('clicked', self.on_submit_clicked)],
+            'coverageButton': [('clicked', self.on_coverage_clicked)],
+            'gamutButton': [('clicked', self.on_gamut_clicked)],
             'saveButton': [('clicked', self.on_save_clicked)],
             'generateButton': [('clicked', self.on_generate_clicked)],
             'closeButton': [('clicked', self.on_close_clicked)]
@@ -103,9 +118,9 @@ class ColorBitMagic:
         """
         if isinstance(result, str):
             try:
-                clean_result = result.replace('```json', '').replace('```', '').strip()
-                data = json.loads(clean_result)
-            except json.JSONDecodeError as e:
+                # Skips prose and code fences; a truncated reply keeps its complete entries
+                data = loads_llm_json(result)
+            except ValueError as e:
                 self.log_message(f"JSON parsing error: {str(e)}")
                 return [{"error": result}]
         else:
@@ -125,7 +140,9 @@ class ColorBitMagic:
                 "gimp_color_name": item.get("gimp_color_name", f"Unknown-{index}"),
                 "rgb_color": item.get("rgb_color", "N/A"),
                 "physical_color_name": item.get("physical_color_name", "Unknown"),
-                "mixing_suggestions": item.get("mixing_suggestions", "N/A")
+                "mixing_suggestions": item.get("mixing_suggestions", "N/A"),
+                "delta_e": item.get("delta_e"),
+                "mixing_recipe": item.get("mixing_recipe")
             }
             formatted_data.append(entry)
 
@@ -180,7 +197,21 @@ class ColorBitMagic:
         self.widgets['colorNameLabel'].set_markup(f"<b>{color_data['name']}</b>")
         self.widgets['rgbLabel'].set_markup(f"<b>RGB:</b> {color_data['rgb_color']}")
         self.widgets['physicalColorLabel'].set_markup(f"<b>Physical:</b> {color_data['physical_color_name']}")
-        self.widgets['mixingSuggestionsLabel'].set_markup(f"<b>Mixing Suggestions:</b>\n{color_data['mixing_suggestions']}")
+        self.widgets['mixingSuggestionsLabel'].set_markup(
+            f"<b>Mixing Suggestions:</b>\n{color_data['mixing_suggestions']}"
+            f"{self._format_mixing_recipe(color_data.get('mixing_recipe'))}"
+        )
+
+    def _format_mixing_recipe(self, recipe):
+        """Format a structured mixing recipe as markup for the right panel"""
+        if not recipe:
+            return ""
+            
+        lines = ["\n\n<b>Recipe:</b>"]
+        for pigment, ratio in zip(recipe.get("pigments", []), recipe.get("ratios", [])):
+            lines.append(f"  • {round(ratio * 100)}% {pigment}")
+        lines.append(f"<b>Predicted ΔE:</b> {recipe.get('delta_e', 0.0):.1f}")
+        return "\n".join(lines)
 
     def display_results(self, formatted_data, result_widget_id):
         """
@@ -190,11 +221,25 @@ class ColorBitMagic:
             formatted_data: List of dictionaries containing color mapping info
             result_widget_id: ID of the GtkScrolledWindow to populate
         """
+        if not self.clear_results():
+            return
+            
+        # Process each color entry
+        for item in formatted_data:
+            self.append_result(item)
+
+    def clear_results(self):
+        """
+        Remove all rows from the results list.
+        
+        Returns:
+            bool: False if the list box could not be found
+        """
         # Get the list box
         list_box = self.widgets['resultListBox']
         if not list_box:
             self.log_message("Error: Could not find resultListBox")
-            return
+            return False
             
         # Clear existing content
         for child in list_box.get_children():
@@ -202,68 +247,188 @@ class ColorBitMagic:
             
         # Store color results
         self.color_results = []
+        return True
+
+    def append_result(self, item):
+        """
+        Append one formatted color mapping to the results list. The first
+        row is selected as soon as it is added.
         
-        # Process each color entry
-        for item in formatted_data:
-            # Parse RGB values with maximum precision
+        Args:
+            item: Dictionary containing color mapping info
+        """
+        list_box = self.widgets['resultListBox']
+        
+        # Parse RGB values with maximum precision
+        try:
+            rgb_values = item['rgb_color'].replace("rgb(", "").replace(")", "").split(",")
+            rgb_dict = {
+                "r": float(rgb_values[0].strip()),  # Maintains full float precision
+                "g": float(rgb_values[1].strip()),
+                "b": float(rgb_values[2].strip())
+            }
+            # Use full precision hex conversion
+            hex_value = "#{:02x}{:02x}{:02x}".format(
+                round(rgb_dict['r'] * 255),
+                round(rgb_dict['g'] * 255),
+                round(rgb_dict['b'] * 255)
+            )
+        except Exception as e:
+            self.log_message(f"Error parsing RGB values: {e}")
+            rgb_dict = {"r": 0.0, "g": 0.0, "b": 0.0}
+            hex_value = "#000000"
+            
+        # Create color entry
+        color_entry = {
+            "name": item['gimp_color_name'],
+            "rgb_color": item['rgb_color'],
+            "rgb": rgb_dict,
+            "hex_value": hex_value,
+            "physical_color_name": item['physical_color_name'],
+            "mixing_suggestions": item['mixing_suggestions'],
+            "delta_e": item.get('delta_e'),
+            "mixing_recipe": item.get('mixing_recipe')
+        }
+        self.color_results.append(color_entry)
+        
+        # Create list box row
+        row = Gtk.ListBoxRow()
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        hbox.set_margin_start(10)
+        hbox.set_margin_end(10)
+        hbox.set_margin_top(5)
+        hbox.set_margin_bottom(5)
+        
+        # Add color name label
+        name_label = Gtk.Label(xalign=0)
+        name_label.set_markup(f"<b>{color_entry['name']}</b>")
+        hbox.pack_start(name_label, True, True, 0)
+        
+        # Add color swatch
+        swatch = self._create_color_swatch(color_entry)
+        hbox.pack_end(swatch, False, False, 0)
+        
+        row.add(hbox)
+        list_box.add(row)
+        row.show_all()
+        
+        # Select first row as soon as it exists
+        if len(self.color_results) == 1:
+            list_box.select_row(row)
+            self.on_color_selected(list_box, row)
+
+    def _apply_mixing_suggestion(self, suggestion):
+        """Update a displayed color with mixing suggestions streamed after its mapping"""
+        text = suggestion.get("mixing_suggestions")
+        if not text:
+            return
+            
+        list_box = self.widgets['resultListBox']
+        selected = list_box.get_selected_row()
+        for index, color_entry in enumerate(self.color_results):
+            if color_entry["name"] == suggestion.get("gimp_color_name"):
+                color_entry["mixing_suggestions"] = text
+                if selected is not None and selected.get_index() == index:
+                    self.update_right_panel(color_entry)
+
+    def _run_in_background(self, button, work, *args):
+        """
+        Run blocking backend work on a worker thread so the dialog stays responsive.
+        
+        The button is disabled until the work finishes, so it cannot be
+        started twice. The work must only touch widgets through _idle.
+        
+        Args:
+            button (Gtk.Button): Button that started the work
+            work (callable): Function run on the worker thread with *args
+        """
+        button.set_sensitive(False)
+        
+        def run():
             try:
-                rgb_values = item['rgb_color'].replace("rgb(", "").replace(")", "").split(",")
-                rgb_dict = {
-                    "r": float(rgb_values[0].strip()),  # Maintains full float precision
-                    "g": float(rgb_values[1].strip()),
-                    "b": float(rgb_values[2].strip())
-                }
-                # Use full precision hex conversion
-                hex_value = "#{:02x}{:02x}{:02x}".format(
-                    round(rgb_dict['r'] * 255),
-                    round(rgb_dict['g'] * 255),
-                    round(rgb_dict['b'] * 255)
-                )
+                work(*args)
             except Exception as e:
-                self.log_message(f"Error parsing RGB values: {e}")
-                rgb_dict = {"r": 0.0, "g": 0.0, "b": 0.0}
-                hex_value = "#000000"
+                log_error("Error in background request", e)
+                self._idle(self.log_message, f"Error: {str(e)}")
+            finally:
+                self._idle(button.set_sensitive, True)
                 
-            # Create color entry
-            color_entry = {
-                "name": item['gimp_color_name'],
-                "rgb_color": item['rgb_color'],
-                "rgb": rgb_dict,
-                "hex_value": hex_value,
-                "physical_color_name": item['physical_color_name'],
-                "mixing_suggestions": item['mixing_suggestions']
-            }
-            self.color_results.append(color_entry)
-            
-            # Create list box row
-            row = Gtk.ListBoxRow()
-            hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
-            hbox.set_margin_start(10)
-            hbox.set_margin_end(10)
-            hbox.set_margin_top(5)
-            hbox.set_margin_bottom(5)
-            
-            # Add color name label
-            name_label = Gtk.Label(xalign=0)
-            name_label.set_markup(f"<b>{color_entry['name']}</b>")
-            hbox.pack_start(name_label, True, True, 0)
-            
-            # Add color swatch
-            swatch = self._create_color_swatch(color_entry)
-            hbox.pack_end(swatch, False, False, 0)
-            
-            row.add(hbox)
-            list_box.add(row)
-            
-        # Show all widgets
-        list_box.show_all()
-        
-        # Select first row if available
-        if len(self.color_results) > 0:
-            first_row = list_box.get_row_at_index(0)
-            if first_row:
-                list_box.select_row(first_row)
-                self.on_color_selected(list_box, first_row)
+        threading.Thread(target=run, daemon=True).start()
+
+    def _idle(self, callback, *args):
+        """Run a callback on the GTK main thread, unless the tool was closed in the meantime."""
+        def run():
+            if self.is_active:
+                callback(*args)
+            return False  # One-shot idle source
+        GLib.idle_add(run)
+
+    def _demystify_worker(self, api_client, gimp_palette_colors, physical_color_names,
+                          physical_color_values, mixing_lattice):
+        """Worker thread: stream demystify results, or make one request on older backends."""
+        if self._stream_results(api_client, gimp_palette_colors, physical_color_names,
+                                physical_color_values, mixing_lattice):
+            return
+            
+        response = api_client.demystify_palette(
+            gimp_palette_colors=gimp_palette_colors,
+            physical_palette_data=physical_color_names,
+            physical_palette_colors=physical_color_values,
+            mixing_recipes=mixing_lattice is None
+        )
+        self._idle(self._show_demystify_response, response, mixing_lattice)
+
+    def _show_demystify_response(self, response, mixing_lattice):
+        """Display the result of a non-streaming demystify request."""
+        if response.get("success"):
+            result = response.get("response")
+            formatted_result = self.format_palette_mapping(result)
+            if mixing_lattice is not None:
+                self._attach_lattice_recipes(formatted_result, mixing_lattice)
+            self.display_results(formatted_result, "resultListBox")
+        else:
+            error_msg = response.get("error", "Unknown error")
+            self.log_message(f"API error: {error_msg}")
+
+    def _stream_results(self, api_client, gimp_palette_colors, physical_color_names,
+                        physical_color_values, mixing_lattice):
+        """
+        Worker thread: read the demystify stream and hand each event to the
+        GTK main thread, so rows appear as the backend sends them.
+        
+        Returns:
+            bool: False if the backend has no streaming endpoint, True otherwise
+        """
+        events = api_client.demystify_palette_stream(
+            gimp_palette_colors=gimp_palette_colors,
+            physical_palette_data=physical_color_names,
+            physical_palette_colors=physical_color_values,
+            mixing_recipes=mixing_lattice is None
+        )
+        mapped = 0
+        for event in events:
+            event_type = event.get("type")
+            if event_type == "mapping":
+                mapped += 1
+            elif event_type == "error" and event.get("status") in (404, 405) and not mapped:
+                # Older backends without the streaming endpoint
+                return False
+            self._idle(self._apply_stream_event, event, mixing_lattice)
+        return True
+
+    def _apply_stream_event(self, event, mixing_lattice):
+        """Show one streamed demystify event (GTK main thread)."""
+        event_type = event.get("type")
+        if event_type == "mapping":
+            entries = self.format_palette_mapping([event.get("data")])
+            if mixing_lattice is not None:
+                self._attach_lattice_recipes(entries, mixing_lattice)
+            for entry in entries:
+                self.append_result(entry)
+        elif event_type == "suggestion":
+            self._apply_mixing_suggestion(event.get("data") or {})
+        elif event_type == "error":
+            self.log_message(f"API error: {event.get('error')}")
 
     # Signal handlers for Analysis notebook
     def on_submit_clicked(self, button):
@@ -280,7 +445,10 @@ class ColorBitMagic:
             
         try:
             # Get palette data
-            gimp_palette_colors = get_palette_colors(selected_palette)
+            if selected_palette == ACTIVE_IMAGE_PALETTE:
+                gimp_palette_colors = self._extract_active_image_palette()
+            else:
+                gimp_palette_colors = get_palette_colors(selected_palette)
             if not gimp_palette_colors:
                 self.log_message(f"Failed to load GIMP palette: {selected_palette}")
                 return
@@ -291,26 +459,20 @@ class ColorBitMagic:
                 self.log_message(f"Failed to load physical palette: {selected_physical_palette}")
                 return
                 
-            # Extract physical color names
+            # Extract physical color names and any known RGB values
             physical_color_names = self._extract_physical_color_names(physical_palette_data)
+            physical_color_values = self._extract_physical_color_values(physical_palette_data)
+            mixing_lattice = self._load_mixing_lattice(selected_physical_palette)
             
-            # Process through API
+            # Process through API on a worker thread; rows are added as they arrive
             try:
                 from core.utils.api_client import BackendAPIClient
                 api_client = BackendAPIClient()
-
-                response = api_client.demystify_palette(
-                    gimp_palette_colors=gimp_palette_colors,
-                    physical_palette_data=physical_color_names
-                )
                 
-                if response.get("success"):
-                    result = response.get("response")
-                    formatted_result = self.format_palette_mapping(result)
-                    self.display_results(formatted_result, "resultListBox")
-                else:
-                    error_msg = response.get("error", "Unknown error")
-                    self.log_message(f"API error: {error_msg}")
+                if not self.clear_results():
+                    return
+                self._run_in_background(button, self._demystify_worker, api_client, gimp_palette_colors,
+                                        physical_color_names, physical_color_values, mixing_lattice)
                     
             except Exception as e:
                 log_error("API communication error", e)
@@ -320,14 +482,113 @@ class ColorBitMagic:
             log_error("Error in palette demystification", e)
             self.log_message(f"Error: {str(e)}")
     
+    def on_coverage_clicked(self, button):
+        """Map every pixel of the active layer to the selected physical palette and add result layers"""
+        selected_physical_palette = get_widget_value(self.widgets['physicalPaletteDropdown'])
+        if not selected_physical_palette:
+            self.log_message("Please select a physical palette.")
+            return
+            
+        try:
+            from core.models.palette_processor import PaletteProcessor
+            from core.utils.color_science import rgb_dicts_to_array
+            from core.utils.palette_extraction import get_active_drawable
+            from core.utils.tile_reader import DrawableTileReader
+            
+            drawable = get_active_drawable(self.image)
+            if drawable is None:
+                self.log_message("No active image layer to map.")
+                return
+                
+            palette = PaletteProcessor.load_palette(selected_physical_palette)
+            pigments = palette.get_pigment_colors() if hasattr(palette, 'get_pigment_colors') else {}
+            if not pigments:
+                self.log_message(f"Physical palette '{selected_physical_palette}' has no colors with RGB values.")
+                return
+                
+            # The reader is created here because it calls GIMP; the pixels are mapped on a worker thread
+            names, rgb = rgb_dicts_to_array(pigments)
+            self._run_in_background(button, self._coverage_worker, drawable, DrawableTileReader(drawable),
+                                    names, rgb, selected_physical_palette)
+                
+        except Exception as e:
+            log_error("Error computing coverage map", e)
+            self.log_message(f"Error: {str(e)}")
+    
+    def _coverage_worker(self, drawable, reader, names, rgb, palette_name):
+        """Worker thread: map every pixel, then add the result layers on the GTK main thread."""
+        from core.utils.coverage_map import compute_coverage_map
+        
+        coverage = compute_coverage_map(reader, names, rgb)
+        # Not _idle: the shared memory must be released even if the tool was closed meanwhile
+        GLib.idle_add(self._show_coverage, drawable, coverage, palette_name)
+    
+    def _show_coverage(self, drawable, coverage, palette_name):
+        """Add the coverage layers and release the coverage map (GTK main thread)."""
+        from core.utils.coverage_map import create_coverage_layers
+        
+        with coverage:
+            if not self.is_active:
+                return False
+            try:
+                create_coverage_layers(drawable.get_image(), drawable, coverage, palette_name)
+                top_colors = ", ".join(f"{name} {share:.0%}" for name, share in coverage.coverage()[:5])
+                self.log_message(f"Coverage map added (mean ΔE {coverage.mean_delta_e:.1f}). Top colors: {top_colors}")
+            except Exception as e:
+                log_error("Error adding coverage layers", e)
+                self.log_message(f"Error: {str(e)}")
+        return False  # One-shot idle source
+    
+    def on_gamut_clicked(self, button):
+        """Report which colors of the active layer the selected physical palette cannot reach"""
+        selected_physical_palette = get_widget_value(self.widgets['physicalPaletteDropdown'])
+        if not selected_physical_palette:
+            self.log_message("Please select a physical palette.")
+            return
+            
+        try:
+            from core.models.palette_processor import PaletteProcessor
+            from core.utils.color_histogram import prepare_histogram
+            from core.utils.palette_extraction import get_active_drawable
+            
+            drawable = get_active_drawable(self.image)
+            if drawable is None:
+                self.log_message("No active image layer to check.")
+                return
+                
+            palette = PaletteProcessor.load_palette(selected_physical_palette)
+            pigments = palette.get_pigment_colors() if hasattr(palette, 'get_gamut_hull') else {}
+            if not pigments:
+                self.log_message(f"Physical palette '{selected_physical_palette}' has no colors with RGB values.")
+                return
+                
+            # GIMP is only called while preparing; pixels are read and analyzed on a worker thread
+            build_histogram = prepare_histogram(drawable)
+            self._run_in_background(button, self._gamut_worker, build_histogram, palette,
+                                    selected_physical_palette)
+            
+        except Exception as e:
+            log_error("Error checking palette gamut", e)
+            self.log_message(f"Error: {str(e)}")
+    
+    def _gamut_worker(self, build_histogram, palette, palette_name):
+        """Worker thread: build the gamut hull and histogram, then report the out-of-gamut colors."""
+        from core.models.gamut_hull import analyze_gamut
+        
+        report = analyze_gamut(build_histogram(), palette.get_gamut_hull(), palette_name, "with mixing")
+        self._idle(self.log_message, report.describe())
+    
     def _extract_physical_color_names(self, physical_palette_data):
         """Extract physical color names from different data formats"""
         physical_color_names = []
         
         # Handle different formats of physical_palette_data
         if isinstance(physical_palette_data, dict) and 'colors' in physical_palette_data:
-            # Extract color names from dictionary
-            physical_color_names = physical_palette_data['colors']
+            # Extract color names from dictionary; enriched palettes store ColorData dictionaries
+            physical_color_names = [
+                color.get('name', 'Unnamed') if isinstance(color, dict) else color
+                for color in physical_palette_data['colors']
+            ]
         elif isinstance(physical_palette_data, list):
             # Already a list of color names
             physical_color_names = physical_palette_data
@@ -337,9 +598,91 @@ class ColorBitMagic:
             
         return physical_color_names
 
+    def _extract_active_image_palette(self, num_colors=16):
+        """Extract a palette from the active drawable as a list of Gegl.Color objects"""
+        from core.utils.palette_extraction import (
+            get_active_drawable,
+            extract_palette,
+            palette_to_gegl_colors
+        )
+        
+        drawable = get_active_drawable(self.image)
+        if drawable is None:
+            self.log_message("No active image layer to extract a palette from.")
+            return []
+            
+        palette = extract_palette(drawable, num_colors=num_colors)
+        self.log_message(f"Extracted {len(palette)} colors from '{drawable.get_name()}'")
+        return palette_to_gegl_colors(palette)
+
+    def _load_mixing_lattice(self, palette_name):
+        """Load the precomputed mixing lattice for a physical palette, if one has been built."""
+        try:
+            from core.models.palette_processor import PaletteProcessor
+            from core.models.palette_models import PhysicalPalette
+            palette = PaletteProcessor.load_palette(palette_name)
+            if isinstance(palette, PhysicalPalette):
+                return palette.get_mixing_lattice()
+        except Exception as e:
+            log_error(f"Failed to load mixing lattice for {palette_name}", e)
+        return None
+
+    def _attach_lattice_recipes(self, formatted_data, mixing_lattice):
+        """Look up a mixing recipe for every result entry in the precomputed lattice"""
+        from core.utils.color_science import parse_rgb_string
+        
+        targets = {}
+        for index, item in enumerate(formatted_data):
+            try:
+                targets[index] = parse_rgb_string(item.get("rgb_color", ""))
+            except ValueError:
+                continue
+                
+        for index, recipe in zip(targets.keys(), mixing_lattice.lookup(targets)):
+            item = formatted_data[index]
+            recipe.target_name = item.get("gimp_color_name", recipe.target_name)
+            item["mixing_recipe"] = recipe.to_dict()
+            if not item.get("mixing_suggestions") or item["mixing_suggestions"] == "N/A":
+                item["mixing_suggestions"] = recipe.describe()
+
+    def _extract_physical_color_values(self, physical_palette_data):
+        """
+        Extract RGB values for physical colors, keyed by name. Colors saved
+        without RGB values are looked up with the offline color-name resolver.
+        These let the backend match colors locally instead of through the LLM.
+        """
+        from core.utils.color_names import get_color_name_resolver
+        
+        physical_color_values = {}
+        
+        if not isinstance(physical_palette_data, dict):
+            return physical_color_values
+            
+        resolver = get_color_name_resolver()
+        for color in physical_palette_data.get('colors', []):
+            if isinstance(color, str):
+                color = {"name": color}
+            if not isinstance(color, dict) or not color.get('name'):
+                continue
+                
+            rgb = color.get('rgb')
+            if not rgb:
+                resolved = resolver.resolve(color['name'])
+                if resolved is None:
+                    continue
+                rgb = resolved.rgb
+                
+            physical_color_values[color['name']] = {
+                "R": rgb.get("r", 0.0),
+                "G": rgb.get("g", 0.0),
+                "B": rgb.get("b", 0.0)
+            }
+                
+        return physical_color_values
+
     def populate_palette_dropdown(self):
         """Populates the GIMP palette dropdown using shared utility."""
-        palettes = Gimp.palettes_get_list("")
+        palettes = [ACTIVE_IMAGE_PALETTE] + list(Gimp.palettes_get_list(""))
         populate_dropdown(self.widgets['paletteDropdown'], palettes, "-- Select a palette --")
 
     def populate_physical_palette_dropdown(self):
@@ -369,14 +712,13 @@ class ColorBitMagic:
             
             # Ensure filename is valid
             filename = f"{self.current_palette['name']}.json"
-            filepath = os.path.join(physical_palettes_dir, filename)
             
-            # Save the palette data using the centralized utility
-            if save_json_data(
+            # Save the palette data and its k-d tree index
+            from core.models.palette_processor import PaletteProcessor
+            if PaletteProcessor.save_palette(
                 self.current_palette,
-                filepath,
-                create_dirs=True,
-                indent=2
+                filename=filename,
+                base_dir=physical_palettes_dir
             ):
                 self.log_message(f"Palette '{self.current_palette['name']}' saved successfully.")
                 # Refresh the physical palette dropdown
@@ -406,58 +748,71 @@ class ColorBitMagic:
             from core.utils.api_client import BackendAPIClient
             api_client = BackendAPIClient()
 
-            result = api_client.create_physical_palette(entry_text)
-            
-            if not result:
-                self.log_message("Error: Received empty response from API")
-                return
-                
-            if not result.get("success", False):
-                error_msg = result.get("error", "Unknown error")
-                self.log_message(f"API error: {error_msg}")
-                return
-                
-            # Get the raw response and validate it
-            raw_response = result.get("response", "")
-            if not raw_response:
-                self.log_message("Error: Empty response data from API")
-                return
-                
-            # Clean the response if it contains markdown code blocks
-            if isinstance(raw_response, str):
-                raw_response = raw_response.replace('```json', '').replace('```', '').strip()
-            
-            try:
-                # Parse JSON response
-                json_response = json.loads(raw_response) if isinstance(raw_response, str) else raw_response
+            # Collect an unfinished job for the same text instead of resubmitting it
+            pending_job = self._pending_palette_jobs.pop(entry_text, None)
+            if pending_job:
+                self.log_message("Collecting the earlier request for this palette...")
                 
-                # Validate required fields
-                required_fields = ['set_name', 'colors', 'piece_count']
-                missing_fields = [field for field in required_fields if field not in json_response]
-                if missing_fields:
-                    self.log_message(f"Error: Missing required fields in response: {missing_fields}")
-                    return
-                
-                # Store palette data
-                self.current_palette = {
-                    "name": json_response["set_name"],
-                    "raw_response": raw_response,
-                    "colors": json_response['colors'],
-                    "piece_count": json_response['piece_count']
-                }
-
-                # Display the results in the text view
-                self.display_palette_text(json_response)
-                self.log_message("Palette generated successfully")
-                
-            except json.JSONDecodeError as e:
-                log_error(f"JSON parsing error. Raw response: {raw_response}", e)
-                self.log_message(f"Error parsing API response: {str(e)}")
+            # The job is polled on a worker thread; the result is shown on the GTK thread
+            def work():
+                result = api_client.create_physical_palette(entry_text, job_id=pending_job)
+                self._idle(self._show_generated_palette, entry_text, result)
+            self._run_in_background(button, work)
             
         except Exception as e:
             log_error(f"Error in palette generation. Entry text: {entry_text}", e)
             self.log_message(f"Error generating palette: {str(e)}")
 
+    def _show_generated_palette(self, entry_text, result):
+        """Validate and display a generated physical palette."""
+        if not result:
+            self.log_message("Error: Received empty response from API")
+            return
+            
+        if not result.get("success", False):
+            error_msg = result.get("error", "Unknown error")
+            self.log_message(f"API error: {error_msg}")
+            if result.get("job_id"):
+                self._pending_palette_jobs[entry_text] = result["job_id"]
+                self.log_message("The backend is still working on it; click Generate again to collect the result")
+            return
+            
+        # Get the raw response and validate it
+        raw_response = result.get("response", "")
+        if not raw_response:
+            self.log_message("Error: Empty response data from API")
+            return
+            
+        try:
+            # Parse JSON response, skipping prose and code fences around it
+            json_response = loads_llm_json(raw_response) if isinstance(raw_response, str) else raw_response
+            if not isinstance(json_response, dict):
+                raise ValueError("Expected a JSON object describing the palette")
+            
+            # Validate required fields
+            required_fields = ['set_name', 'colors', 'piece_count']
+            missing_fields = [field for field in required_fields if field not in json_response]
+            if missing_fields:
+                self.log_message(f"Error: Missing required fields in response: {missing_fields}")
+                return
+            
+            # Store palette data
+            self.current_palette = {
+                "name": json_response["set_name"],
+                "raw_response": raw_response,
+                "colors": json_response['colors'],
+                "piece_count": json_response['piece_count'],
+                "palette_type": "physical"
+            }
+
+            # Display the results in the text view
+            self.display_palette_text(json_response)
+            self.log_message("Palette generated successfully")
+            
+        except ValueError as e:
+            log_error(f"JSON parsing error. Raw response: {raw_response}", e)
+            self.log_message(f"Error parsing API response: {str(e)}")
+
     def display_palette_text(self, palette_data):
         """Display palette information in the text view."""
         text_view = self.widgets.get('resultsTextView')
@@ -496,5 +851,9 @@ class ColorBitMagic:
 
     def cleanup(self):
         """Clean up resources when the tool is being closed"""
+        # Stop the coverage map worker pool if it was started
+        from core.utils.coverage_map import shutdown_pool
+        shutdown_pool()
+        
         # Use shared cleanup utility
         cleanup_resources(self)